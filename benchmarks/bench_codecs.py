@@ -0,0 +1,37 @@
+"""Compara decodificar 100 000 lecturas de sensor como JSON, como tramas `struct` una a una
+y como lote con `StructCodec.decode_many` (array estructurado de NumPy).
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_codecs.py
+"""
+import json
+import time
+
+from pywork.codecs import JSONCodec, StructCodec
+
+COUNT = 100_000
+
+FRAME = StructCodec([("device", "H"), ("seq", "I"), ("temp", "f"), ("status", "B")])
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e3:9.1f} ms  {elapsed / COUNT * 1e9:8.0f} ns/msg")
+
+
+def main():
+    readings = [(i % 5000, i, 20 + (i % 100) / 10, i % 2) for i in range(COUNT)]
+    json_payloads = [json.dumps({"device": d, "seq": s, "temp": t, "status": st}).encode() for d, s, t, st in readings]
+    frames = [FRAME.encode(reading) for reading in readings]
+    codec = JSONCodec()
+    FRAME.decode_many(frames[:1])  # importa NumPy y compila el dtype fuera de la medición
+
+    measure("JSON", lambda: [codec.decode(p) for p in json_payloads])
+    measure("struct (una a una)", lambda: [FRAME.decode(p) for p in frames])
+    measure("struct (lote NumPy)", lambda: FRAME.decode_many(frames))
+    print(f"tamaño medio: JSON {sum(map(len, json_payloads)) / COUNT:.0f} B, trama {FRAME.size} B")
+
+
+if __name__ == "__main__":
+    main()
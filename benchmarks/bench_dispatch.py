@@ -0,0 +1,58 @@
+"""Mide el overhead de despacho de `Framework.route` frente a llamar al handler directamente.
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_dispatch.py
+"""
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from pywork import Framework, LifeCycle
+
+
+class Repository:
+    pass
+
+
+class Service:
+    def __init__(self, repo: Repository):
+        self.repo = repo
+
+
+ITERATIONS = 50_000
+
+
+def make_request(path, path_params):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b"", "path_params": path_params}
+    return Request(scope)
+
+
+async def bench():
+    app = Framework()
+    app.register_dependency(Repository, Repository, LifeCycle.SINGLETON)
+    app.register_dependency(Service, Service, LifeCycle.TRANSIENT)
+
+    async def handler(item_id: int, service: Service):
+        return {"id": item_id}
+
+    app.route("/items/{item_id}")(handler)
+    route_handler = app.routes[-1].endpoint
+    request = make_request("/items/1", {"item_id": "1"})
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await handler(1, Service(Repository()))
+    direct = (time.perf_counter() - start) / ITERATIONS
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await route_handler(request)
+    dispatched = (time.perf_counter() - start) / ITERATIONS
+
+    print(f"llamada directa:        {direct * 1e6:8.2f} µs")
+    print(f"route() + JSONResponse: {dispatched * 1e6:8.2f} µs")
+    print(f"overhead de despacho:   {(dispatched - direct) * 1e6:8.2f} µs/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
@@ -0,0 +1,55 @@
+"""Compara el coste de resolver una ruta con el router de lista de Starlette y con `RadixRouter`
+para tablas de 10, 100 y 1000 rutas (se busca la última ruta registrada, el peor caso de la lista).
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_router.py
+"""
+import asyncio
+import time
+
+from starlette.routing import Route, Router
+
+from pywork.router import RadixRouter
+
+ITERATIONS = 20_000
+
+
+class Endpoint:
+    """App ASGI vacía: se mide solo el coste de encontrar la ruta."""
+
+    async def __call__(self, scope, receive, send):
+        pass
+
+
+endpoint = Endpoint()
+
+
+def make_routes(count):
+    return [Route(f"/api/v1/resource{i}/{{item_id:int}}/details", endpoint, methods=["GET"]) for i in range(count)]
+
+
+async def measure(router, path):
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        scope = {"type": "http", "method": "GET", "path": path, "root_path": "", "headers": [], "query_string": b""}
+        await router(scope, receive, send)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def main():
+    print(f"{'rutas':>6} {'lista (µs)':>12} {'radix (µs)':>12}")
+    for count in (10, 100, 1000):
+        routes = make_routes(count)
+        path = f"/api/v1/resource{count - 1}/42/details"
+        listed = await measure(Router(routes=routes), path)
+        radix = await measure(RadixRouter(routes=routes), path)
+        print(f"{count:>6} {listed * 1e6:12.2f} {radix * 1e6:12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Compara el rendimiento (bytes/s) de serializar respuestas con `JSONResponse` frente a `JSONEncoder`.
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_serialization.py
+"""
+import time
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from pywork.encoders import JSONEncoder, orjson
+
+
+class Reading(BaseModel):
+    device_id: str
+    metric: str
+    value: float
+    ts: int
+
+
+ROWS = 2_000
+ITERATIONS = 200
+
+
+def measure(label, func):
+    size = len(func())
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {size * ITERATIONS / elapsed / 1e6:9.1f} MB/s")
+
+
+def main():
+    dicts = [{"device_id": f"dev-{i}", "metric": "temp", "value": i * 0.5, "ts": 1_700_000_000 + i} for i in range(ROWS)]
+    models = [Reading(**row) for row in dicts]
+
+    measure("JSONResponse(dicts) [actual]", lambda: JSONResponse(dicts).body)
+    measure("JSONResponse(model_dump()) [actual]", lambda: JSONResponse([m.model_dump() for m in models]).body)
+    backends = ["pydantic", "json"] + (["orjson"] if orjson is not None else [])
+    for backend in backends:
+        encoder = JSONEncoder(backend)
+        measure(f"JSONEncoder[{backend}](dicts)", lambda: encoder.encode(dicts))
+        measure(f"JSONEncoder[{backend}](models)", lambda: encoder.encode(models))
+
+
+if __name__ == "__main__":
+    main()
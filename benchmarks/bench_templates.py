@@ -0,0 +1,78 @@
+"""Mide el arranque en frío y la latencia p99 de render de plantillas (apps MVCH).
+
+Compara: sin caché de bytecode / con caché de bytecode, render síncrono completo
+frente al tiempo hasta el primer fragmento con `stream_template`.
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_templates.py
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from pywork.templating import TemplateEngine
+
+TEMPLATES = 40
+RENDERS = 300
+
+PAGE = """{% extends "base.html" %}
+{% block content %}
+<table>
+{% for row in rows %}<tr>{% for col in row %}<td>{{ col|e }}</td>{% endfor %}</tr>{% endfor %}
+</table>
+{% endblock %}
+"""
+BASE = "<html><head><title>{{ title }}</title></head><body>{% block content %}{% endblock %}</body></html>"
+
+
+def make_templates(directory):
+    with open(os.path.join(directory, "base.html"), "w") as fh:
+        fh.write(BASE)
+    for i in range(TEMPLATES):
+        with open(os.path.join(directory, f"page_{i}.html"), "w") as fh:
+            fh.write(PAGE + "{# " + "x" * 2000 + f" {i} #}}")
+
+
+def cold_start(directory, cache_dir):
+    start = time.perf_counter()
+    TemplateEngine(directory, bytecode_cache_dir=cache_dir).precompile()
+    return time.perf_counter() - start
+
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98] * 1e3
+
+
+async def latencies(engine, rows):
+    full, first_byte = [], []
+    for _ in range(RENDERS):
+        start = time.perf_counter()
+        engine.render("page_0.html", title="t", rows=rows)
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        gen = engine.generate("page_0.html", title="t", rows=rows)
+        await gen.__anext__()
+        first_byte.append(time.perf_counter() - start)
+        await gen.aclose()
+    return full, first_byte
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as cache_dir:
+        make_templates(directory)
+        print(f"arranque en frío sin caché de bytecode:   {cold_start(directory, None) * 1e3:8.1f} ms")
+        cold_start(directory, cache_dir)  # llena la caché
+        print(f"arranque en frío con caché de bytecode:   {cold_start(directory, cache_dir) * 1e3:8.1f} ms")
+
+        engine = TemplateEngine(directory, bytecode_cache_dir=cache_dir)
+        engine.precompile()
+        rows = [[f"c{r}-{c}" for c in range(10)] for r in range(2000)]
+        full, first_byte = asyncio.run(latencies(engine, rows))
+        print(f"p99 render completo (bloquea el loop):    {p99(full):8.2f} ms")
+        print(f"p99 primer fragmento en streaming:        {p99(first_byte):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
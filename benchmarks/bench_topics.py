@@ -0,0 +1,40 @@
+"""Compara el reparto de un mensaje MQTT recorriendo la lista de filtros con `topic_matches_sub`
+y con `TopicTrie`, para 100, 1000, 10000 y 50000 filtros registrados.
+
+Uso (con el paquete instalado con `pip install -e .`): python benchmarks/bench_topics.py
+"""
+import time
+
+import paho.mqtt.client as mqtt
+
+from pywork.topics import TopicTrie
+
+ITERATIONS = 200
+
+
+def make_filters(count):
+    return [f"site/{i}/+/sensor/#" for i in range(count)]
+
+
+def measure(match, topic):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        match(topic)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    print(f"{'filtros':>8} {'lista (µs)':>12} {'trie (µs)':>12}")
+    for count in (100, 1000, 10_000, 50_000):
+        filters = make_filters(count)
+        trie = TopicTrie()
+        for topic_filter in filters:
+            trie.add(topic_filter, topic_filter)
+        topic = f"site/{count - 1}/room/sensor/temp"
+        listed = measure(lambda t: [f for f in filters if mqtt.topic_matches_sub(f, t)], topic)
+        tree = measure(trie.match, topic)
+        print(f"{count:>8} {listed * 1e6:12.2f} {tree * 1e6:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
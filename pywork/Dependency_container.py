@@ -1,64 +1,398 @@
 # dependency_container.py
+import asyncio
+import contextvars
 import inspect
 import logging
+import threading
 from enum import Enum
 
+from .pool import InstancePool, dispose
+
 logger = logging.getLogger(__name__)
 
 class LifeCycle(Enum):
     SINGLETON = "singleton"
     SCOPED = "scoped"
     TRANSIENT = "transient"
+    POOLED = "pooled"
+
+
+class _ResolutionPlan:
+    """Plan de resolución compilado para una dependencia registrada."""
+    __slots__ = ("abstract_class", "implementation", "life_cycle", "params", "order", "is_async", "scope_bound",
+                 "factory", "afactory")
+
+    def __init__(self, abstract_class, implementation, life_cycle, params, order, is_async=False, scope_bound=None):
+        self.abstract_class = abstract_class
+        self.implementation = implementation
+        self.life_cycle = life_cycle
+        # Tupla de (nombre_parametro, clase_abstracta) del constructor
+        self.params = params
+        # Orden de resolución: dependencias transitivas primero, la propia clase al final
+        self.order = order
+        # True si la propia fábrica o alguna dependencia transitiva es asíncrona
+        self.is_async = is_async
+        # Clase scoped/pooled de la que depende (ella misma o transitivamente), o None
+        self.scope_bound = scope_bound
+        self.factory = None
+        self.afactory = None
+
+
+class Scope(dict):
+    """Contexto de ámbito: guarda las instancias scoped y las libera al cerrarse."""
+
+    def __init__(self):
+        super().__init__()
+        self._pools = {}
+
+    def lend(self, cls, instance, pool):
+        """Registra una instancia prestada por un pool; se devuelve al cerrar el ámbito."""
+        self[cls] = instance
+        self._pools[cls] = pool
+
+    async def aclose(self):
+        """Libera las instancias en orden inverso de creación (`aclose()` o `close()`)
+        y devuelve a su pool las instancias POOLED."""
+        items = list(self.items())
+        pools = self._pools
+        self.clear()
+        self._pools = {}
+        for cls, instance in reversed(items):
+            pool = pools.get(cls)
+            if pool is not None:
+                await pool.release(instance)
+            else:
+                await dispose(instance)
+
+
+# Ámbito activo de la petición o conexión en curso
+current_scope = contextvars.ContextVar("pywork_scope", default=None)
+
+
+class DependencyScopeMiddleware:
+    """Middleware ASGI que abre un `Scope` por cada petición HTTP o conexión WebSocket."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        di_scope = Scope()
+        token = current_scope.set(di_scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+            await di_scope.aclose()
+
 
 class DependencyContainer:
     def __init__(self):
         self.dependencies = {}
         self.scoped_instances = {}
+        self._plans = {}
+        self._singletons = {}
+        self._pools = {}
+        self._creating = {}  # Creaciones asíncronas en curso (singleton o scoped), una por clave
+        self._retired = []  # Cierres pendientes de pools/singletons invalidados fuera del event loop
+        self._lock = threading.RLock()
 
-    def register(self, abstract_class, implementation_class, life_cycle=LifeCycle.SINGLETON):
-        """Registrar una dependencia en el contenedor."""
-        self.dependencies[abstract_class] = {"class": implementation_class, "life_cycle": life_cycle}
-        logger.debug(f"Registrado: {abstract_class.__name__} -> {implementation_class.__name__} [{life_cycle.value}]")
+    def register(self, abstract_class, implementation_class, life_cycle=LifeCycle.SINGLETON, **pool_options):
+        """Registrar una dependencia en el contenedor.
+
+        Con `LifeCycle.POOLED` acepta `min_size`, `max_size`, `idle_timeout` y `health_check`.
+        """
+        with self._lock:
+            # Invalida los singletons y pools construidos con la registración anterior (y los que dependen de ella)
+            stale = {plan.abstract_class for plan in self._plans.values() if abstract_class in plan.order}
+            stale.add(abstract_class)
+            for cls in stale:
+                instance = self._singletons.pop(cls, _MISSING)
+                if instance is not _MISSING:
+                    self._retire(lambda instance=instance: dispose(instance))
+                pool = self._pools.pop(cls, None)
+                if pool is not None:
+                    pool.closed = True
+                    self._retire(pool.aclose)
+            self._plans.clear()
+            self.dependencies[abstract_class] = {
+                "class": implementation_class, "life_cycle": life_cycle, "options": pool_options,
+            }
+        logger.debug(f"Registrado: {abstract_class.__name__} -> {_name(implementation_class)} [{life_cycle.value}]")
 
     def resolve(self, cls, scoped_context=None):
         """Resuelve una dependencia por su clase."""
+        plan = self._plans.get(cls)
+        if plan is None:
+            plan = self.compile(cls)
+        if scoped_context is None:
+            scoped_context = current_scope.get()
+        return plan.factory(scoped_context)
+
+    async def aresolve(self, cls, scoped_context=None):
+        """Resuelve una dependencia que puede tener fábricas asíncronas."""
+        plan = self._plans.get(cls)
+        if plan is None:
+            plan = self.compile(cls)
+        if scoped_context is None:
+            scoped_context = current_scope.get()
+        if plan.is_async:
+            return await plan.afactory(scoped_context)
+        return plan.factory(scoped_context)
+
+    def compile(self, cls):
+        """Compila (o devuelve del caché) el plan de resolución de una dependencia."""
+        plan = self._plans.get(cls)
+        if plan is None:
+            with self._lock:
+                plan = self._compile(cls, ())
+        return plan
+
+    def _compile(self, cls, stack):
+        plan = self._plans.get(cls)
+        if plan is not None:
+            return plan
+        if cls in stack:
+            cycle = " -> ".join(_name(c) for c in stack + (cls,))
+            raise ValueError(f"Dependencia circular detectada: {cycle}")
         if cls not in self.dependencies:
-            raise ValueError(f"No se ha registrado una implementación para '{cls.__name__}'")
+            raise ValueError(f"No se ha registrado una implementación para '{_name(cls)}'")
 
         dep_info = self.dependencies[cls]
-        implementation_class = dep_info["class"]
+        implementation = dep_info["class"]
         life_cycle = dep_info["life_cycle"]
 
-        # Ciclo de vida Singleton
-        if life_cycle == LifeCycle.SINGLETON:
-            if not hasattr(implementation_class, '_instance'):
-                implementation_class._instance = self._create_instance(implementation_class)
-            return implementation_class._instance
-
-        # Ciclo de vida Scoped
-        elif life_cycle == LifeCycle.SCOPED:
-            if scoped_context is None:
-                raise ValueError("No se ha proporcionado un contexto de ámbito (scoped_context)")
-            if cls not in scoped_context:
-                scoped_context[cls] = self._create_instance(implementation_class)
-            return scoped_context[cls]
-
-        # Ciclo de vida Transient
-        elif life_cycle == LifeCycle.TRANSIENT:
-            return self._create_instance(implementation_class)
-
-    def _create_instance(self, cls):
-        """Crear una instancia de la clase con sus dependencias inyectadas."""
-        constructor_params = inspect.signature(cls.__init__).parameters
-        if not constructor_params:
-            return cls()
+        constructor, is_async = _constructor(implementation)
+        # Los préstamos de un pool pueden esperar, así que siempre se resuelven de forma asíncrona
+        is_async = is_async or life_cycle == LifeCycle.POOLED
+        params = []
+        order = []
+        scope_bound = cls if life_cycle in _SCOPE_BOUND else None
+        if constructor is not None:
+            for name, param in resolved_signature(constructor).parameters.items():
+                if name == "self" or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                    continue
+                dependency = param.annotation
+                if dependency not in self.dependencies:
+                    if param.default is not param.empty:
+                        continue
+                    raise ValueError(
+                        f"No se ha registrado una implementación para '{_name(dependency)}' "
+                        f"(requerida por '{_name(implementation)}.{name}')"
+                    )
+                child = self._compile(dependency, stack + (cls,))
+                # Se comprueba a cualquier profundidad: un transient que depende de un scoped también
+                # quedaría capturado por un singleton
+                if life_cycle in _LONG_LIVED and child.scope_bound is not None:
+                    via = ""
+                    if child.scope_bound is not dependency:
+                        scope_bound_life_cycle = self.dependencies[child.scope_bound]["life_cycle"].value
+                        via = f", que depende de '{_name(child.scope_bound)}' ({scope_bound_life_cycle})"
+                    raise ValueError(
+                        f"'{_name(cls)}' es {life_cycle.value} y no puede depender de "
+                        f"'{_name(dependency)}' ({child.life_cycle.value}){via}"
+                    )
+                params.append((name, child))
+                order.extend(c for c in child.order if c not in order)
+                is_async = is_async or child.is_async
+                if scope_bound is None:
+                    scope_bound = child.scope_bound
+
+        order.append(cls)
+        plan = _ResolutionPlan(cls, implementation, life_cycle, tuple((n, c.abstract_class) for n, c in params),
+                               tuple(order), is_async, scope_bound)
+        self._build_factories(plan, constructor, params)
+        self._plans[cls] = plan
+        return plan
+
+    def _build_factories(self, plan, constructor, params):
+        """Genera las funciones que construyen la instancia según su ciclo de vida."""
+        cls = plan.abstract_class
+        implementation = plan.implementation
+
+        # Instancia registrada directamente: se devuelve tal cual
+        if constructor is None:
+            plan.factory = lambda scope: implementation
+            return
+
+        if plan.is_async:
+            def create(scope):
+                raise ValueError(
+                    f"'{_name(cls)}' tiene una fábrica asíncrona; usar `await container.aresolve(...)`"
+                )
+        elif params:
+            getters = tuple((name, child.factory) for name, child in params)
+
+            def create(scope):
+                return constructor(**{name: factory(scope) for name, factory in getters})
         else:
-            resolved_params = {
-                param: self.resolve(param_type.annotation)
-                for param, param_type in constructor_params.items()
-                if param != 'self'
-            }
-            return cls(**resolved_params)
+            def create(scope):
+                return constructor()
+
+        plan.factory = self._wrap_life_cycle(plan, create)
+        if plan.is_async:
+            children = tuple((name, child) for name, child in params)
+            awaitable = inspect.iscoroutinefunction(constructor)
+
+            async def acreate(scope):
+                kwargs = {}
+                for name, child in children:
+                    kwargs[name] = await child.afactory(scope) if child.is_async else child.factory(scope)
+                if awaitable:
+                    return await constructor(**kwargs)
+                return constructor(**kwargs)
+
+            plan.afactory = self._wrap_life_cycle(plan, acreate, asynchronous=True)
+
+    def _wrap_life_cycle(self, plan, create, asynchronous=False):
+        cls = plan.abstract_class
+
+        if plan.life_cycle == LifeCycle.POOLED:
+            if not asynchronous:
+                return create
+            pool = self._get_pool(cls, lambda: create(None))
+
+            async def apooled(scope):
+                if not isinstance(scope, Scope):
+                    raise ValueError(f"'{_name(cls)}' es pooled y requiere un Scope activo")
+                instance = scope.get(cls, _MISSING)
+                if instance is _MISSING:
+                    instance = await pool.acquire()
+                    scope.lend(cls, instance, pool)
+                return instance
+            return apooled
+
+        if plan.life_cycle == LifeCycle.SINGLETON:
+            singletons = self._singletons
+            lock = self._lock
+
+            if asynchronous:
+                async def asingleton(scope):
+                    instance = singletons.get(cls, _MISSING)
+                    if instance is _MISSING:
+                        instance = await _single_flight(self._creating, cls, singletons, cls, create, scope)
+                    return instance
+                return asingleton
+
+            def singleton(scope):
+                instance = singletons.get(cls, _MISSING)
+                if instance is _MISSING:
+                    with lock:
+                        instance = singletons.get(cls, _MISSING)
+                        if instance is _MISSING:
+                            instance = singletons[cls] = create(scope)
+                return instance
+            return singleton
+
+        if plan.life_cycle == LifeCycle.SCOPED:
+            if asynchronous:
+                async def ascoped(scope):
+                    if scope is None:
+                        raise ValueError("No se ha proporcionado un contexto de ámbito (scoped_context)")
+                    instance = scope.get(cls, _MISSING)
+                    if instance is _MISSING:
+                        instance = await _single_flight(self._creating, (id(scope), cls), scope, cls, create, scope)
+                    return instance
+                return ascoped
+
+            def scoped(scope):
+                if scope is None:
+                    raise ValueError("No se ha proporcionado un contexto de ámbito (scoped_context)")
+                instance = scope.get(cls, _MISSING)
+                if instance is _MISSING:
+                    instance = scope[cls] = create(scope)
+                return instance
+            return scoped
+
+        return create
+
+
+    def _get_pool(self, cls, factory):
+        pool = self._pools.get(cls)
+        if pool is None:
+            pool = self._pools[cls] = InstancePool(factory, name=_name(cls), **self.dependencies[cls]["options"])
+        else:
+            pool.factory = factory
+        return pool
+
+    def pool_stats(self, cls=None):
+        """Métricas de los pools (de uno concreto si se indica `cls`)."""
+        if cls is not None:
+            return self._pools[cls].stats()
+        return {_name(c): pool.stats() for c, pool in self._pools.items()}
+
+    def _retire(self, close):
+        """Libera algo sustituido al re-registrar (`close` es una corrutina sin argumentos): ya mismo si hay
+        event loop o, si no, en `aclose`. Las instancias prestadas por un pool cerrado se liberan al devolverse."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._retired.append(close)
+            return
+        asyncio.ensure_future(close())
+
+    async def aclose(self):
+        """Cierra los pools y libera los singletons creados por el contenedor (al apagar la aplicación)."""
+        pools = list(self._pools.values())
+        retired = self._retired
+        # Orden inverso de creación: los dependientes antes que sus dependencias
+        singletons = list(reversed(self._singletons.values()))
+        self._pools.clear()
+        self._singletons.clear()
+        self._retired = []
+        self._plans.clear()
+        for close in retired:
+            await close()
+        for pool in pools:
+            await pool.aclose()
+        for instance in singletons:
+            await dispose(instance)
+
+
+_MISSING = object()
+_LONG_LIVED = (LifeCycle.SINGLETON, LifeCycle.POOLED)
+_SCOPE_BOUND = (LifeCycle.SCOPED, LifeCycle.POOLED)
+
+
+def _constructor(implementation):
+    """Devuelve (callable que construye la instancia, es_asíncrono) o (None, False) para instancias."""
+    if inspect.isclass(implementation):
+        create = getattr(implementation, "create", None)
+        if create is not None and inspect.iscoroutinefunction(create):
+            return create, True
+        return implementation, False
+    if inspect.iscoroutinefunction(implementation):
+        return implementation, True
+    return None, False
+
+
+async def _single_flight(creating, key, store, cls, create, scope):
+    """Una sola creación asíncrona por clave: las resoluciones concurrentes esperan la misma instancia,
+    así ninguna fábrica se ejecuta dos veces ni queda una instancia huérfana sin liberar."""
+    task = creating.get(key)
+    if task is None:
+        async def build():
+            instance = await create(scope)
+            # Se guarda antes de terminar la tarea: quien llegue después ya la encuentra en `store`
+            return store.setdefault(cls, instance)
+
+        task = creating[key] = asyncio.ensure_future(build())
+        task.add_done_callback(lambda _: creating.pop(key, None))
+    # shield: si quien inició la creación se cancela, los demás siguen esperando el mismo resultado
+    return await asyncio.shield(task)
+
+
+def resolved_signature(func):
+    """`inspect.signature` con las anotaciones evaluadas (módulos con `from __future__ import annotations`)."""
+    try:
+        return inspect.signature(func, eval_str=True)
+    except NameError as e:
+        raise TypeError(f"No se pudieron resolver las anotaciones de '{_name(func)}': {e}") from None
+
+
+def _name(obj):
+    return getattr(obj, "__name__", type(obj).__name__)
 
 # Instancia global del contenedor
 container = DependencyContainer()
@@ -0,0 +1,79 @@
+# assets.py
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+logger = logging.getLogger(__name__)
+
+_MEDIA_TYPES = {
+    "js": "text/javascript; charset=utf-8",
+    "css": "text/css; charset=utf-8",
+}
+
+
+class AssetRegistry:
+    """Registro de assets con nombre fingerprinted por hash de contenido, servidos como `immutable`.
+
+    Es una aplicación ASGI que se monta en `prefix` (por defecto `/assets`).
+    """
+
+    def __init__(self, prefix="/assets", directory=None, max_age=31536000):
+        self.prefix = prefix.rstrip("/")
+        # Si se indica, los assets también se escriben (una sola vez) en disco
+        self.directory = directory
+        self.cache_control = f"public, max-age={max_age}, immutable"
+        self._urls = {}   # (nombre, contenido) -> url
+        self._files = {}  # nombre_fingerprinted -> (bytes, media_type, etag)
+        self._lock = threading.Lock()
+
+    def add(self, content, name, ext="js"):
+        """Registra el contenido y devuelve su URL; contenido repetido es solo una búsqueda en un dict."""
+        key = (name, ext, content)
+        url = self._urls.get(key)
+        if url is not None:
+            return url
+        with self._lock:
+            url = self._urls.get(key)
+            if url is None:
+                data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                filename = f"{name}.{digest[:12]}.{ext}"
+                self._files[filename] = (data, _MEDIA_TYPES.get(ext, "application/octet-stream"), f'"{digest}"')
+                if self.directory:
+                    self._write(filename, data)
+                url = self._urls[key] = f"{self.prefix}/{filename}"
+                logger.debug(f"Asset registrado: {url}")
+        return url
+
+    def script_tag(self, content, name):
+        return f'<script src="{self.add(content, name, "js")}"></script>'
+
+    def _write(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Escritura atómica: otros procesos nunca ven un fichero a medio escribir
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".asset-")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    async def __call__(self, scope, receive, send):
+        filename = scope["path"].rsplit("/", 1)[-1]
+        asset = self._files.get(filename)
+        if asset is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            data, media_type, etag = asset
+            headers = {"cache-control": self.cache_control, "etag": etag}
+            if Request(scope).headers.get("if-none-match") == etag:
+                response = Response(status_code=304, headers=headers)
+            else:
+                response = Response(data, media_type=media_type, headers=headers)
+        await response(scope, receive, send)
@@ -0,0 +1,101 @@
+# auth.py
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Coste aproximado en bytes de una entrada del caché, además del propio token
+_ENTRY_OVERHEAD = 512
+
+
+class TokenVerifier:
+    """Verifica tokens JWT y cachea los claims ya verificados (LRU acotado por entradas y bytes)."""
+
+    def __init__(self, key="secret", algorithms=("HS256",), jwks_path=None, audience=None, issuer=None,
+                 max_entries=10_000, max_bytes=16 * 1024 * 1024, default_ttl=300):
+        self.key = key
+        self.algorithms = list(algorithms)
+        self.jwks_path = jwks_path
+        self.audience = audience
+        self.issuer = issuer
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Tiempo máximo en caché para tokens sin `exp`
+        self.default_ttl = default_ttl
+        self._cache = OrderedDict()  # digest -> (claims, permisos, expira_en, tamaño)
+        self._bytes = 0
+        self._jwks = None
+        self._jwks_mtime = None
+        self.hits = 0
+        self.misses = 0
+        if jwks_path:
+            self.reload_jwks()
+
+    def verify(self, token):
+        """Devuelve `(claims, permisos)` del token; lanza `JWTError` si no es válido."""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        entry = self._cache.get(digest)
+        if entry is not None:
+            if entry[2] > time.time():
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return entry[0], entry[1]
+            self._evict(digest)
+
+        # python-jose se importa solo cuando hay que verificar de verdad (fallo de caché)
+        from jose import jwt
+        self.misses += 1
+        claims = jwt.decode(token, self._key_for(token), algorithms=self.algorithms,
+                            audience=self.audience, issuer=self.issuer,
+                            options={"verify_aud": self.audience is not None})
+        permissions = frozenset(claims.get("permissions", ()))
+        expires_at = claims.get("exp", time.time() + self.default_ttl)
+        self._store(digest, (claims, permissions, expires_at, len(token) + _ENTRY_OVERHEAD))
+        return claims, permissions
+
+    def clear(self):
+        """Vacía el caché de tokens verificados."""
+        self._cache.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._cache), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def reload_jwks(self):
+        """Carga (o recarga) el fichero JWKS local, indexando las claves por `kid`."""
+        with open(self.jwks_path, "r", encoding="utf-8") as fh:
+            jwks = json.load(fh)
+        self._jwks = {key.get("kid"): key for key in jwks.get("keys", [])}
+        self._jwks_mtime = os.path.getmtime(self.jwks_path)
+        logger.debug(f"JWKS cargado desde {self.jwks_path}: {len(self._jwks)} claves")
+
+    def _key_for(self, token):
+        if self._jwks is None:
+            return self.key
+        from jose import JWTError, jwt
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._jwks.get(kid)
+        if key is None and os.path.getmtime(self.jwks_path) != self._jwks_mtime:
+            # Rotación de claves: solo se relee el fichero si cambió en disco
+            self.reload_jwks()
+            key = self._jwks.get(kid)
+        if key is None:
+            raise JWTError(f"Clave desconocida: {kid}")
+        return key
+
+    def _store(self, digest, entry):
+        self._evict(digest)
+        self._cache[digest] = entry
+        self._bytes += entry[3]
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._cache.popitem(last=False)
+            self._bytes -= old[3]
+
+    def _evict(self, digest):
+        old = self._cache.pop(digest, None)
+        if old is not None:
+            self._bytes -= old[3]
@@ -0,0 +1,147 @@
+# cache.py
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Coste aproximado en bytes de una entrada, además del body y las cabeceras
+_ENTRY_OVERHEAD = 256
+
+
+class CachedResponse:
+    """Respuesta ya calculada: body, cabeceras y ETag."""
+    __slots__ = ("body", "status_code", "headers", "etag", "expires_at", "size")
+
+    def __init__(self, body, status_code, headers, etag, expires_at):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = etag
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers) + _ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """Caché de respuestas en memoria: TTL, LRU acotado por bytes, single-flight y GET condicional."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Peticiones en curso por clave: las concurrentes esperan el mismo resultado
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self._evict(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+
+    def invalidate(self, path=None):
+        """Invalida todas las entradas, o solo las de un path."""
+        for key in [k for k in self._entries if path is None or k[1] == path]:
+            self._evict(key)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                "misses": self.misses, "coalesced": self.coalesced}
+
+    def cached(self, endpoint, ttl, vary=()):
+        """Envuelve un endpoint de Starlette para cachear sus respuestas GET/HEAD."""
+        vary = tuple(header.lower() for header in vary)
+
+        async def cached_endpoint(request):
+            if request.method not in ("GET", "HEAD"):
+                return await endpoint(request)
+            headers = request.headers
+            key = (request.method, request.url.path, request.url.query, tuple(headers.get(h) for h in vary))
+
+            entry = self.get(key)
+            if entry is not None:
+                self.hits += 1
+                return _respond(entry, headers)
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # Otra petición ya está recalculando esta clave
+                self.coalesced += 1
+                entry = await asyncio.shield(future)
+                if entry is not None:
+                    return _respond(entry, headers)
+                return await endpoint(request)
+
+            self.misses += 1
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            entry = None
+            try:
+                response = await endpoint(request)
+                entry = _snapshot(response, ttl)
+                if entry is None:
+                    return response
+                if entry.status_code == 200:
+                    self.put(key, entry)
+                return _respond(entry, headers)
+            finally:
+                del self._inflight[key]
+                future.set_result(entry)
+
+        return cached_endpoint
+
+    def _evict(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+
+def _snapshot(response, ttl):
+    """Convierte una respuesta con body completo en entrada de caché (None si es streaming)."""
+    body = getattr(response, "body", None)
+    if body is None:
+        return None
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = [(k, v) for k, v in response.raw_headers if k != b"etag"]
+    return CachedResponse(body, response.status_code, headers, etag, time.monotonic() + ttl)
+
+
+def _respond(entry, request_headers):
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and entry.status_code == 200 and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers={"etag": entry.etag})
+    response = Response(status_code=entry.status_code)
+    response.body = entry.body
+    response.raw_headers = entry.headers + [(b"etag", entry.etag.encode("latin-1"))]
+    return response
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,199 @@
+# codecs.py
+import abc
+import collections
+import json
+import logging
+import re
+import struct
+
+from .encoders import JSONEncoder, orjson
+from .topics import TopicTrie, split_shared
+
+logger = logging.getLogger(__name__)
+
+# Formato de `struct` -> tipo de NumPy
+_NUMPY_TYPES = {
+    "b": "i1", "B": "u1", "?": "?", "h": "i2", "H": "u2", "i": "i4", "I": "u4", "l": "i4", "L": "u4",
+    "q": "i8", "Q": "u8", "e": "f2", "f": "f4", "d": "f8",
+}
+_FIELD_FORMAT = re.compile(r"^(\d*)([a-zA-Z?])$")
+
+
+class Codec(abc.ABC):
+    """Convierte payloads MQTT en valores y viceversa."""
+
+    @abc.abstractmethod
+    def decode(self, payload):
+        """Payload recibido (bytes o memoryview) -> valor."""
+
+    @abc.abstractmethod
+    def encode(self, value):
+        """Valor -> payload a publicar."""
+
+
+class RawCodec(Codec):
+    """Deja el payload tal cual (bytes al recibir; paho convierte str/int/float al publicar)."""
+
+    def decode(self, payload):
+        return payload
+
+    def encode(self, value):
+        return value
+
+
+class TextCodec(Codec):
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+
+    def decode(self, payload):
+        return bytes(payload).decode(self.encoding)
+
+    def encode(self, value):
+        return value.encode(self.encoding)
+
+
+class JSONCodec(Codec):
+    def __init__(self, encoder=None):
+        self.encoder = encoder or JSONEncoder()
+        self._loads = orjson.loads if orjson is not None else json.loads
+
+    def decode(self, payload):
+        return self._loads(payload)
+
+    def encode(self, value):
+        return self.encoder.encode(value)
+
+
+class StructCodec(Codec):
+    """Tramas binarias de formato fijo, compiladas una vez a partir de un esquema.
+
+    `fields` es una lista de `(nombre, formato_struct)`, p. ej. `[("device", "H"), ("temp", "f")]`;
+    un campo repetido (`"3f"`) es una tupla de 3 valores y `"8s"` un único campo de bytes.
+    `decode` lee directamente del buffer (bytes o memoryview, sin copiarlo) y devuelve una namedtuple;
+    `decode_many` / `decode_frames` desempaquetan muchas tramas de una vez en un array estructurado de NumPy.
+    """
+
+    def __init__(self, fields, byte_order="<", name="Frame"):
+        if byte_order not in "<>!=":
+            raise ValueError(f"Orden de bytes no válido: {byte_order}")
+        self.fields = list(fields)
+        formats = []
+        # Por campo: posición en los valores desempaquetados y nº de valores si es repetido (None si es escalar)
+        self._layout = []
+        position = 0
+        for _, fmt in self.fields:
+            match = _FIELD_FORMAT.match(fmt)
+            if not match or (fmt[-1] not in _NUMPY_TYPES and fmt[-1] != "s"):
+                raise ValueError(f"Formato de campo no soportado: {fmt}")
+            formats.append(fmt)
+            count = int(match.group(1) or 1)
+            repeated = count if fmt[-1] != "s" and count > 1 else None
+            self._layout.append((position, repeated))
+            position += repeated or 1
+        self._grouped = any(repeated for _, repeated in self._layout)
+        # Sin relleno entre campos (`<`, `>`, `!`, `=`), igual que un dtype estructurado empaquetado
+        self.struct = struct.Struct(byte_order + "".join(formats))
+        self.size = self.struct.size
+        self.type = collections.namedtuple(name, [field for field, _ in self.fields])
+        self._unpack = self.struct.unpack
+        self._byte_order = "<" if byte_order == "<" else ">" if byte_order in ">!" else "="
+        self._dtype = None
+
+    @property
+    def dtype(self):
+        """dtype estructurado de NumPy equivalente (se importa NumPy solo si se usa)."""
+        if self._dtype is None:
+            import numpy as np
+            columns = []
+            for field, fmt in self.fields:
+                count, code = _FIELD_FORMAT.match(fmt).groups()
+                if code == "s":
+                    columns.append((field, f"S{count or 1}"))
+                elif count and int(count) > 1:
+                    columns.append((field, self._byte_order + _NUMPY_TYPES[code], (int(count),)))
+                else:
+                    columns.append((field, self._byte_order + _NUMPY_TYPES[code]))
+            self._dtype = np.dtype(columns)
+        return self._dtype
+
+    def decode(self, payload):
+        try:
+            values = self._unpack(payload)
+        except struct.error:
+            raise ValueError(f"Trama de {len(payload)} bytes; se esperaban {self.size}") from None
+        if self._grouped:
+            values = [values[start] if repeated is None else values[start:start + repeated]
+                      for start, repeated in self._layout]
+        # tuple.__new__ evita el coste de `_make` al construir la namedtuple
+        return tuple.__new__(self.type, values)
+
+    def encode(self, value):
+        if isinstance(value, dict):
+            value = [value[field] for field, _ in self.fields]
+        if self._grouped:
+            flat = []
+            for item, (_, repeated) in zip(value, self._layout):
+                if repeated is None:
+                    flat.append(item)
+                elif len(item) != repeated:
+                    raise ValueError(f"Se esperaban {repeated} valores y llegaron {len(item)}")
+                else:
+                    flat.extend(item)
+            value = flat
+        return self.struct.pack(*value)
+
+    def decode_frames(self, buffer):
+        """Interpreta un buffer con N tramas consecutivas como array estructurado, sin copiarlo."""
+        import numpy as np
+        return np.frombuffer(buffer, dtype=self.dtype)
+
+    def decode_many(self, payloads):
+        """Desempaqueta una trama por payload en un único array estructurado (una sola copia)."""
+        return self.decode_frames(b"".join(payloads))
+
+
+class CodecRegistry:
+    """Codec por filtro de tópicos; gana el filtro más específico (más niveles literales).
+
+    Sin coincidencia se usa `default`: por defecto el payload crudo, para que un bridge sin codecs no
+    pague ninguna búsqueda por mensaje; `JSONCodec()` (p. ej. `MQTTBridge(default_codec=JSONCodec())`)
+    decodifica como JSON todo lo que no tenga un codec propio.
+    """
+
+    def __init__(self, default=None, cache_size=65536):
+        self.default = default or RawCodec()
+        self._trie = TopicTrie()
+        self._cache = {}
+        self.cache_size = cache_size
+        self._order = 0
+
+    def __len__(self):
+        return len(self._trie)
+
+    @property
+    def active(self):
+        """Hay algo que decodificar: algún codec registrado o un default distinto del crudo."""
+        return bool(len(self._trie)) or type(self.default) is not RawCodec
+
+    def register(self, topic_filter, codec):
+        levels = split_shared(topic_filter)[1].split("/")
+        specificity = sum(level not in ("+", "#") for level in levels)
+        self._order += 1
+        self._trie.add(topic_filter, (specificity, -self._order, codec))
+        self._cache.clear()
+
+    def lookup(self, topic):
+        codec = self._cache.get(topic)
+        if codec is None:
+            matches = self._trie.match(topic)
+            codec = max(matches, key=lambda m: m[:2])[2] if matches else self.default
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[topic] = codec
+        return codec
+
+    def decode(self, topic, payload):
+        return self.lookup(topic).decode(payload)
+
+    def encode(self, topic, value):
+        return self.lookup(topic).encode(value)
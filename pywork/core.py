@@ -1,36 +1,83 @@
-from authlib.integrations.starlette_client import OAuth
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import JSONResponse, HTMLResponse
 from starlette.routing import Route, WebSocketRoute
 from starlette.applications import Starlette
 from starlette.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
-from jose import JWTError, jwt
-import uvicorn
 import os
+import inspect
+import json
 import asyncio
 from pydantic import ValidationError
-from jinja2 import Environment, FileSystemLoader
-from .Dependency_container import container, LifeCycle 
+from starlette.concurrency import run_in_threadpool
+from .Dependency_container import container, LifeCycle, DependencyScopeMiddleware
+from .handlers import BODY_METHODS, PayloadTooLarge, analyze_handler, read_body
+from .auth import TokenVerifier
+from .assets import AssetRegistry
+from .cache import ResponseCache
+from .encoders import JSONEncoder, json_response
+from .streaming import STREAM_FORMATS, negotiate_stream_format, stream_response
+from .static_files import MemoryStaticFiles
+from .router import RadixRouter
+from .hub import SLOW_CONSUMER_POLICIES, Hub
+from .logs import AccessLogMiddleware, configure_logging
+from .topics import split_shared, validate_filter
 from functools import wraps
+from contextlib import asynccontextmanager
 import logging
-import paho.mqtt.client as mqtt  
 
 from starlette.responses import JSONResponse, Response 
 
-# Configuración del logger
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class Framework:
-    def __init__(self):
+    def __init__(self, router="list", debug=False):
+        if router not in ("list", "radix"):
+            raise ValueError(f"Router desconocido: {router}")
         self.routes = []
-        self.template_env = Environment(loader=FileSystemLoader('templates'))
-        self.oauth = OAuth()  
+        self.router = router  # "list" (Starlette) o "radix" (árbol compilado, para tablas de rutas grandes)
+        self.debug = debug  # Tracebacks en las respuestas de error: solo en desarrollo
+        self.log_pipeline = None  # Ver configure_logging; `run` instala uno por defecto
+        self.access_log = False
+        # OAuth (authlib), plantillas (Jinja2), JWT (python-jose), MQTT (paho) y el servidor (uvicorn)
+        # se importan e inicializan en el primer uso: `import pywork` solo paga por Starlette y el routing
+        self._templates = None
+        self._oauth = None
         self.providers = {}  
         self.mqtt_clients = {}  
+        self.mqtt_bridges = {}
+        self._default_mqtt = None  # Primer puente conectado, destino de las llamadas sin client_id
+        self.mqtt_topics = []  # Handlers de @mqtt_topic declarados antes de mqtt_connect
+        self.message_logs = []  # MessageLog de mqtt_record (un directorio por worker en modo pre-fork)
+        self.token_verifier = TokenVerifier()
+        self.max_body_size = 10 * 1024 * 1024  # Tamaño máximo por defecto del body (bytes)
+        self.json_encoder = JSONEncoder()
+        self.response_cache = ResponseCache()
+        self.assets = AssetRegistry()
+        self.static_dir = "pywork/static"
+        self.static_files = None
+        self.hub = Hub(self.json_encoder)  # Pub/sub por canales sobre WebSockets
+        self.startup_hooks = []
+        self.shutdown_hooks = [self.hub.close, container.aclose]
         logger.debug("Framework inicializado")
 
+    @property
+    def oauth(self):
+        if self._oauth is None:
+            from authlib.integrations.starlette_client import OAuth
+            self._oauth = OAuth()
+        return self._oauth
+
+    @property
+    def templates(self):
+        if self._templates is None:
+            from .templating import TemplateEngine
+            self._templates = TemplateEngine('templates')
+        return self._templates
+
+    @property
+    def template_env(self):
+        return self.templates.env
+
     # Configurar OAuth con un proveedor
     def setup_oauth(self, provider_name, client_id, client_secret, authorize_url, token_url):
         """Configurar un proveedor OAuth"""
@@ -55,68 +102,142 @@ class Framework:
         return user_info
 
     # Registrar dependencias
-    def register_dependency(self, abstract_class, implementation_class, life_cycle=LifeCycle.SINGLETON):
-        container.register(abstract_class, implementation_class, life_cycle)
+    def register_dependency(self, abstract_class, implementation_class, life_cycle=LifeCycle.SINGLETON, **pool_options):
+        container.register(abstract_class, implementation_class, life_cycle, **pool_options)
 
     # Obtener dependencias
     def get_dependency(self, abstract_class):
         return container.resolve(abstract_class)
 
+    # Métricas de los pools de dependencias (LifeCycle.POOLED)
+    def get_pool_stats(self, abstract_class=None):
+        return container.pool_stats(abstract_class)
+
     # Inyectar dependencias automáticamente
     def inject(self, func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            for param_name, param_type in func.__annotations__.items():
-                if param_type in container.dependencies:
-                    kwargs[param_name] = container.resolve(param_type)
-            return await func(*args, **kwargs)
+        plan = analyze_handler(func)
+
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                async for item in func(*args, **await plan.resolve_dependencies(kwargs, args=args)):
+                    yield item
+        else:
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await func(*args, **await plan.resolve_dependencies(kwargs, args=args))
+        wrapper.plan = plan
         return wrapper
 
 
     # En el método `route` del Framework
-    def route(self, path: str, methods: list = ["GET"]):
+    def route(self, path: str, methods: list = ["GET"], max_body_size=None, stream=None, cache=None):
+        """Registra un handler. Los handlers generadores se envían en streaming como
+        NDJSON, CSV o SSE (`stream=` fijo o negociado por la cabecera Accept).
+
+        `cache=segundos` o `cache={"ttl": segundos, "vary": [cabeceras]}` cachea las respuestas GET.
+        """
+        if stream is not None and stream not in STREAM_FORMATS:
+            raise ValueError(f"Formato de streaming desconocido: {stream}")
+        cache_options = {"ttl": cache} if isinstance(cache, (int, float)) else cache
+
         def decorator(func):
-            func = self.inject(func)
+            plan = analyze_handler(func, path)
+            is_generator = plan.is_generator
+            body_methods = frozenset(m for m in methods if m in BODY_METHODS) if plan.body_param else frozenset()
+            body_param = plan.body_param
+            body_limit = max_body_size or self.max_body_size
+            request_param, path_params = plan.request_param, plan.path_params
 
             async def route_handler(request):
                 try:
-                    if "POST" in methods and request.method == "POST":
-                        body = await request.json()
-                        validated_data = func.__annotations__.get("data", None)
-                        if validated_data:
-                            body = validated_data(**body)
-                        response = await func(data=body)
-                    else:
-                        response = await func()
+                    kwargs = {}
+                    if request.method in body_methods:
+                        kwargs[body_param] = await plan.read_data(request, body_limit)
+                    if request_param:
+                        kwargs[request_param] = request
+                    if path_params:
+                        values = request.path_params
+                        for name, converter in path_params:
+                            try:
+                                kwargs[name] = converter(values[name]) if converter else values[name]
+                            except ValueError:
+                                return JSONResponse({"error": f"Parámetro de ruta inválido: {name}"}, status_code=400)
+                    if is_generator:
+                        gen = func(**await plan.resolve_dependencies(kwargs))
+                        fmt = stream or negotiate_stream_format(request.headers.get("accept"))
+                        return stream_response(gen, fmt, self.json_encoder)
+                    response = await func(**await plan.resolve_dependencies(kwargs))
 
                   
                     if isinstance(response, Response):
                         return response  # Retorna directamente si es JSONResponse o HTMLResponse
                     else:
-                        return JSONResponse(response)  # Envuelve el diccionario en JSONResponse si es necesario
+                        return json_response(response, self.json_encoder)  # Serializa directamente a bytes JSON
                 except ValidationError as e:
-                    return JSONResponse({"error": e.errors()}, status_code=400)
+                    return JSONResponse({"error": json.loads(e.json())}, status_code=400)
+                except PayloadTooLarge as e:
+                    return JSONResponse({"error": str(e)}, status_code=413)
                 except Exception as e:
-                    logger.error(f"Error en la ruta {path}: {str(e)}")
+                    logger.error("Error en la ruta %s: %s", path, e)
                     return JSONResponse({"error": str(e)}, status_code=500)
 
-            self.routes.append(Route(path, route_handler, methods=methods))
+            endpoint = route_handler
+            if cache_options:
+                endpoint = self.response_cache.cached(route_handler, **cache_options)
+            endpoint.plan = plan
+            self.routes.append(Route(path, endpoint, methods=methods))
             logger.debug(f"Ruta {methods} registrada: {path}")
-            return func
+            return self.inject(func)
         return decorator
 
 
+    # Configurar el subsistema de plantillas
+    def configure_templates(self, directory="templates", bytecode_cache_dir=None, precompile=False,
+                            enable_async=False, **options):
+        """Configura Jinja2: caché de bytecode persistente, precompilación al arrancar y render asíncrono."""
+        from .templating import TemplateEngine
+        self._templates = TemplateEngine(directory, bytecode_cache_dir, enable_async, **options)
+        if precompile:
+            async def precompile_templates():
+                await run_in_threadpool(self.templates.precompile)
+            self.startup_hooks.append(precompile_templates)
+        return self.templates
+
     # Renderizar plantillas usando Jinja2
     def render_template(self, template_name, **context):
-        template = self.template_env.get_template(template_name)
-        return template.render(**context)
-
-    # Usar scripts dinámicos en plantillas
+        return self.templates.render(template_name, **context)
+
+    # Renderizar sin bloquear el event loop
+    async def render_template_async(self, template_name, **context):
+        return await self.templates.render_async(template_name, **context)
+
+    # Respuesta HTML en streaming (generate_async)
+    def stream_template(self, template_name, status_code=200, **context):
+        return self.templates.stream(template_name, status_code, **context)
+
+    # Configurar archivos estáticos en memoria (mvch_mode)
+    def configure_static(self, directory="pywork/static", in_memory=True, preload=True, **options):
+        """Sirve `/static` desde memoria con variantes gzip y respuestas condicionales (ETag/Last-Modified)."""
+        self.static_dir = directory
+        self.static_files = MemoryStaticFiles(directory, **options) if in_memory else None
+        if self.static_files is not None and preload:
+            static_files = self.static_files
+
+            async def preload_static():
+                if os.path.isdir(static_files.directory):
+                    await run_in_threadpool(static_files.preload)
+            self.startup_hooks.append(preload_static)
+        return self.static_files
+
+    # Invalidar los estáticos en memoria (tras un despliegue o desde un watcher)
+    def reload_static(self, path=None):
+        if self.static_files is not None:
+            self.static_files.reload(path)
+
+    # Usar scripts dinámicos en plantillas (servidos desde el registro de assets con hash de contenido)
     def use_script(self, script_content, script_name):
-        script_path = f"pywork/static/{script_name}.js"
-        with open(script_path, "w") as script_file:
-            script_file.write(script_content)
-        return f'<script src="/static/{script_name}.js"></script>'
+        return self.assets.script_tag(script_content, script_name)
 
     # Registrar WebSocket
     def websocket(self, path: str):
@@ -130,6 +251,29 @@ class Framework:
             return func
         return decorator
 
+    def configure_hub(self, queue_size=256, slow_consumer="drop"):
+        """Tamaño de la cola por conexión y política para clientes lentos (`drop` o `disconnect`)."""
+        if slow_consumer not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Política desconocida para consumidores lentos: {slow_consumer}")
+        self.hub.queue_size = queue_size
+        self.hub.slow_consumer = slow_consumer
+        return self.hub
+
+    def hub_route(self, path, channels=(), client_subscriptions=True):
+        """Endpoint WebSocket conectado al hub.
+
+        Suscribe a `channels` y al parámetro de ruta `{channel}` si existe; con `client_subscriptions`
+        el cliente puede enviar `{"subscribe": "canal"}` / `{"unsubscribe": "canal"}`.
+        """
+        async def hub_endpoint(websocket):
+            subscribed = list(channels)
+            if "channel" in websocket.path_params:
+                subscribed.append(websocket.path_params["channel"])
+            await self.hub.serve(websocket, subscribed, client_subscriptions)
+
+        self.routes.append(WebSocketRoute(path, hub_endpoint))
+        logger.debug(f"Canal WebSocket registrado en {path}")
+
     # Configurar CORS
     def add_cors(self, app, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]):
         app.add_middleware(
@@ -162,8 +306,17 @@ class Framework:
             }
         return openapi_schema
 
+    # Configurar la verificación de tokens JWT
+    def configure_jwt(self, key="secret", algorithms=("HS256",), jwks_path=None, **options):
+        """Configura claves/algoritmos JWT (HS256, RS256 con JWKS local, ...) y el caché de tokens."""
+        self.token_verifier = TokenVerifier(key, algorithms, jwks_path=jwks_path, **options)
+        return self.token_verifier
+
     def token_required(self, required_permissions=None):
         """Middleware que valida el token JWT y permisos opcionales."""
+        from jose import JWTError
+        required = frozenset(required_permissions or ())
+
         def decorator(func):
             @wraps(func)
             async def wrapper(request, *args, **kwargs):
@@ -172,18 +325,19 @@ class Framework:
                     return JSONResponse({"error": "Token faltante"}, status_code=401)
 
                 try:
-                    token = token.split(" ")[1]
-                    payload = jwt.decode(token, "secret", algorithms=["HS256"])
+                    scheme, _, token = token.partition(" ")
+                    if not token:
+                        raise JWTError("Cabecera Authorization mal formada")
+                    payload, permissions = self.token_verifier.verify(token)
                     request.state.user = payload["sub"]
-                    request.state.permissions = payload.get("permissions", [])
+                    request.state.claims = payload
+                    request.state.permissions = permissions
 
                     # Verifica los permisos
-                    if required_permissions:
-                        user_permissions = set(request.state.permissions)
-                        if not user_permissions.issuperset(set(required_permissions)):
-                            return JSONResponse({"error": "Permisos insuficientes"}, status_code=403)
+                    if required and not required <= permissions:
+                        return JSONResponse({"error": "Permisos insuficientes"}, status_code=403)
 
-                except JWTError:
+                except (JWTError, KeyError):
                     return JSONResponse({"error": "Token inválido"}, status_code=401)
 
                 # Llama a la función decorada pasando el request
@@ -202,7 +356,7 @@ class Framework:
             async def route_handler(request):
                 try:
                     if "POST" in methods and request.method == "POST":
-                        body = await request.json()
+                        body = json.loads(await read_body(request, self.max_body_size))
                         response = await func(request, body)
                     else:
                         response = await func(request)
@@ -210,10 +364,12 @@ class Framework:
                     # Verificar si la respuesta es una instancia de Response (como JSONResponse)
                     if isinstance(response, Response):
                         return response
-                    return JSONResponse(response)
+                    return json_response(response, self.json_encoder)
                     
+                except PayloadTooLarge as e:
+                    return JSONResponse({"error": str(e)}, status_code=413)
                 except Exception as e:
-                    logger.error(f"Error en la ruta {path}: {str(e)}")
+                    logger.error("Error en la ruta %s: %s", path, e)
                     return JSONResponse({"error": str(e)}, status_code=500)
 
             self.routes.append(Route(path, route_handler, methods=methods))
@@ -223,57 +379,192 @@ class Framework:
 
 
     # Soporte para MQTT (Protocolo de Comunicación IoT)
-    def mqtt_connect(self, broker_url, broker_port, on_message_callback, client_id=None):
-        """Conectar al servidor MQTT"""
-        def on_connect(client, userdata, flags, rc):
-            logger.debug(f"Conectado al broker MQTT con código {rc}")
-            client.subscribe("#")  # Suscribirse a todos los tópicos
+    def mqtt_connect(self, broker_url, broker_port, on_message_callback=None, client_id=None, **options):
+        """Conectar al servidor MQTT.
+
+        Los mensajes pasan del hilo de paho al event loop de la app (`MQTTBridge`); la conexión se
+        abre al arrancar la aplicación o al llamar a `start_mqtt_loop`.
+        """
+        from .mqtt import MQTTBridge
+        bridge = MQTTBridge(broker_url, broker_port, client_id=client_id, **options)
+        name = client_id or broker_url
+        self.mqtt_bridges[name] = bridge
+        self.mqtt_clients[name] = bridge.client
+        if self._default_mqtt is None:
+            self._default_mqtt = bridge
+        self.startup_hooks.append(bridge.start)
+        self.shutdown_hooks.append(bridge.stop)
+
+        pending = []
+        for topic_filter, handler, qos, target, handler_options in self.mqtt_topics:
+            if target is None or target == name:
+                bridge.subscribe(topic_filter, handler, qos, **handler_options)
+            else:
+                pending.append((topic_filter, handler, qos, target, handler_options))
+        self.mqtt_topics = pending
+
+        if on_message_callback is not None:
+            if inspect.iscoroutinefunction(on_message_callback):
+                handler = on_message_callback
+            else:
+                # Callback clásico de paho `(client, userdata, msg)`, ahora ejecutado en el event loop
+                async def handler(message):
+                    on_message_callback(bridge.client, None, message)
+            bridge.subscribe("#", handler)
+        return bridge
+
+    def mqtt_subscribe(self, topic_filter, handler, qos=0, client_id=None, **options):
+        """Suscribe un handler `async def handler(message)` con cola acotada y concurrencia configurable"""
+        return self._mqtt_bridge(client_id).subscribe(topic_filter, handler, qos, **options)
+
+    def mqtt_topic(self, topic_filter, qos=0, client_id=None, **options):
+        """Decorador para manejar los mensajes de un filtro de tópicos (`+`, `#`, `$share/<grupo>/...`).
+
+        Se puede usar antes o después de `mqtt_connect`; el cliente solo se suscribe a los filtros registrados.
+        Con `shared=True` y varios workers, cada mensaje lo procesa un solo worker (`$share/<grupo>/...`).
+        """
+        def decorator(func):
+            if self.mqtt_bridges and (client_id is None or client_id in self.mqtt_bridges):
+                self._mqtt_bridge(client_id).subscribe(topic_filter, func, qos, **options)
+            else:
+                if not inspect.iscoroutinefunction(func):
+                    raise TypeError("Los handlers MQTT deben ser `async def`")
+                validate_filter(split_shared(topic_filter)[1])
+                self.mqtt_topics.append((topic_filter, func, qos, client_id, options))
+            logger.debug(f"Handler MQTT registrado: {topic_filter}")
+            return func
+        return decorator
+
+    def mqtt_record(self, log, topic_filter="#", client_id=None, **options):
+        """Guarda en un `MessageLog` los mensajes crudos de un filtro; el log se vacía y cierra con la app."""
+        subscription = log.attach(self._mqtt_bridge(client_id), topic_filter, **options)
+        self.message_logs.append(log)
+        self.startup_hooks.append(log.start)
+        self.shutdown_hooks.append(log.stop)
+        return subscription
 
-        def on_disconnect(client, userdata, rc):
-            logger.warning(f"Desconexión del broker MQTT con código {rc}")
+    def mqtt_to_channel(self, topic_filter, channel=None, client_id=None, **options):
+        """Reenvía un filtro MQTT a un canal del hub (`channel` admite niveles del tópico: `devices/{1}`)."""
+        return self.hub.bridge_mqtt(self._mqtt_bridge(client_id), topic_filter, channel, **options)
 
-        client = mqtt.Client(client_id)
-        client.on_connect = on_connect
-        client.on_message = on_message_callback
-        client.on_disconnect = on_disconnect
+    def mqtt_stats(self, client_id=None):
+        """Contadores del puente MQTT (colas, descartes, lag)"""
+        return self._mqtt_bridge(client_id).stats()
 
-        client.connect(broker_url, broker_port, 60)
-        self.mqtt_clients[client_id or broker_url] = client
+    def _mqtt_bridge(self, client_id=None):
+        if client_id is not None:
+            return self.mqtt_bridges[client_id]
+        if self._default_mqtt is None:
+            raise RuntimeError("No hay ninguna conexión MQTT; llama antes a mqtt_connect")
+        return self._default_mqtt
 
-    def mqtt_publish(self, topic, payload, qos=0, retain=False, client_id=None):
-        """Publicar un mensaje a un tópico MQTT"""
-        client = self.mqtt_clients.get(client_id or list(self.mqtt_clients.keys())[0])
-        if client:
-            client.publish(topic, payload, qos, retain)
+    async def mqtt_publish(self, topic, payload, qos=0, retain=False, client_id=None, coalesce=False):
+        """Publicar un mensaje a un tópico MQTT.
+
+        Solo espera si la cola de salida está llena; devuelve un futuro que indica la entrega.
+        """
+        return await self._mqtt_bridge(client_id).publish(topic, payload, qos, retain, coalesce)
 
     def start_mqtt_loop(self, client_id=None):
         """Iniciar el loop del cliente MQTT"""
-        client = self.mqtt_clients.get(client_id or list(self.mqtt_clients.keys())[0])
-        if client:
-            client.loop_start()
+        self._mqtt_bridge(client_id).connect()
     # Ejecutar el servidor
     def get_app(self, mvch_mode=False):
         """Configurar y devolver la aplicación de Starlette"""
         logger.debug("Configurando la aplicación de Starlette")
-        app = Starlette(debug=True, routes=self.routes)
+        app = Starlette(debug=self.debug, routes=self.routes, lifespan=self.lifespan)
+        if self.router == "radix":
+            app.router = RadixRouter(routes=self.routes, lifespan=self.lifespan)
 
         # Si estamos en MVCH, monta archivos estáticos
         if mvch_mode:
-            static_dir = "pywork/static"
+            static_dir = self.static_dir
             if os.path.exists(static_dir):
-                app.mount("/static", StaticFiles(directory=static_dir), name="static")
+                if self.static_files is not None:
+                    app.mount("/static", self.static_files, name="static")
+                else:
+                    app.mount("/static", StaticFiles(directory=static_dir), name="static")
                 logger.debug(f"Carpeta estática montada: {static_dir}")
             else:
                 logger.warning(f"Carpeta estática no encontrada: {static_dir}. No se montará.")
 
-        # Añadir CORS y sesión en cualquier modo
+        # Assets registrados con use_script (nombre con hash, cacheables como immutable)
+        app.mount(self.assets.prefix, self.assets, name="assets")
+
+        # Añadir CORS y sesión en cualquier modo (itsdangerous se importa al construir la app)
+        from starlette.middleware.sessions import SessionMiddleware
         self.add_cors(app)
         app.add_middleware(SessionMiddleware, secret_key="supersecret")  # Middleware de sesión
+        app.add_middleware(DependencyScopeMiddleware)  # Ámbito de dependencias por petición/conexión
+        if self.access_log:
+            app.add_middleware(AccessLogMiddleware)  # El más externo: mide la petición completa
 
         return app  # Devuelve la instancia de la aplicación
 
-    def run(self, mvch_mode=False):
-        """Inicia el servidor usando Uvicorn"""
+    @asynccontextmanager
+    async def lifespan(self, app):
+        """Ejecuta los hooks de arranque y apagado de la aplicación.
+
+        El apagado va en orden inverso al registro: los puentes MQTT y el log terminan sus workers antes
+        de que el contenedor cierre pools y singletons.
+        """
+        for hook in self.startup_hooks:
+            await hook()
+        try:
+            yield
+        finally:
+            for hook in reversed(self.shutdown_hooks):
+                try:
+                    await hook()
+                except Exception:
+                    logger.exception("Error en el hook de apagado %s", getattr(hook, "__qualname__", hook))
+
+    # Logs del framework
+    def configure_logging(self, level=None, json=False, access_log=True, **options):
+        """Logs en segundo plano: los handlers escriben desde un hilo detrás de una cola, con salida en
+        texto o JSON, muestreo de los eventos por mensaje MQTT y, con `access_log`, una línea por petición
+        (`pywork.access`) con `duration_ms`, `ttfb_ms`, `status` y `bytes`."""
+        if self.log_pipeline is not None:
+            self.log_pipeline.stop()
+        if level is None:
+            level = logging.DEBUG if self.debug else logging.INFO
+        self.log_pipeline = configure_logging(level, json, **options)
+        self.access_log = access_log
+        return self.log_pipeline
+
+    def run(self, mvch_mode=False, host="127.0.0.1", port=8000, workers=1, mqtt_shared_group="pywork", **options):
+        """Inicia el servidor usando Uvicorn (por defecto un solo proceso, para desarrollo)"""
+        from .server import serve
+        if self.log_pipeline is None:
+            self.configure_logging()
+        # Con el access log propio se desactiva el de uvicorn, que escribe en el event loop
+        options.setdefault("access_log", not self.access_log)
         app = self.get_app(mvch_mode)
-        logger.debug("Ejecutando el servidor en 127.0.0.1:8000")
-        uvicorn.run(app, host="127.0.0.1", port=8000)
+        logger.debug(f"Ejecutando el servidor en {host}:{port} con {workers} worker(s)")
+        on_worker_start = None
+        if workers > 1:
+            def on_worker_start(worker_id):
+                self._prepare_worker(worker_id, mqtt_shared_group)
+        serve(app, host, port, workers, on_worker_start=on_worker_start, **options)
+
+    def serve(self, mvch_mode=False, host="0.0.0.0", port=8000, workers=None, **options):
+        """Modo producción: un worker por CPU (pre-fork sobre un socket compartido).
+
+        Opciones: `backlog`, `keepalive`, `limit_concurrency`, `graceful_timeout`, `loop`/`http`
+        (`auto` usa uvloop/httptools si están instalados) y `mqtt_shared_group`: cada worker abre su
+        propia conexión MQTT con un client_id único y recibe todos los mensajes de sus suscripciones,
+        salvo las registradas con `shared=True`, que usan `$share/<grupo>/...` para que cada mensaje
+        lo procese un solo worker. Cada `MessageLog` de `mqtt_record` escribe en `<directorio>/worker-<id>`.
+        """
+        self.run(mvch_mode, host, port, workers or os.cpu_count() or 1, **options)
+
+    def _prepare_worker(self, worker_id, shared_group=None):
+        """Se ejecuta en cada worker tras el fork, antes de arrancar su event loop."""
+        if self.log_pipeline is not None:
+            self.log_pipeline.after_fork()
+        for name, bridge in self.mqtt_bridges.items():
+            bridge.configure_worker(worker_id, shared_group)
+            self.mqtt_clients[name] = bridge.client
+        for log in self.message_logs:
+            log.configure_worker(worker_id)
+        logger.debug("Worker %s preparado (pid %s)", worker_id, os.getpid())
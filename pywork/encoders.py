@@ -0,0 +1,83 @@
+# encoders.py
+import json
+import logging
+
+import pydantic_core
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Backend opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class JSONEncoder:
+    """Serializa los valores devueltos por los handlers directamente a bytes JSON.
+
+    Backends: `orjson` (si está instalado), `pydantic` (pydantic_core) o `json` (stdlib).
+    Los modelos pydantic y las listas de modelos se serializan siempre con su serializador compilado.
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = "orjson" if orjson is not None else "pydantic"
+        if backend == "orjson" and orjson is None:
+            raise ValueError("El backend 'orjson' requiere instalar orjson")
+        if backend not in ("orjson", "pydantic", "json"):
+            raise ValueError(f"Backend JSON desconocido: {backend}")
+        self.backend = backend
+        self._hooks = {}
+        self._list_adapters = {}
+        self._dumps = getattr(self, f"_dumps_{backend}")
+        logger.debug(f"Encoder JSON: {backend}")
+
+    def register(self, type_, func):
+        """Registra una función que convierte instancias de `type_` a un valor serializable."""
+        self._hooks[type_] = func
+
+    def encode(self, obj):
+        """Devuelve `obj` serializado como bytes JSON."""
+        if isinstance(obj, BaseModel):
+            return obj.__pydantic_serializer__.to_json(obj)
+        if type(obj) is list and obj and isinstance(obj[0], BaseModel):
+            model = type(obj[0])
+            if all(type(item) is model for item in obj):
+                return self._list_adapter(model).dump_json(obj)
+        return self._dumps(obj)
+
+    def _list_adapter(self, model):
+        adapter = self._list_adapters.get(model)
+        if adapter is None:
+            adapter = self._list_adapters[model] = TypeAdapter(list[model])
+        return adapter
+
+    def _default(self, obj):
+        hook = self._hooks.get(type(obj))
+        if hook is None:
+            for type_, func in self._hooks.items():
+                if isinstance(obj, type_):
+                    hook = func
+                    break
+        if hook is not None:
+            return hook(obj)
+        if isinstance(obj, BaseModel):
+            return obj.model_dump(mode="json")
+        # Tipos nativos de pydantic_core: dataclasses, datetimes, UUID, Decimal, Enum, ...
+        return json.loads(pydantic_core.to_json(obj))
+
+    def _dumps_orjson(self, obj):
+        return orjson.dumps(obj, default=self._default, option=orjson.OPT_NON_STR_KEYS)
+
+    def _dumps_pydantic(self, obj):
+        return pydantic_core.to_json(obj, fallback=self._default if self._hooks else None)
+
+    def _dumps_json(self, obj):
+        return json.dumps(obj, default=self._default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(content, encoder, status_code=200):
+    """Construye una respuesta JSON a partir de bytes ya serializados."""
+    return Response(encoder.encode(content), status_code=status_code, media_type="application/json")
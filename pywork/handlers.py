@@ -0,0 +1,124 @@
+# handlers.py
+import inspect
+import logging
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from starlette.routing import compile_path
+
+from .Dependency_container import container, current_scope, resolved_signature
+
+logger = logging.getLogger(__name__)
+
+# Tipos que nunca se resuelven desde el contenedor
+_PRIMITIVES = (str, int, float, bool, bytes, dict, list, tuple, set)
+
+# Métodos HTTP cuyo body se valida y se pasa al handler
+BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+class PayloadTooLarge(Exception):
+    """El body de la petición supera el tamaño máximo permitido."""
+
+
+async def read_body(request, max_size=None):
+    """Lee el body crudo cortando la lectura en cuanto supera `max_size` bytes."""
+    if max_size is not None:
+        length = request.headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > max_size:
+            raise PayloadTooLarge(f"El body supera el máximo de {max_size} bytes")
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if max_size is not None and received > max_size:
+            raise PayloadTooLarge(f"El body supera el máximo de {max_size} bytes")
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+class HandlerPlan:
+    """Análisis de la firma de un handler, calculado una sola vez al decorarlo."""
+    __slots__ = ("func", "body_param", "body_model", "body_adapter", "request_param", "path_params", "injectables",
+                 "positional", "is_generator")
+
+    def __init__(self, func, body_param=None, body_model=None, request_param=None, path_params=(), injectables=(),
+                 positional=()):
+        self.func = func
+        # Nombre y modelo del parámetro que recibe el body (por convención `data`)
+        self.body_param = body_param
+        self.body_model = body_model
+        # Validador compilado una vez: valida el body directamente desde los bytes JSON
+        self.body_adapter = TypeAdapter(body_model if body_model is not None else Any) if body_param else None
+        # Nombre del parámetro que recibe el `Request`
+        self.request_param = request_param
+        # Tupla de (nombre, conversor o None) para los parámetros de ruta
+        self.path_params = path_params
+        # Tupla de (nombre, clase, tiene_default) a resolver desde el contenedor
+        self.injectables = injectables
+        # Nombres de los parámetros que se pueden pasar por posición, en orden
+        self.positional = positional
+        # Los handlers generadores (sync o async) se envían en streaming
+        self.is_generator = inspect.isasyncgenfunction(func) or inspect.isgeneratorfunction(func)
+
+    async def read_data(self, request, max_size=None):
+        """Lee y valida el body sin pasar por un dict intermedio."""
+        return self.body_adapter.validate_json(await read_body(request, max_size))
+
+    async def resolve_dependencies(self, kwargs, scoped_context=None, args=()):
+        """Completa `kwargs` con las dependencias del contenedor (en el ámbito de la petición).
+
+        Los parámetros ya recibidos (por nombre o en `args` por posición) y los tipos no registrados
+        en el contenedor se dejan tal cual.
+        """
+        dependencies = container.dependencies
+        if scoped_context is None:
+            scoped_context = current_scope.get()
+        given = self.positional[:len(args)]
+        for name, dependency, _ in self.injectables:
+            if name in kwargs or name in given or dependency not in dependencies:
+                continue
+            plan = container.compile(dependency)
+            if plan.is_async:
+                kwargs[name] = await plan.afactory(scoped_context)
+            else:
+                kwargs[name] = plan.factory(scoped_context)
+        return kwargs
+
+
+def analyze_handler(func, path=None):
+    """Analiza la firma de `func` y devuelve su `HandlerPlan`."""
+    signature = resolved_signature(func)
+    route_params = {}
+    if path is not None:
+        route_params = compile_path(path)[2]
+
+    body_param = body_model = request_param = None
+    path_params = []
+    injectables = []
+    positional = tuple(name for name, param in signature.parameters.items()
+                       if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD))
+    for name, param in signature.parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        annotation = param.annotation
+        if name in route_params:
+            # Starlette ya convierte `{id:int}`; `{id}` con anotación numérica se convierte aquí
+            converter = None
+            if annotation in (int, float) and type(route_params[name]).__name__ == "StringConvertor":
+                converter = annotation
+            path_params.append((name, converter))
+        elif name == "data":
+            body_param = name
+            body_model = annotation if annotation is not param.empty else None
+        elif name == "request" or (inspect.isclass(annotation) and issubclass(annotation, Request)):
+            request_param = name
+        elif annotation is not param.empty and annotation not in _PRIMITIVES:
+            injectables.append((name, annotation, param.default is not param.empty))
+
+    plan = HandlerPlan(func, body_param, body_model, request_param, tuple(path_params), tuple(injectables),
+                       positional)
+    logger.debug(f"Plan de handler {func.__name__}: body={body_param} request={request_param} "
+                 f"path={[n for n, _ in path_params]} inject={[n for n, _, _ in injectables]}")
+    return plan
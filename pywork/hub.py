@@ -0,0 +1,192 @@
+# hub.py
+import asyncio
+import json
+import logging
+
+from starlette.websockets import WebSocketDisconnect
+
+from .encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop", "disconnect")
+
+
+class Connection:
+    """WebSocket suscrito al hub, con su cola de envío acotada y su tarea escritora."""
+    __slots__ = ("websocket", "queue", "channels", "writer", "sent", "dropped", "closed")
+
+    def __init__(self, websocket, queue_size):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(queue_size)
+        self.channels = set()
+        self.writer = None
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+
+
+class Hub:
+    """Pub/sub sobre WebSockets por canales con nombre.
+
+    Cada mensaje se serializa una sola vez y el mismo mensaje ASGI se encola en todas las conexiones
+    del canal; cada conexión tiene su cola acotada y su propia tarea que escribe en el socket, de modo
+    que un cliente lento no frena a los demás. Con la cola llena se aplica `slow_consumer`:
+    `drop` descarta el mensaje más antiguo de esa conexión y `disconnect` la cierra.
+    """
+
+    def __init__(self, encoder=None, queue_size=256, slow_consumer="drop"):
+        if slow_consumer not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Política desconocida para consumidores lentos: {slow_consumer}")
+        self.encoder = encoder or JSONEncoder()
+        self.queue_size = queue_size
+        self.slow_consumer = slow_consumer
+        self.channels = {}  # canal -> set(Connection)
+        self.connections = set()
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    # --- Conexiones ---
+
+    def connect(self, websocket):
+        """Registra un WebSocket ya aceptado y arranca su tarea escritora."""
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.ensure_future(self._writer(connection))
+        self.connections.add(connection)
+        return connection
+
+    def _detach(self, connection):
+        """Saca la conexión de todos los canales; devuelve False si ya estaba fuera."""
+        if connection.closed:
+            return False
+        connection.closed = True
+        self.connections.discard(connection)
+        for channel in connection.channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.channels[channel]
+        connection.channels.clear()
+        return True
+
+    async def disconnect(self, connection, code=1000):
+        self._detach(connection)
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+            await asyncio.gather(connection.writer, return_exceptions=True)
+        try:
+            await connection.websocket.close(code)
+        except Exception:
+            pass  # el socket ya estaba cerrado
+
+    def subscribe(self, connection, channel):
+        if connection.closed:
+            return
+        self.channels.setdefault(channel, set()).add(connection)
+        connection.channels.add(channel)
+
+    def unsubscribe(self, connection, channel):
+        connection.channels.discard(channel)
+        subscribers = self.channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.channels[channel]
+
+    async def _writer(self, connection):
+        queue = connection.queue
+        send = connection.websocket.send
+        try:
+            while True:
+                message = await queue.get()
+                await send(message)
+                connection.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("Conexión del hub cerrada al enviar: %s", e)
+            await self.disconnect(connection)
+
+    # --- Publicación ---
+
+    def publish(self, channel, data):
+        """Envía `data` a los suscriptores del canal sin esperar a ningún socket; devuelve cuántos lo reciben."""
+        subscribers = self.channels.get(channel)
+        if not subscribers:
+            return 0
+        text = self.encoder.encode({"channel": channel, "data": data}).decode("utf-8")
+        message = {"type": "websocket.send", "text": text}
+        delivered = 0
+        for connection in list(subscribers):
+            queue = connection.queue
+            if queue.full():
+                connection.dropped += 1
+                self.dropped += 1
+                if self.slow_consumer == "disconnect":
+                    if self._detach(connection):
+                        self.disconnected += 1
+                        asyncio.ensure_future(self.disconnect(connection, code=1008))
+                    continue
+                queue.get_nowait()
+            queue.put_nowait(message)
+            delivered += 1
+        self.published += 1
+        return delivered
+
+    # --- Endpoint y puente MQTT ---
+
+    async def serve(self, websocket, channels=(), client_subscriptions=True):
+        """Atiende un WebSocket: lo suscribe a `channels` y, si se permite, a lo que pida el cliente
+        con mensajes `{"subscribe": "canal"}` / `{"unsubscribe": "canal"}`."""
+        await websocket.accept()
+        connection = self.connect(websocket)
+        for channel in channels:
+            self.subscribe(connection, channel)
+        try:
+            while True:
+                text = await websocket.receive_text()
+                if not client_subscriptions:
+                    continue
+                try:
+                    command = json.loads(text)
+                except ValueError:
+                    continue
+                if not isinstance(command, dict):
+                    continue
+                if isinstance(command.get("subscribe"), str):
+                    self.subscribe(connection, command["subscribe"])
+                if isinstance(command.get("unsubscribe"), str):
+                    self.unsubscribe(connection, command["unsubscribe"])
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            await self.disconnect(connection)
+
+    def bridge_mqtt(self, bridge, topic_filter, channel=None, **options):
+        """Reenvía los mensajes de un filtro MQTT a un canal.
+
+        `channel` admite los niveles del tópico como `{0}`, `{1}`...; sin él, el canal es el propio tópico.
+        """
+        async def forward(message):
+            value = message.value
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = bytes(value).decode("utf-8", errors="replace")
+            name = channel.format(*message.topic.split("/")) if channel else message.topic
+            self.publish(name, value)
+
+        return bridge.subscribe(topic_filter, forward, **options)
+
+    async def close(self):
+        for connection in list(self.connections):
+            await self.disconnect(connection, code=1001)
+
+    def stats(self):
+        return {
+            "connections": len(self.connections),
+            "channels": len(self.channels),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
@@ -1,41 +1,195 @@
-import paho.mqtt.client as mqtt
 import asyncio
+import inspect
+
+from .liveness import LivenessTracker
+from .mqtt import MQTTBridge
+from .rpc import RPCClient
 
 class IoTModule:
-    def __init__(self):
+    def __init__(self, telemetry_capacity=1024, heartbeat_timeout=30.0):
+        self.app = None
+        self.mqtt = None  # MQTTBridge
         self.mqtt_client = None
         self.devices = {}
+        # La telemetría usa NumPy (extra `iot`); el almacén se crea solo si se usa
+        self.telemetry_capacity = telemetry_capacity
+        self._telemetry = None
+        # Asigna `iot.liveness.on_online` / `on_offline` (async) para reaccionar a los cambios de estado
+        self.liveness = LivenessTracker(heartbeat_timeout)
+        self.rpc = None
+
+    @property
+    def telemetry(self):
+        if self._telemetry is None:
+            from .telemetry import TelemetryStore
+            self._telemetry = TelemetryStore(self.telemetry_capacity)
+        return self._telemetry
 
     # Configuración de MQTT
-    def setup_mqtt(self, broker_url, broker_port=1883):
-        """Inicializa el cliente MQTT para la comunicación con dispositivos."""
-        self.mqtt_client = mqtt.Client()
-        self.mqtt_client.connect(broker_url, broker_port, 60)
-        self.mqtt_client.loop_start()
+    def setup_mqtt(self, broker_url, broker_port=1883, app=None, **options):
+        """Inicializa el cliente MQTT para la comunicación con dispositivos.
+
+        Con `app` se reutiliza la conexión del framework (y su ciclo de vida); si no, hay que
+        llamar a `await iot.start()` desde el event loop para empezar a entregar mensajes.
+        Las `options` van al `MQTTBridge` (p. ej. `default_codec=JSONCodec()` para decodificar como JSON
+        los tópicos sin codec registrado).
+        """
+        if app is not None:
+            self.app = app
+            self.mqtt = app.mqtt_connect(broker_url, broker_port, **options)
+        else:
+            self.mqtt = MQTTBridge(broker_url, broker_port, **options)
+            self.mqtt.connect()
+        self.mqtt_client = self.mqtt.client
+        return self.mqtt
+
+    async def start(self):
+        await self.mqtt.start(connect=False)
+        await self.liveness.start()
+
+    async def stop(self):
+        await self.liveness.stop()
+        await self.mqtt.stop()
+
+    def mqtt_subscribe(self, topic, callback, **options):
+        """Suscripción a un tópico MQTT para recibir datos de dispositivos.
+
+        El callback recibe `(tópico, valor)`: el payload decodificado por el codec del tópico o,
+        sin codec, el texto UTF-8.
+        """
+        is_async = inspect.iscoroutinefunction(callback)
 
-    def mqtt_subscribe(self, topic, callback):
-        """Suscripción a un tópico MQTT para recibir datos de dispositivos."""
-        def on_message(client, userdata, msg):
-            callback(msg.topic, msg.payload.decode('utf-8'))
+        async def handler(message):
+            value = message.value
+            if isinstance(value, bytes):
+                value = value.decode('utf-8')
+            result = callback(message.topic, value)
+            if is_async:
+                await result
 
-        self.mqtt_client.subscribe(topic)
-        self.mqtt_client.on_message = on_message
+        return self.mqtt.subscribe(topic, handler, **options)
 
-    def mqtt_publish(self, topic, payload):
+    def register_codec(self, topic_filter, codec):
+        """Codec (`StructCodec`, `JSONCodec`, ...) para los payloads de un filtro de tópicos."""
+        self.mqtt.register_codec(topic_filter, codec)
+
+    async def mqtt_publish(self, topic, payload, qos=0, retain=False, coalesce=False):
         """Publica datos en un tópico MQTT, enviando comandos a dispositivos."""
-        self.mqtt_client.publish(topic, payload)
+        return await self.mqtt.publish(topic, payload, qos, retain, coalesce)
+
+    # Comandos con respuesta (RPC)
+    def configure_rpc(self, request_topic="devices/{device_id}/rpc", **options):
+        """Configura los tópicos y el timeout por defecto de `call` (ver `RPCClient`)."""
+        self.rpc = RPCClient(self.mqtt, request_topic, **options)
+        return self.rpc
+
+    async def call(self, device_id, method, params=None, timeout=None):
+        """Envía un comando al dispositivo y espera su respuesta (`RPCTimeout` / `RPCError` si falla)."""
+        if self.rpc is None:
+            self.configure_rpc()
+        return await self.rpc.call(device_id, method, params, timeout)
+
+    async def call_many(self, device_ids, method, params=None, timeout=None, concurrency=100):
+        """Comando a muchos dispositivos; devuelve resultados parciales (excepción por dispositivo fallido)."""
+        if self.rpc is None:
+            self.configure_rpc()
+        return await self.rpc.call_many(device_ids, method, params, timeout, concurrency)
+
+    # Telemetría
+    def track_telemetry(self, topic_filter, device_level=1, metric_level=-1, parse=float, **options):
+        """Guarda en `self.telemetry` las lecturas de un filtro de tópicos.
+
+        El dispositivo y la métrica salen de los niveles del tópico (p. ej. `plant/<device>/<metric>`)
+        y el valor de `parse(valor decodificado)`.
+        """
+        telemetry = self.telemetry
+
+        async def handler(message):
+            levels = message.topic.split("/")
+            telemetry.record(levels[device_level], levels[metric_level], parse(message.value), message.timestamp)
 
-    def register_device(self, device_id, device_info):
+        return self.mqtt.subscribe(topic_filter, handler, **options)
+
+    def telemetry_routes(self, app, path="/telemetry"):
+        """Registra en `app` las rutas de consulta de telemetría.
+
+        - `GET {path}/{metric}?start=&end=&devices=a,b&percentiles=50,95`: agregados por dispositivo.
+        - `GET {path}/{metric}/{device_id}?start=&end=&buckets=`: serie (o medias por intervalo).
+        """
+        from .telemetry import to_json
+        telemetry = self.telemetry
+
+        @app.route(f"{path}/{{metric}}", methods=["GET"])
+        async def telemetry_aggregate(metric: str, request):
+            query = request.query_params
+            devices = query.get("devices")
+            percentiles = [float(p) for p in query.get("percentiles", "").split(",") if p]
+            result = telemetry.aggregate(metric, _float(query.get("start")), _float(query.get("end")),
+                                         devices.split(",") if devices else None, percentiles)
+            return to_json(result)
+
+        @app.route(f"{path}/{{metric}}/{{device_id}}", methods=["GET"])
+        async def telemetry_series(metric: str, device_id: str, request):
+            query = request.query_params
+            start, end = _float(query.get("start")), _float(query.get("end"))
+            buckets = query.get("buckets")
+            if buckets:
+                timestamps, values = telemetry.downsample(device_id, metric, start, end, int(buckets))
+            else:
+                timestamps, values = telemetry.series(device_id, metric, start, end)
+            return to_json({"timestamps": timestamps, "values": values})
+
+    # Persistencia
+    def record_messages(self, log, topic_filter="#", **options):
+        """Guarda en un `MessageLog` los mensajes crudos que llegan por `topic_filter`."""
+        return log.attach(self.mqtt, topic_filter, **options)
+
+    async def backfill_telemetry(self, log, start=None, end=None, topic_filter="#", device_level=1, metric_level=-1,
+                                 parse=float):
+        """Reconstruye `self.telemetry` a partir del log (p. ej. tras reiniciar)."""
+        telemetry = self.telemetry
+        codecs = self.mqtt.codecs if self.mqtt is not None else None
+        await log.flush_async()
+        count = 0
+        for message in log.replay(start, end, topic_filter, flush=False):
+            levels = message.topic.split("/")
+            value = codecs.decode(message.topic, message.payload) if codecs is not None else message.payload
+            telemetry.record(levels[device_level], levels[metric_level], parse(value), message.timestamp)
+            count += 1
+            if count % 10_000 == 0:
+                await asyncio.sleep(0)
+        return count
+
+    # Estado de los dispositivos
+    def track_liveness(self, topic_filter, device_level=1, **options):
+        """Cada mensaje de `topic_filter` cuenta como heartbeat del dispositivo del nivel `device_level`."""
+        liveness = self.liveness
+
+        async def handler(message):
+            liveness.seen(message.topic.split("/")[device_level])
+
+        if self.app is not None:
+            self.app.startup_hooks.append(liveness.start)
+            self.app.shutdown_hooks.append(liveness.stop)
+        return self.mqtt.subscribe(topic_filter, handler, **options)
+
+    def device_counts(self):
+        """Dispositivos online/offline (O(1))."""
+        return self.liveness.counts()
+
+    def register_device(self, device_id, device_info, heartbeat_timeout=None):
         """Registra un nuevo dispositivo IoT en el sistema."""
         self.devices[device_id] = device_info
+        self.liveness.register(device_id, heartbeat_timeout)
 
     def get_device_info(self, device_id):
         """Devuelve información de un dispositivo IoT específico."""
         return self.devices.get(device_id, "Dispositivo no registrado")
 
     async def monitor_devices(self):
-        """Monitorea los dispositivos registrados en intervalos regulares."""
-        while True:
-            for device_id, info in self.devices.items():
-                print(f"Monitoreando dispositivo: {device_id} -> {info}")
-            await asyncio.sleep(5)  # Monitoreo cada 5 segundos
+        """Vigila los vencimientos de heartbeat; solo despierta cuando algún dispositivo puede caducar."""
+        await self.liveness.run()
+
+
+def _float(value):
+    return float(value) if value not in (None, "") else None
@@ -0,0 +1,135 @@
+# liveness.py
+import asyncio
+import heapq
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LivenessTracker:
+    """Estado online/offline de dispositivos a partir de sus mensajes (heartbeats).
+
+    Los vencimientos se agrupan en ranuras de `resolution` segundos (por defecto `timeout / 10`, como
+    mucho 1 s): cada heartbeat mueve el dispositivo a la ranura de su nuevo vencimiento (O(1)) y el heap
+    solo guarda ranuras. Al vencer una ranura todos sus dispositivos pasan a offline de una vez, así que
+    el barrido toca únicamente los dispositivos que caducan y hay como mucho un despertar por ranura, no
+    por dispositivo. Un dispositivo puede pasar a offline hasta `resolution` segundos tarde. Los
+    contadores online/offline son O(1).
+    """
+
+    def __init__(self, timeout=30.0, on_online=None, on_offline=None, resolution=None):
+        self.timeout = timeout
+        self.resolution = resolution if resolution is not None else min(1.0, timeout / 10)
+        # Callbacks `async def callback(device_id)`
+        self.on_online = on_online
+        self.on_offline = on_offline
+        self._last_seen = {}  # device_id -> instante monotónico (None: registrado, nunca visto)
+        self._timeouts = {}  # device_id -> timeout propio
+        self._online = set()
+        self._heap = []  # Índices de ranura, una entrada por ranura creada
+        self._slots = {}  # índice de ranura -> dispositivos que vencen en ella
+        self._slot_of = {}  # device_id -> índice de su ranura
+        self._wakeup = asyncio.Event()
+        self._callbacks = set()
+        self._task = None
+        self.transitions = 0
+
+    def register(self, device_id, timeout=None):
+        """Da de alta un dispositivo (offline hasta su primer mensaje) con un timeout opcional propio."""
+        self._last_seen.setdefault(device_id, None)
+        if timeout is not None:
+            self._timeouts[device_id] = timeout
+
+    def seen(self, device_id, now=None):
+        """Registra un heartbeat en O(1): mueve el dispositivo a la ranura de su nuevo vencimiento."""
+        now = time.monotonic() if now is None else now
+        self._last_seen[device_id] = now
+        if device_id not in self._online:
+            self._online.add(device_id)
+            self.transitions += 1
+            self._notify(self.on_online, device_id)
+        # Se redondea hacia arriba: la ranura nunca vence antes que el dispositivo
+        slot = math.ceil((now + self._timeouts.get(device_id, self.timeout)) / self.resolution)
+        previous = self._slot_of.get(device_id)
+        if previous == slot:
+            return
+        if previous is not None:
+            self._slots[previous].discard(device_id)
+        devices = self._slots.get(slot)
+        if devices is None:
+            devices = self._slots[slot] = set()
+            heapq.heappush(self._heap, slot)
+            if self._heap[0] == slot:
+                self._wakeup.set()
+        devices.add(device_id)
+        self._slot_of[device_id] = slot
+
+    def expire(self, now=None):
+        """Marca offline los dispositivos de las ranuras vencidas y devuelve sus ids."""
+        now = time.monotonic() if now is None else now
+        heap = self._heap
+        expired = []
+        while heap and heap[0] * self.resolution <= now:
+            # Los que renovaron su heartbeat ya se movieron a otra ranura: aquí solo quedan vencidos
+            for device_id in self._slots.pop(heapq.heappop(heap)):
+                del self._slot_of[device_id]
+                self._online.discard(device_id)
+                self.transitions += 1
+                expired.append(device_id)
+                self._notify(self.on_offline, device_id)
+        return expired
+
+    def _notify(self, callback, device_id):
+        if callback is None:
+            return
+        task = asyncio.ensure_future(callback(device_id))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Error en el callback de liveness: %s", task.exception())
+
+    # --- Consultas O(1) ---
+
+    def is_online(self, device_id):
+        return device_id in self._online
+
+    def last_seen(self, device_id):
+        return self._last_seen.get(device_id)
+
+    @property
+    def online_count(self):
+        return len(self._online)
+
+    @property
+    def offline_count(self):
+        return len(self._last_seen) - len(self._online)
+
+    def counts(self):
+        return {"online": self.online_count, "offline": self.offline_count, "transitions": self.transitions}
+
+    # --- Ciclo de vida ---
+
+    async def run(self):
+        """Duerme hasta la próxima ranura (o hasta que aparezca una más cercana) y la procesa."""
+        while True:
+            self._wakeup.clear()
+            self.expire()
+            delay = self._heap[0] * self.resolution - time.monotonic() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
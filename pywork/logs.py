@@ -0,0 +1,201 @@
+# logs.py
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+from .encoders import JSONEncoder
+
+# Atributos propios de LogRecord; el resto (los de `extra=`) son los campos estructurados del evento
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_samplers = []
+
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por evento: `ts`, `level`, `logger`, `message` y los campos pasados con `extra=`."""
+
+    def __init__(self, encoder=None):
+        super().__init__()
+        self.encoder = encoder or JSONEncoder()
+
+    def format(self, record):
+        event = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                event[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            event["exc_info"] = record.exc_text
+        return self.encoder.encode(event).decode("utf-8")
+
+
+class SamplingFilter(logging.Filter):
+    """Muestreo de eventos de alta frecuencia (p. ej. un aviso por mensaje MQTT).
+
+    Por cada plantilla de mensaje pasan los `burst` primeros eventos de cada intervalo de `interval`
+    segundos y, a partir de ahí, uno de cada `every`; el evento que pasa lleva en `sampled` cuántos
+    se descartaron desde el anterior. La clave es la plantilla (`record.msg`), no el texto formateado,
+    así que no se formatea nada para decidir.
+    """
+
+    def __init__(self, every=100, burst=10, interval=1.0):
+        super().__init__()
+        self.configure(every, burst, interval)
+        self._windows = {}  # (logger, plantilla) -> [inicio_intervalo, vistos, descartados]
+
+    def configure(self, every=100, burst=10, interval=1.0):
+        self.every = max(1, every)
+        self.burst = burst
+        self.interval = interval
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            window = self._windows[key] = [now, 0, window[2] if window else 0]
+            if len(self._windows) > 1024:
+                self._windows = {key: window}
+        window[1] += 1
+        seen = window[1]
+        if seen > self.burst and (seen - self.burst) % self.every:
+            window[2] += 1
+            return False
+        if window[2]:
+            record.sampled = window[2]
+            window[2] = 0
+        return True
+
+
+def sampled_logger(name):
+    """Logger `<name>.messages` para eventos por mensaje, con muestreo (ajustable en `configure_logging`)."""
+    logger = logging.getLogger(f"{name}.messages")
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        sampler = SamplingFilter()
+        logger.addFilter(sampler)
+        _samplers.append(sampler)
+    return logger
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # El QueueHandler estándar formatea el mensaje en el hilo que registra; aquí solo se deja el registro
+    # en la cola y el formateo (argumentos %-style incluidos) ocurre en el hilo del listener
+    def prepare(self, record):
+        if record.exc_info:
+            # El traceback se renderiza aquí: los frames no deben cruzar de hilo
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """Handlers del framework detrás de una cola: el event loop solo encola registros y un hilo
+    (QueueListener) los formatea y escribe."""
+
+    def __init__(self, handlers, loggers=("pywork",), level=logging.INFO):
+        self.handlers = list(handlers)
+        self.loggers = [logging.getLogger(name) for name in loggers]
+        self.level = level
+        self.queue = queue.SimpleQueue()
+        self.handler = _QueueHandler(self.queue)
+        self.listener = None
+        self._pid = None
+
+    def start(self):
+        for logger in self.loggers:
+            logger.addHandler(self.handler)
+            logger.setLevel(self.level)
+            logger.propagate = False
+        self._start_listener()
+        atexit.register(self.stop)
+        return self
+
+    def _start_listener(self):
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def after_fork(self):
+        """El hilo del listener no sobrevive al fork: cada worker arranca el suyo con una cola nueva."""
+        if self.listener is None or self._pid == os.getpid():
+            return
+        self.queue = self.handler.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def stop(self):
+        """Vacía la cola y detiene el hilo; los registros posteriores se quedan sin escribir."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        for logger in self.loggers:
+            logger.removeHandler(self.handler)
+            logger.propagate = True
+        for handler in self.handlers:
+            handler.close()
+
+
+def configure_logging(level=logging.INFO, json=False, stream=None, handlers=None, loggers=("pywork",),
+                      sample_every=100, sample_burst=10, sample_interval=1.0):
+    """Instala el pipeline de logs: cola + hilo escritor, salida en texto o JSON y muestreo por mensaje."""
+    if handlers is None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        if json:
+            handler.setFormatter(JSONFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers = [handler]
+    for sampler in _samplers:
+        sampler.configure(sample_every, sample_burst, sample_interval)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    return LogPipeline(handlers, loggers, level).start()
+
+
+class AccessLogMiddleware:
+    """Middleware ASGI que registra una línea por petición HTTP con sus tiempos.
+
+    Campos estructurados (`extra`): `method`, `path`, `status`, `duration_ms`, `ttfb_ms` (hasta la
+    cabecera de respuesta), `bytes` y `client`. Si el logger no está activo en INFO no cuesta nada más
+    que la comprobación de nivel.
+    """
+
+    def __init__(self, app, logger_name="pywork.access"):
+        self.app = app
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "ttfb": None, "bytes": 0}
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["ttfb"] = time.perf_counter() - start
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            ttfb = state["ttfb"] * 1000 if state["ttfb"] is not None else None
+            client = scope.get("client")
+            self.logger.info("%s %s %d %.2fms", scope["method"], scope["path"], state["status"], duration,
+                             extra={"method": scope["method"], "path": scope["path"], "status": state["status"],
+                                    "duration_ms": round(duration, 3),
+                                    "ttfb_ms": round(ttfb, 3) if ttfb is not None else None,
+                                    "bytes": state["bytes"], "client": client[0] if client else None})
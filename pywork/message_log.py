@@ -0,0 +1,377 @@
+# message_log.py
+import asyncio
+import bisect
+import concurrent.futures
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from .mqtt import MQTTMessage
+from .topics import TopicTrie
+
+logger = logging.getLogger(__name__)
+
+# crc32, timestamp, longitud del tópico, longitud del payload
+_HEADER = struct.Struct("<IdHI")
+_META = struct.Struct("<dHI")
+_CRC = struct.Struct("<I")
+# timestamp, offset: una entrada del índice disperso
+_INDEX_ENTRY = struct.Struct("<dQ")
+
+
+class _Segment:
+    """Fichero `.log` de registros y su índice disperso `.idx` (timestamp -> offset)."""
+    __slots__ = ("path", "index_path", "size", "index_ts", "index_offsets", "first_ts", "last_ts")
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path[:-4] + ".idx"
+        self.size = 0
+        self.index_ts = []
+        self.index_offsets = []
+        self.first_ts = None
+        self.last_ts = None
+
+    def seek(self, timestamp):
+        """Offset desde el que empezar a leer para no perder registros con ts >= timestamp."""
+        if timestamp is None or not self.index_ts:
+            return 0
+        position = bisect.bisect_left(self.index_ts, timestamp) - 1
+        return self.index_offsets[position] if position >= 0 else 0
+
+
+class MessageLog:
+    """Log en disco de mensajes crudos (tópico, timestamp, payload), solo de escritura al final.
+
+    Los registros se escriben por lotes en segmentos que rotan al llegar a `segment_bytes`; la lectura
+    usa `mmap` y un índice disperso por tiempo (una entrada cada `index_interval` bytes), así que los
+    rangos y replays no cargan ficheros enteros en memoria. Se asume que los timestamps llegan en orden.
+
+    `append` solo acumula en memoria; las escrituras, `fsync` y borrados por retención se hacen en un
+    único hilo escritor (en orden), así que el event loop nunca espera al disco.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, index_interval=4096, flush_bytes=256 * 1024,
+                 flush_interval=1.0, retention_bytes=None, retention_seconds=None, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.fsync = fsync
+        self._segments = []
+        self._file = None
+        self._index_file = None
+        self._pending = []  # (timestamp, bytes) aún no escritos
+        self._pending_bytes = 0
+        self._next_index_at = 0
+        self._flusher = None
+        self._writer = None  # Hilo escritor (executor de un solo worker), creado al primer uso
+        self.appended = 0
+        self.write_errors = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # --- Apertura y recuperación ---
+
+    def _recover(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".log"))
+        for name in names:
+            segment = _Segment(os.path.join(self.directory, name))
+            segment.size = os.path.getsize(segment.path)
+            if os.path.exists(segment.index_path):
+                with open(segment.index_path, "rb") as fh:
+                    data = fh.read()
+                usable = len(data) - len(data) % _INDEX_ENTRY.size
+                for ts, offset in _INDEX_ENTRY.iter_unpack(data[:usable]):
+                    if offset < segment.size:
+                        segment.index_ts.append(ts)
+                        segment.index_offsets.append(offset)
+            # Solo se recorre desde la última entrada del índice (o todo el segmento si no había índice)
+            self._scan(segment, segment.index_offsets[-1] if segment.index_offsets else 0)
+            if segment.index_ts:
+                segment.first_ts = segment.index_ts[0]
+            self._segments.append(segment)
+        for segment in self._segments:
+            self._rewrite_index(segment)
+        if self._segments:
+            active = self._segments[-1]
+            self._open_active(active)
+            self._next_index_at = (active.index_offsets[-1] + self.index_interval) if active.index_offsets else 0
+        logger.debug(f"Log de mensajes abierto en {self.directory}: {len(self._segments)} segmentos")
+
+    def _scan(self, segment, offset):
+        """Valida los registros desde `offset`, completa el índice y trunca una cola corrupta."""
+        if segment.size == 0:
+            return
+        with open(segment.path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = segment.size
+            last_indexed = segment.index_offsets[-1] if segment.index_offsets else None
+            while offset + _HEADER.size <= size:
+                crc, ts, topic_len, payload_len = _HEADER.unpack_from(mm, offset)
+                end = offset + _HEADER.size + topic_len + payload_len
+                if end > size or zlib.crc32(mm[offset + 4:end]) != crc:
+                    break
+                if last_indexed is None or offset - last_indexed >= self.index_interval:
+                    if offset != last_indexed:
+                        segment.index_ts.append(ts)
+                        segment.index_offsets.append(offset)
+                    last_indexed = offset
+                segment.last_ts = ts
+                offset = end
+        if offset < segment.size:
+            logger.warning(f"Log de mensajes: se descartan {segment.size - offset} bytes incompletos de {segment.path}")
+            with open(segment.path, "r+b") as fh:
+                fh.truncate(offset)
+            segment.size = offset
+
+    def _rewrite_index(self, segment):
+        with open(segment.index_path, "wb") as fh:
+            fh.write(b"".join(_INDEX_ENTRY.pack(ts, offset)
+                              for ts, offset in zip(segment.index_ts, segment.index_offsets)))
+
+    def _open_active(self, segment):
+        self._file = open(segment.path, "ab")
+        self._index_file = open(segment.index_path, "ab")
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+            self._index_file.close()
+        sequence = int(os.path.basename(self._segments[-1].path)[:-4]) + 1 if self._segments else 0
+        segment = _Segment(os.path.join(self.directory, f"{sequence:012d}.log"))
+        self._segments.append(segment)
+        self._open_active(segment)
+        self._next_index_at = 0
+        return segment
+
+    def configure_worker(self, worker_id):
+        """Pasa a `<directorio>/worker-<id>` en un worker recién creado con fork.
+
+        Los segmentos guardan su tamaño e índice en memoria, así que dos procesos no pueden escribir en el
+        mismo directorio; cada worker tiene el suyo (completo, salvo que la suscripción sea `shared=True`).
+        """
+        if self._pending:
+            raise RuntimeError("configure_worker debe llamarse antes de escribir en el log")
+        self._writer = None  # El hilo escritor del padre no sobrevive al fork
+        self.close()
+        self._segments = []
+        self._next_index_at = 0
+        self.directory = os.path.join(self.directory, f"worker-{worker_id}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._recover()
+
+    # --- Escritura ---
+
+    def append(self, topic, payload, timestamp=None):
+        """Añade un registro al lote en memoria; se escribe al llenarse el lote o en el próximo `flush`."""
+        timestamp = time.time() if timestamp is None else timestamp
+        topic_bytes = topic.encode("utf-8")
+        body = _META.pack(timestamp, len(topic_bytes), len(payload)) + topic_bytes + payload
+        record = _CRC.pack(zlib.crc32(body)) + body
+        self._pending.append((timestamp, record))
+        self._pending_bytes += len(record)
+        self.appended += 1
+        if self._pending_bytes >= self.flush_bytes:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+            else:
+                # En el event loop el lote se entrega al hilo escritor sin esperarlo
+                self._submit(self._take()).add_done_callback(self._write_done)
+
+    def _take(self):
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        return pending
+
+    def _submit(self, pending):
+        if self._writer is None:
+            self._writer = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="pywork-message-log")
+        return self._writer.submit(self._write_batch, pending)
+
+    def _write_done(self, future):
+        if future.exception() is not None:
+            self.write_errors += 1
+            logger.error("Log de mensajes: error al escribir en %s: %s", self.directory, future.exception())
+
+    def flush(self):
+        """Escribe el lote pendiente y espera a que el hilo escritor termine todo lo anterior."""
+        self._submit(self._take()).result()
+
+    async def flush_async(self):
+        """Como `flush`, pero esperando sin bloquear el event loop."""
+        await asyncio.wrap_future(self._submit(self._take()))
+
+    def _write_batch(self, pending):
+        """Escribe un lote con una sola escritura por segmento (solo en el hilo escritor)."""
+        if not pending:
+            return
+        segment = self._segments[-1] if self._segments else self._roll()
+        if self._file is None:
+            self._open_active(segment)
+        chunk, index = [], []
+        offset = segment.size
+        for timestamp, record in pending:
+            if offset >= self.segment_bytes and offset > 0:
+                self._write(segment, chunk, index, offset)
+                chunk, index = [], []
+                segment = self._roll()
+                offset = 0
+            if offset >= self._next_index_at:
+                index.append((timestamp, offset))
+                self._next_index_at = offset + self.index_interval
+            if segment.first_ts is None:
+                segment.first_ts = timestamp
+            segment.last_ts = timestamp
+            chunk.append(record)
+            offset += len(record)
+        self._write(segment, chunk, index, offset)
+        self._apply_retention()
+
+    def _write(self, segment, chunk, index, offset):
+        if not chunk:
+            return
+        self._file.write(b"".join(chunk))
+        self._file.flush()
+        if index:
+            self._index_file.write(b"".join(_INDEX_ENTRY.pack(ts, position) for ts, position in index))
+            self._index_file.flush()
+            # Offsets antes que timestamps: un lector concurrente nunca ve un ts sin su offset
+            segment.index_offsets.extend(position for _, position in index)
+            segment.index_ts.extend(ts for ts, _ in index)
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        segment.size = offset
+
+    def _apply_retention(self):
+        cutoff = time.time() - self.retention_seconds if self.retention_seconds is not None else None
+        total = sum(segment.size for segment in self._segments)
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            expired = cutoff is not None and oldest.last_ts is not None and oldest.last_ts < cutoff
+            oversized = self.retention_bytes is not None and total > self.retention_bytes
+            if not (expired or oversized):
+                break
+            self._segments.pop(0)
+            total -= oldest.size
+            for path in (oldest.path, oldest.index_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            logger.debug(f"Log de mensajes: segmento eliminado por retención {oldest.path}")
+
+    # --- Lectura ---
+
+    def replay(self, start=None, end=None, topic_filter=None, flush=True):
+        """Itera los mensajes con timestamp en [start, end] como `MQTTMessage` (con su `timestamp`).
+
+        Con `flush=True` escribe antes el lote pendiente esperando al disco; desde el event loop conviene
+        `await log.flush_async()` y `flush=False`.
+        """
+        if flush:
+            self.flush()
+        matcher = None
+        if topic_filter is not None:
+            matcher = TopicTrie()
+            matcher.add(topic_filter, True)
+        for segment in list(self._segments):
+            if segment.size == 0 or segment.last_ts is None:
+                continue
+            if (start is not None and segment.last_ts < start) or (end is not None and segment.first_ts > end):
+                continue
+            offset = segment.seek(start)
+            size = segment.size
+            try:
+                fh = open(segment.path, "rb")
+            except FileNotFoundError:
+                continue  # eliminado por retención mientras se leía
+            with fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while offset + _HEADER.size <= size:
+                    crc, ts, topic_len, payload_len = _HEADER.unpack_from(mm, offset)
+                    topic_start = offset + _HEADER.size
+                    payload_start = topic_start + topic_len
+                    record_end = payload_start + payload_len
+                    if record_end > size or zlib.crc32(mm[offset + 4:record_end]) != crc:
+                        # Cabecera corrupta o offset desalineado: se deja de leer el segmento
+                        logger.warning("Log de mensajes: registro inválido en %s (offset %d)", segment.path, offset)
+                        break
+                    offset = record_end
+                    if start is not None and ts < start:
+                        continue
+                    if end is not None and ts > end:
+                        return
+                    topic = mm[topic_start:payload_start].decode("utf-8")
+                    if matcher is not None and not matcher.match(topic):
+                        continue
+                    yield MQTTMessage(topic, mm[payload_start:offset], timestamp=ts)
+
+    async def replay_into(self, handler, start=None, end=None, topic_filter=None):
+        """Vuelve a pasar por `handler` (`async def handler(message)`) los mensajes de un rango."""
+        await self.flush_async()
+        count = 0
+        for message in self.replay(start, end, topic_filter, flush=False):
+            await handler(message)
+            count += 1
+            if count % 1000 == 0:
+                await asyncio.sleep(0)
+        return count
+
+    # --- Integración con MQTT y ciclo de vida ---
+
+    def attach(self, bridge, topic_filter="#", **options):
+        """Guarda en el log todo lo que llega a `bridge` por `topic_filter`."""
+        async def record(message):
+            self.append(message.topic, message.payload, message.timestamp)
+
+        return bridge.subscribe(topic_filter, record, **options)
+
+    async def start(self):
+        """Escribe los lotes pendientes cada `flush_interval` segundos."""
+        async def flush_periodically():
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush_async()
+                except Exception as e:
+                    self.write_errors += 1
+                    logger.error("Log de mensajes: error al escribir en %s: %s", self.directory, e)
+
+        self._flusher = asyncio.ensure_future(flush_periodically())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush_async()
+        self.close()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.shutdown()
+                self._writer = None
+            if self._file is not None:
+                self._file.close()
+                self._index_file.close()
+                self._file = self._index_file = None
+
+    def stats(self):
+        return {
+            "segments": len(self._segments),
+            "bytes": sum(segment.size for segment in self._segments),
+            "pending": len(self._pending),
+            "appended": self.appended,
+            "write_errors": self.write_errors,
+            "first_ts": self._segments[0].first_ts if self._segments else None,
+            "last_ts": self._segments[-1].last_ts if self._segments else None,
+        }
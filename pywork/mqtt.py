@@ -0,0 +1,493 @@
+# mqtt.py
+import asyncio
+import collections
+import inspect
+import logging
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from .codecs import CodecRegistry
+from .logs import sampled_logger
+from .topics import SHARED_PREFIX, TopicTrie
+
+logger = logging.getLogger(__name__)
+# Eventos por mensaje (errores de handler, decodificación, publicación): muestreados
+message_logger = sampled_logger(__name__)
+
+# Políticas cuando la cola de una suscripción está llena. `block` retiene los mensajes en la suscripción
+# (sin parar el hilo de red de paho) y, con QoS 1/2, retrasa su ack para que el broker frene el envío
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class MQTTMessage:
+    """Mensaje recibido, copiado desde el hilo de red de paho.
+
+    `timestamp` es la hora de llegada (reloj de pared) y `received_at` el instante monotónico
+    con el que se mide el lag de las colas. `value` es el payload decodificado por el codec del tópico.
+    `mid` es el id del paquete en el broker (para el ack manual de QoS 1/2).
+    """
+    __slots__ = ("topic", "payload", "qos", "retain", "received_at", "timestamp", "value", "mid")
+
+    def __init__(self, topic, payload, qos=0, retain=False, received_at=None, timestamp=None, mid=None):
+        self.topic = topic
+        self.payload = payload
+        self.value = payload
+        self.qos = qos
+        self.retain = retain
+        self.received_at = time.monotonic() if received_at is None else received_at
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.mid = mid
+
+
+class Subscription:
+    """Suscripción a un filtro de tópicos con cola acotada y `concurrency` workers async."""
+
+    def __init__(self, bridge, topic_filter, handler, qos=0, maxsize=1000, concurrency=1, overflow="drop_oldest",
+                 shared=False):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desborde desconocida: {overflow}")
+        self.bridge = bridge
+        self.topic_filter = topic_filter
+        self.handler = handler
+        self.qos = qos
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.overflow = overflow
+        self.shared = shared
+        self.queue = None
+        # Mensajes retenidos con la política `block` mientras la cola está llena: como mucho `maxsize`
+        # sin ack manual; con ack manual (QoS 1/2) los acota la ventana de envío del broker
+        self.pending = collections.deque()
+        self._workers = []
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    def start(self):
+        self.queue = asyncio.Queue(self.maxsize)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def offer(self, message):
+        """Encola un mensaje aplicando la política de desborde (se ejecuta en el event loop)."""
+        self.received += 1
+        queue = self.queue
+        if queue.full() or self.pending:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return
+            if self.overflow == "drop_oldest":
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+            else:
+                if len(self.pending) >= self.maxsize and not self.bridge._acks_manually(message):
+                    self.dropped += 1
+                    return
+                self.pending.append(message)
+                self.bridge._hold(message)
+                return
+        queue.put_nowait(message)
+
+    async def _worker(self):
+        queue = self.queue
+        while True:
+            message = await queue.get()
+            while self.pending and not queue.full():
+                held = self.pending.popleft()
+                queue.put_nowait(held)
+                self.bridge._release(held)
+            lag = time.monotonic() - message.received_at
+            self._total_lag += lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            try:
+                await self.handler(message)
+            except Exception as e:
+                self.errors += 1
+                message_logger.error("Error en el handler MQTT de '%s': %s", self.topic_filter, e)
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+    def stats(self):
+        processed = self.processed
+        return {
+            "filter": self.topic_filter,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "pending": len(self.pending),
+            "received": self.received,
+            "processed": processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_lag": self._total_lag / processed if processed else 0.0,
+            "max_lag": self.max_lag,
+        }
+
+
+def _resolve(future, result):
+    # El que publicó puede haber cancelado el futuro (p. ej. con `asyncio.wait_for`)
+    if not future.done():
+        future.set_result(result)
+
+
+class _Outbound:
+    """Mensaje pendiente de publicar y el futuro que se resuelve al entregarlo."""
+    __slots__ = ("topic", "payload", "qos", "retain", "future")
+
+    def __init__(self, topic, payload, qos, retain, future):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.future = future
+
+
+class MQTTBridge:
+    """Puente entre el hilo de red de paho y asyncio.
+
+    Los mensajes se acumulan en un buffer desde el hilo de paho y pasan al event loop por lotes
+    con un único `call_soon_threadsafe`; allí se reparten a las colas acotadas de cada suscripción.
+    `default_codec` decodifica los tópicos sin codec registrado (por defecto se dejan en bytes).
+    """
+
+    def __init__(self, broker_url, broker_port=1883, client_id=None, keepalive=60, batch_size=256,
+                 max_buffered=10_000, max_outbound=10_000, max_inflight=100, default_codec=None):
+        self.broker_url = broker_url
+        self.broker_port = broker_port
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.batch_size = batch_size
+        # Mensajes que se guardan como máximo antes de que arranque el event loop
+        self.max_buffered = max_buffered
+        self.max_inflight = max_inflight
+        # Con varios workers, las suscripciones `shared=True` se reparten con `$share/<grupo>/...`
+        self.shared_group = None
+        self.client = self._create_client(client_id)
+        self.subscriptions = []
+        self._trie = TopicTrie()
+        self.codecs = CodecRegistry(default=default_codec)
+        self.decode_errors = 0
+        self.connected = False
+        self._loop = None
+        self._started = False
+        self._buffer = collections.deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        # Mensajes retenidos por suscripciones `block` -> cuántas los retienen; se confirman al soltarlos
+        self._held = {}
+        self._manual_ack = False
+        self._network_started = False
+        self.buffer_dropped = 0
+        # Salida: cola acotada (backpressure), ventana en vuelo y último valor por tópico coalescido
+        self._outbound = asyncio.Queue(max_outbound)
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._awaiting_ack = {}  # mid -> _Outbound
+        self._latest = {}  # tópico -> _Outbound pendiente (coalesce)
+        self._sender = None
+        self.published = 0
+        self.coalesced = 0
+
+    def _create_client(self, client_id):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id or "")
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.on_publish = self._on_publish
+        # La ventana de QoS 1/2 la controla el puente; paho usa el mismo límite
+        client.max_inflight_messages_set(self.max_inflight)
+        return client
+
+    def configure_worker(self, worker_id, shared_group=None):
+        """Prepara el puente dentro de un worker recién creado con fork.
+
+        Crea un cliente paho nuevo (el heredado comparte sockets internos con el padre) con un
+        client_id único por worker. Con `shared_group`, las suscripciones marcadas `shared=True` pasan a
+        `$share/<grupo>/...` y el broker reparte cada mensaje a un solo worker; el resto siguen recibiendo
+        todos los mensajes en cada worker (hub, telemetría, liveness y demás estado por proceso).
+        """
+        if self._network_started:
+            raise RuntimeError("configure_worker debe llamarse antes de conectar")
+        if self.client_id:
+            self.client_id = f"{self.client_id}-{worker_id}"
+        self.client = self._create_client(self.client_id)
+        self.shared_group = shared_group
+
+    # --- Suscripciones ---
+
+    def subscribe(self, topic_filter, handler, qos=0, shared=False, **options):
+        """Registra un handler (`async def handler(message)`) para un filtro de tópicos.
+
+        Admite los comodines `+` y `#` y suscripciones compartidas `$share/<grupo>/<filtro>`.
+        `shared=True` marca un handler tipo cola de trabajo: con varios workers cada mensaje lo procesa uno solo.
+        """
+        if not inspect.iscoroutinefunction(handler):
+            raise TypeError("Los handlers MQTT deben ser `async def`")
+        subscription = Subscription(self, topic_filter, handler, qos, shared=shared, **options)
+        self._trie.add(topic_filter, subscription)
+        self.subscriptions.append(subscription)
+        if self._started:
+            subscription.start()
+        if self.connected:
+            self.client.subscribe(self._broker_filter(subscription), qos)
+        return subscription
+
+    def _broker_filter(self, subscription):
+        topic_filter = subscription.topic_filter
+        if self.shared_group and subscription.shared and not topic_filter.startswith(SHARED_PREFIX):
+            return f"{SHARED_PREFIX}{self.shared_group}/{topic_filter}"
+        return topic_filter
+
+    async def unsubscribe(self, subscription):
+        """Retira una suscripción; el broker deja de enviar el filtro si ya nadie lo usa."""
+        self._trie.remove(subscription.topic_filter, subscription)
+        self.subscriptions.remove(subscription)
+        await subscription.stop()
+        while subscription.pending:
+            self._release(subscription.pending.popleft())
+        broker_filter = self._broker_filter(subscription)
+        if self.connected and broker_filter not in self.topic_filters():
+            self.client.unsubscribe(broker_filter)
+
+    def register_codec(self, topic_filter, codec):
+        """Codec para los mensajes de un filtro: se decodifican una vez, antes de repartirlos."""
+        self.codecs.register(topic_filter, codec)
+
+    def topic_filters(self):
+        """Filtros distintos a suscribir en el broker, cada uno con la QoS máxima pedida."""
+        filters = {}
+        for subscription in self.subscriptions:
+            topic_filter = self._broker_filter(subscription)
+            filters[topic_filter] = max(subscription.qos, filters.get(topic_filter, 0))
+        return filters
+
+    # --- Ciclo de vida ---
+
+    def connect(self):
+        """Conecta y arranca el hilo de red de paho (los mensajes esperan en el buffer hasta `start`)."""
+        if not self._network_started:
+            # Con alguna suscripción `block`, los QoS 1/2 se confirman al entrar en su cola: el broker
+            # deja de enviar al llenarse su ventana y el hilo de red sigue atendiendo acks y keepalive
+            self._manual_ack = any(s.overflow == "block" for s in self.subscriptions)
+            self.client.manual_ack_set(self._manual_ack)
+            self.client.connect_async(self.broker_url, self.broker_port, self.keepalive)
+            self.client.loop_start()
+            self._network_started = True
+
+    async def start(self, connect=True):
+        """Enlaza el puente con el event loop en curso y arranca los workers de las suscripciones."""
+        self._loop = asyncio.get_running_loop()
+        self._started = True
+        for subscription in self.subscriptions:
+            subscription.start()
+        self._sender = asyncio.ensure_future(self._send_loop())
+        if connect:
+            self.connect()
+        with self._lock:
+            if self._buffer and not self._scheduled:
+                self._scheduled = True
+                self._loop.call_soon(self._drain)
+
+    async def stop(self):
+        # Lo retenido sin ack lo reenvía el broker al reconectar
+        self._held.clear()
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+        # Lo que no llegó a salir, o salió pero no recibió el ack del broker, se da por no entregado
+        while not self._outbound.empty():
+            item = self._outbound.get_nowait()
+            message = self._latest.pop(item) if isinstance(item, str) else item
+            _resolve(message.future, False)
+        for message in self._awaiting_ack.values():
+            _resolve(message.future, False)
+        self._awaiting_ack.clear()
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        if self._network_started:
+            self.client.disconnect()
+            self.client.loop_stop()
+            self._network_started = False
+        for subscription in self.subscriptions:
+            await subscription.stop()
+        self._started = False
+
+    # --- Hilo de paho ---
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = True
+        logger.debug(f"Conectado al broker MQTT {self.broker_url}:{self.broker_port} con código {reason_code}")
+        # Solo los filtros registrados, nunca `#` por defecto
+        filters = list(self.topic_filters().items())
+        if filters:
+            client.subscribe(filters)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = False
+        logger.warning(f"Desconexión del broker MQTT con código {reason_code}")
+
+    def _on_message(self, client, userdata, msg):
+        # Nunca se bloquea aquí: el hilo de red también procesa PUBACKs, keepalive y las publicaciones
+        self.feed(MQTTMessage(msg.topic, msg.payload, msg.qos, msg.retain, mid=msg.mid))
+
+    def feed(self, message):
+        """Entrega un mensaje al puente desde cualquier hilo."""
+        with self._lock:
+            if self._loop is None and len(self._buffer) >= self.max_buffered:
+                self._ack(self._buffer.popleft())
+                self.buffer_dropped += 1
+            self._buffer.append(message)
+            if self._scheduled or self._loop is None:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._drain)
+
+    # --- Event loop ---
+
+    def _drain(self):
+        with self._lock:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            more = bool(self._buffer)
+            self._scheduled = more
+        for message in batch:
+            self.dispatch(message)
+            if message not in self._held:
+                self._ack(message)
+        if more:
+            # Cede el loop entre lotes para no acaparar el event loop en ráfagas
+            self._loop.call_soon(self._drain)
+
+    def dispatch(self, message):
+        subscriptions = self._trie.match(message.topic)
+        if not subscriptions:
+            return
+        if self.codecs.active:
+            try:
+                message.value = self.codecs.decode(message.topic, message.payload)
+            except Exception as e:
+                self.decode_errors += 1
+                message_logger.warning("No se pudo decodificar el mensaje de '%s': %s", message.topic, e)
+                return
+        for subscription in subscriptions:
+            subscription.offer(message)
+
+    # --- Publicación ---
+
+    async def publish(self, topic, payload, qos=0, retain=False, coalesce=False):
+        """Encola una publicación sin bloquear el event loop ni el hilo de paho.
+
+        Espera solo si la cola de salida está llena. Devuelve un futuro que se resuelve a True
+        cuando paho entrega el mensaje (QoS 0) o recibe el ack del broker (QoS 1/2), y a False
+        si se descarta. Con `coalesce=True` solo se envía el último valor pendiente de cada tópico.
+        """
+        if self.codecs.active and not isinstance(payload, (bytes, bytearray, str)):
+            payload = self.codecs.encode(topic, payload)
+        future = asyncio.get_running_loop().create_future()
+        message = _Outbound(topic, payload, qos, retain, future)
+        if coalesce:
+            previous = self._latest.get(topic)
+            self._latest[topic] = message
+            if previous is not None:
+                # Ya hay un envío en cola para el tópico: se sustituye el valor
+                self.coalesced += 1
+                _resolve(previous.future, False)
+                return future
+            try:
+                await self._outbound.put(topic)
+            except BaseException:
+                # El tópico no llegó a la cola (p. ej. cancelado con la cola llena): si se deja en
+                # `_latest`, las publicaciones siguientes se coalescerían contra un envío inexistente
+                pending = self._latest.pop(topic, None)
+                if pending is not None:
+                    _resolve(pending.future, False)
+                raise
+            return future
+        await self._outbound.put(message)
+        return future
+
+    async def _send_loop(self):
+        queue = self._outbound
+        while True:
+            item = await queue.get()
+            batch = [item]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            for item in batch:
+                message = self._latest.pop(item) if isinstance(item, str) else item
+                if message.qos:
+                    await self._inflight.acquire()
+                try:
+                    self._send(message)
+                except Exception:
+                    # Un mensaje problemático no debe tumbar la tarea de envío del resto
+                    logger.exception("Error inesperado al publicar en '%s'", message.topic)
+                    _resolve(message.future, False)
+            for _ in batch:
+                queue.task_done()
+
+    def _send(self, message):
+        try:
+            info = self.client.publish(message.topic, message.payload, message.qos, message.retain)
+        except Exception as e:
+            message_logger.error("Error al publicar en '%s': %s", message.topic, e)
+            if message.qos:
+                self._inflight.release()
+            _resolve(message.future, False)
+            return
+        self.published += 1
+        if message.qos:
+            # paho reenvía los QoS 1/2 tras reconectar; el hueco se libera con el ack
+            self._awaiting_ack[info.mid] = message
+        else:
+            _resolve(message.future, info.rc == mqtt.MQTT_ERR_SUCCESS)
+
+    def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._acked, mid)
+
+    def _acked(self, mid):
+        message = self._awaiting_ack.pop(mid, None)
+        if message is not None:
+            self._inflight.release()
+            _resolve(message.future, True)
+
+    def _acks_manually(self, message):
+        return self._manual_ack and message.qos > 0 and message.mid is not None
+
+    def _ack(self, message):
+        if self._acks_manually(message):
+            self.client.ack(message.mid, message.qos)
+
+    def _hold(self, message):
+        self._held[message] = self._held.get(message, 0) + 1
+
+    def _release(self, message):
+        count = self._held.pop(message, 0) - 1
+        if count > 0:
+            self._held[message] = count
+        elif count == 0:
+            self._ack(message)
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "buffered": len(self._buffer),
+            "held": len(self._held),
+            "buffer_dropped": self.buffer_dropped,
+            "decode_errors": self.decode_errors,
+            "outbound_queued": self._outbound.qsize(),
+            "inflight": len(self._awaiting_ack),
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "subscriptions": [s.stats() for s in self.subscriptions],
+        }
@@ -0,0 +1,217 @@
+# pool.py
+import asyncio
+import collections
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+async def dispose(instance):
+    """Libera una instancia llamando a `aclose()` o `close()` si existen."""
+    try:
+        if hasattr(instance, "aclose"):
+            await instance.aclose()
+        elif hasattr(instance, "close"):
+            result = instance.close()
+            if inspect.isawaitable(result):
+                await result
+    except Exception as e:
+        logger.error("Error liberando %s: %s", type(instance).__name__, e)
+
+
+class InstancePool:
+    """Pool acotado de instancias que se prestan por ámbito (ciclo de vida POOLED).
+
+    Con `idle_timeout`, una tarea en segundo plano descarta las instancias ociosas caducadas aunque no
+    haya tráfico; tras cualquier descarte el pool se repone en segundo plano hasta `min_size`.
+    """
+
+    def __init__(self, factory, min_size=0, max_size=10, idle_timeout=None, health_check=None, name="pool"):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Tamaños de pool inválidos: min_size={min_size}, max_size={max_size}")
+        # Corrutina sin argumentos que construye una instancia nueva
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.name = name
+        self.closed = False
+        self._idle = collections.deque()  # (instancia, liberada_en); la más reciente a la derecha
+        self._size = 0
+        self._in_use = 0
+        self._waiters = 0
+        self._condition = None
+        self._reaper = None
+        self._filler = None
+        self._stats = {"acquired": 0, "created": 0, "discarded": 0, "wait_time": 0.0, "max_wait_time": 0.0}
+
+    def _get_condition(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def fill(self):
+        """Crea instancias hasta alcanzar `min_size`."""
+        while self._size < self.min_size and not self.closed:
+            self._size += 1
+            try:
+                instance = await self.factory()
+            except BaseException:
+                self._size -= 1
+                raise
+            self._stats["created"] += 1
+            if self.closed:
+                # Se cerró mientras se creaba (p. ej. reposición en segundo plano)
+                self._size -= 1
+                await dispose(instance)
+                return
+            self._idle.appendleft((instance, time.monotonic()))
+
+    async def acquire(self):
+        """Presta una instancia; espera si el pool está agotado."""
+        if self.closed:
+            raise RuntimeError(f"El pool '{self.name}' está cerrado")
+        started = time.monotonic()
+        if self._stats["created"] == 0 and self.min_size:
+            await self.fill()
+        if self.idle_timeout is not None and self._reaper is None:
+            self._reaper = asyncio.ensure_future(self._reap_periodically())
+        condition = self._get_condition()
+        while True:
+            async with condition:
+                while not self._idle and self._size >= self.max_size:
+                    self._waiters += 1
+                    try:
+                        await condition.wait()
+                    finally:
+                        self._waiters -= 1
+                if self._idle:
+                    instance, _ = self._idle.pop()
+                    created = False
+                else:
+                    self._size += 1
+                    created = True
+
+            if created:
+                try:
+                    instance = await self.factory()
+                except BaseException:
+                    await self._forget()
+                    raise
+                self._stats["created"] += 1
+            elif not await self._healthy(instance):
+                await self._forget()
+                await dispose(instance)
+                continue
+            break
+
+        waited = time.monotonic() - started
+        self._in_use += 1
+        self._stats["acquired"] += 1
+        self._stats["wait_time"] += waited
+        self._stats["max_wait_time"] = max(self._stats["max_wait_time"], waited)
+        return instance
+
+    async def release(self, instance):
+        """Devuelve una instancia prestada al pool."""
+        self._in_use -= 1
+        if self.closed:
+            await self._forget()
+            await dispose(instance)
+            return
+        now = time.monotonic()
+        condition = self._get_condition()
+        async with condition:
+            self._idle.append((instance, now))
+            expired = self._expired(now)
+            condition.notify()
+        for old in expired:
+            await dispose(old)
+
+    def _expired(self, now):
+        """Saca de la cola las instancias ociosas caducadas (sin bajar de `min_size`)."""
+        expired = []
+        if self.idle_timeout is not None:
+            # Las más antiguas están a la izquierda
+            while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+                self._stats["discarded"] += 1
+        return expired
+
+    async def _reap_periodically(self):
+        condition = self._get_condition()
+        while not self.closed:
+            await asyncio.sleep(self.idle_timeout / 2)
+            async with condition:
+                expired = self._expired(time.monotonic())
+            for old in expired:
+                await dispose(old)
+
+    def _schedule_fill(self):
+        if self._size < self.min_size and not self.closed and self._filler is None:
+            self._filler = asyncio.ensure_future(self._refill())
+
+    async def _refill(self):
+        try:
+            await self.fill()
+        except Exception as e:
+            logger.warning("No se pudo reponer el pool '%s' hasta min_size: %s", self.name, e)
+        finally:
+            self._filler = None
+
+    async def aclose(self):
+        """Cierra el pool y libera las instancias ociosas; las prestadas se liberan al devolverse."""
+        self.closed = True
+        for task in (self._reaper, self._filler):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._reaper = self._filler = None
+        idle = [instance for instance, _ in self._idle]
+        self._size -= len(idle)
+        self._idle.clear()
+        for instance in idle:
+            await dispose(instance)
+
+    def stats(self):
+        """Métricas del pool para dimensionarlo."""
+        acquired = self._stats["acquired"]
+        return {
+            "name": self.name,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiters": self._waiters,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "acquired": acquired,
+            "created": self._stats["created"],
+            "discarded": self._stats["discarded"],
+            "avg_wait_time": self._stats["wait_time"] / acquired if acquired else 0.0,
+            "max_wait_time": self._stats["max_wait_time"],
+        }
+
+    async def _healthy(self, instance):
+        if self.health_check is None:
+            return True
+        try:
+            result = self.health_check(instance)
+            if inspect.isawaitable(result):
+                result = await result
+            return bool(result)
+        except Exception as e:
+            logger.warning("Health check fallido en el pool '%s': %s", self.name, e)
+            return False
+
+    async def _forget(self):
+        """Descuenta una instancia del tamaño del pool y despierta a un posible waiter."""
+        condition = self._get_condition()
+        async with condition:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            condition.notify()
+        self._schedule_fill()
@@ -0,0 +1,177 @@
+# router.py
+import logging
+import re
+
+from starlette.routing import Match, Route, Router, WebSocketRoute, compile_path
+
+logger = logging.getLogger(__name__)
+
+_PARAM = re.compile(r"^{([a-zA-Z_][a-zA-Z0-9_]*)(:[a-zA-Z_][a-zA-Z0-9_]*)?}$")
+
+
+class _Node:
+    """Nodo del árbol: hijos estáticos por segmento, hijos parámetro tipados y rutas terminales."""
+    __slots__ = ("static", "params", "catch_all", "routes")
+
+    def __init__(self):
+        self.static = {}
+        # Lista de (nombre, regex compilada, convertor, nodo); los tipados antes que `str`
+        self.params = []
+        # (nombre, convertor, rutas) para un `{x:path}` final
+        self.catch_all = None
+        self.routes = []
+
+
+class RadixRouter(Router):
+    """Router que compila las rutas en un árbol radix por segmentos.
+
+    La búsqueda cuesta O(longitud del path) en vez de probar la regex de cada ruta.
+    Los segmentos estáticos tienen prioridad sobre los parámetros; las rutas que no
+    encajan en el árbol (Mount, parámetros dentro de un segmento) se prueban después en orden.
+    Mantiene la semántica de Starlette para 405, HEAD y redirect_slashes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._trees = {}
+        self._others = []
+        self._compiled_count = -1
+
+    def compile(self):
+        """(Re)construye los árboles a partir de `self.routes`."""
+        self._trees = {"http": _Node(), "websocket": _Node()}
+        self._others = []
+        for route in self.routes:
+            if not self._insert(route):
+                self._others.append(route)
+        self._compiled_count = len(self.routes)
+        logger.debug(f"Router radix compilado: {len(self.routes) - len(self._others)} rutas en el árbol, "
+                     f"{len(self._others)} secuenciales")
+
+    def _insert(self, route):
+        if isinstance(route, Route):
+            node = self._trees["http"]
+        elif isinstance(route, WebSocketRoute):
+            node = self._trees["websocket"]
+        else:
+            return False
+        convertors = compile_path(route.path)[2]
+        segments = route.path.split("/")[1:]
+        for index, segment in enumerate(segments):
+            match = _PARAM.match(segment)
+            if match is None:
+                if "{" in segment:
+                    return False
+                node = node.static.setdefault(segment, _Node())
+                continue
+            name = match.group(1)
+            convertor = convertors[name]
+            if type(convertor).__name__ == "PathConvertor":
+                if index != len(segments) - 1:
+                    return False
+                if node.catch_all is None:
+                    node.catch_all = (name, convertor, [])
+                node.catch_all[2].append(route)
+                return True
+            for param_name, _, param_convertor, child in node.params:
+                if param_name == name and type(param_convertor) is type(convertor):
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.params.append((name, re.compile(convertor.regex + "$"), convertor, child))
+                # Los conversores tipados (int, float, uuid...) se prueban antes que `str`
+                node.params.sort(key=lambda p: type(p[2]).__name__ == "StringConvertor")
+                node = child
+        node.routes.append(route)
+        return True
+
+    def _accepts(self, routes, method, params, partial):
+        """True si alguna ruta admite el método; si no, guarda la primera coincidencia parcial (405)."""
+        if method is None or any(route.methods is None or method in route.methods for route in routes):
+            return True
+        if not partial:
+            partial.append((routes, dict(params)))
+        return False
+
+    def _lookup(self, node, segments, index, params, method, partial):
+        # Como Starlette, una coincidencia de path sin el método no corta la búsqueda: solo se
+        # responde 405 si ninguna otra rama admite el método
+        if index == len(segments):
+            if node.routes and self._accepts(node.routes, method, params, partial):
+                return node.routes
+            return None
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._lookup(child, segments, index + 1, params, method, partial)
+            if found is not None:
+                return found
+        if segment:
+            for name, regex, convertor, child in node.params:
+                if regex.match(segment):
+                    params[name] = convertor.convert(segment)
+                    found = self._lookup(child, segments, index + 1, params, method, partial)
+                    if found is not None:
+                        return found
+                    del params[name]
+        if node.catch_all is not None:
+            name, convertor, routes = node.catch_all
+            params[name] = convertor.convert("/".join(segments[index:]))
+            if self._accepts(routes, method, params, partial):
+                return routes
+            del params[name]
+        return None
+
+    async def app(self, scope, receive, send):
+        scope_type = scope["type"]
+        if scope_type == "lifespan":
+            return await super().app(scope, receive, send)
+        if "router" not in scope:
+            scope["router"] = self
+        if self._compiled_count != len(self.routes):
+            self.compile()
+
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        params = {}
+        method = scope["method"] if scope_type == "http" else None
+        partial_in_tree = []
+        routes = self._lookup(self._trees[scope_type], path.split("/")[1:], 0, params, method, partial_in_tree)
+        if routes is not None:
+            route = routes[0]
+            if method is not None and len(routes) > 1:
+                for candidate in routes:
+                    if candidate.methods is None or method in candidate.methods:
+                        route = candidate
+                        break
+            await self._handle(route, params, scope, receive, send)
+            return
+
+        partial = None
+        for route in self._others:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+            if match == Match.PARTIAL and partial is None:
+                partial = (route, child_scope)
+        if partial_in_tree:
+            # El path existe pero ninguna ruta admite el método: la ruta responde 405
+            routes, params = partial_in_tree[0]
+            await self._handle(routes[0], params, scope, receive, send)
+            return
+        if partial is not None:
+            scope.update(partial[1])
+            await partial[0].handle(scope, receive, send)
+            return
+
+        # Sin coincidencias: Starlette resuelve redirect_slashes y el 404
+        await super().app(scope, receive, send)
+
+    async def _handle(self, route, params, scope, receive, send):
+        scope["endpoint"] = route.endpoint
+        scope["path_params"] = {**scope.get("path_params", {}), **params}
+        await route.handle(scope, receive, send)
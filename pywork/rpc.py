@@ -0,0 +1,124 @@
+# rpc.py
+import asyncio
+import itertools
+import json
+import uuid
+
+from .encoders import JSONEncoder
+from .logs import sampled_logger
+
+message_logger = sampled_logger(__name__)
+
+
+class RPCError(Exception):
+    """El dispositivo respondió con un error."""
+
+    def __init__(self, device_id, method, error):
+        super().__init__(f"{device_id}.{method}: {error}")
+        self.device_id = device_id
+        self.method = method
+        self.error = error
+
+
+class RPCTimeout(asyncio.TimeoutError):
+    """El dispositivo no respondió a tiempo."""
+
+
+class RPCClient:
+    """Llamadas petición/respuesta a dispositivos sobre MQTT.
+
+    La petición se publica en `request_topic` (con `{device_id}`) como JSON
+    `{"id", "method", "params", "reply_to"}`; el dispositivo responde en `reply_to` con `{"id", "result"}`
+    o `{"id", "error"}`. Las respuestas se emparejan por id con un dict de futuros pendientes.
+
+    Las peticiones se serializan con `encoder`; las respuestas, con el codec que el bridge tenga
+    registrado para el tópico de respuesta (p. ej. `register_codec("pywork/rpc/#", codec)`) o, si no
+    hay ninguno, como JSON.
+    """
+
+    def __init__(self, bridge, request_topic="devices/{device_id}/rpc", reply_prefix="pywork/rpc", qos=1,
+                 default_timeout=5.0, encoder=None, **options):
+        self.bridge = bridge
+        self.request_topic = request_topic
+        self.reply_prefix = reply_prefix
+        self.reply_topic = None
+        self.qos = qos
+        self.default_timeout = default_timeout
+        self.encoder = encoder or JSONEncoder()
+        self._ids = itertools.count(1)
+        self._pending = {}  # id -> (future, device_id, method)
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.late = 0
+        self._options = options
+
+    def _ensure_reply_topic(self):
+        # Tópico de respuesta propio del proceso, creado en la primera llamada (tras el fork de los workers)
+        # para que varias réplicas de la app no se pisen
+        if self.reply_topic is None:
+            self.reply_topic = f"{self.reply_prefix}/{uuid.uuid4().hex}"
+            self.bridge.subscribe(self.reply_topic, self._on_reply, self.qos, **self._options)
+
+    async def call(self, device_id, method, params=None, timeout=None):
+        """Invoca `method` en el dispositivo y espera su resultado."""
+        self._ensure_reply_topic()
+        call_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = (future, device_id, method)
+        self.calls += 1
+        payload = self.encoder.encode({"id": call_id, "method": method, "params": params,
+                                       "reply_to": self.reply_topic})
+        topic = self.request_topic.format(device_id=device_id)
+
+        async def exchange():
+            # La publicación puede esperar si la cola de salida está llena: cuenta dentro del timeout
+            await self.bridge.publish(topic, payload, self.qos)
+            return await future
+
+        try:
+            return await asyncio.wait_for(exchange(), timeout if timeout is not None else self.default_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise RPCTimeout(f"{device_id}.{method}: sin respuesta") from None
+        finally:
+            self._pending.pop(call_id, None)
+
+    async def call_many(self, device_ids, method, params=None, timeout=None, concurrency=100):
+        """Llama a muchos dispositivos con concurrencia acotada.
+
+        Devuelve `{device_id: resultado}`; los que fallan o no responden tienen la excepción como valor.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(device_id):
+            async with semaphore:
+                return await self.call(device_id, method, params, timeout)
+
+        results = await asyncio.gather(*(limited(device_id) for device_id in device_ids), return_exceptions=True)
+        return dict(zip(device_ids, results))
+
+    async def _on_reply(self, message):
+        try:
+            # `value` ya viene decodificado si el bridge tiene un codec para el tópico; si no, JSON
+            reply = message.value if message.value is not message.payload else json.loads(message.payload)
+            pending = self._pending.pop(reply["id"], None)
+        except (ValueError, TypeError, KeyError) as e:
+            message_logger.warning("Respuesta RPC inválida en %s: %s", message.topic, e)
+            return
+        if pending is None:
+            # Respuesta de una llamada que ya venció
+            self.late += 1
+            return
+        future, device_id, method = pending
+        if future.done():
+            return
+        if reply.get("error") is not None:
+            self.errors += 1
+            future.set_exception(RPCError(device_id, method, reply["error"]))
+        else:
+            future.set_result(reply.get("result"))
+
+    def stats(self):
+        return {"pending": len(self._pending), "calls": self.calls, "timeouts": self.timeouts,
+                "errors": self.errors, "late": self.late}
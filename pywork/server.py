@@ -0,0 +1,138 @@
+# server.py
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Un worker que muere antes de `_MIN_UPTIME` segundos cuenta como fallo de arranque: se reinicia con
+# espera exponencial (0.5s, 1s, 2s... hasta `_MAX_BACKOFF`) en vez de hacer fork en bucle
+_MIN_UPTIME = 5.0
+_BASE_BACKOFF = 0.5
+_MAX_BACKOFF = 30.0
+
+
+def bind_socket(host, port, backlog=2048):
+    """Socket de escucha creado en el proceso padre y heredado por todos los workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def server_config(app, host, port, backlog=2048, keepalive=5, limit_concurrency=None, graceful_timeout=30,
+                  loop="auto", http="auto", **options):
+    """Configuración de uvicorn; `auto` elige uvloop y httptools si están instalados."""
+    return uvicorn.Config(app, host=host, port=port, backlog=backlog, timeout_keep_alive=keepalive,
+                          limit_concurrency=limit_concurrency, timeout_graceful_shutdown=graceful_timeout,
+                          loop=loop, http=http, **options)
+
+
+def serve(app, host="0.0.0.0", port=8000, workers=None, on_worker_start=None, graceful_timeout=30, **options):
+    """Sirve `app` con `workers` procesos (por defecto, uno por CPU) que comparten el socket de escucha.
+
+    El padre abre el socket y hace fork de los workers (modelo pre-fork); cada worker llama a
+    `on_worker_start(worker_id)` antes de arrancar su propio event loop, y el padre reinicia los que mueren
+    (con espera exponencial si fallan nada más arrancar).
+    SIGTERM/SIGINT se reenvían a los workers, que dejan de aceptar conexiones y terminan las peticiones en
+    curso durante `graceful_timeout` segundos; pasado ese margen el padre los mata.
+    """
+    workers = workers or os.cpu_count() or 1
+    sock = bind_socket(host, port, options.get("backlog", 2048))
+    config = server_config(app, host, port, graceful_timeout=graceful_timeout, **options)
+
+    if workers == 1 or not hasattr(os, "fork"):
+        _run_worker(config, sock, 0, on_worker_start)
+        return
+
+    children = {}  # pid -> worker_id
+    started = {}  # worker_id -> instante del último fork
+    failures = {}  # worker_id -> caídas rápidas seguidas
+    restarts = {}  # worker_id -> instante en que toca reiniciarlo
+    stopping = False
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(config, sock, worker_id, on_worker_start)
+            except BaseException:
+                logger.exception(f"Worker {worker_id} terminado con error")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker_id
+        started[worker_id] = time.monotonic()
+        logger.info(f"Worker {worker_id} arrancado (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            _kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker_id in range(workers):
+        spawn(worker_id)
+    logger.info(f"Servidor en http://{host}:{port} con {workers} workers (pid {os.getpid()})")
+
+    deadline = None
+    while children or (restarts and not stopping):
+        if stopping and deadline is None:
+            deadline = time.monotonic() + graceful_timeout + 5
+        if not stopping:
+            now = time.monotonic()
+            for worker_id, due in list(restarts.items()):
+                if due <= now:
+                    del restarts[worker_id]
+                    spawn(worker_id)
+        if not children:
+            time.sleep(0.2)
+            continue
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                logger.warning("Workers sin terminar tras el margen de apagado; se fuerzan a salir")
+                for pid in list(children):
+                    _kill(pid, signal.SIGKILL)
+                deadline = float("inf")
+            time.sleep(0.2)
+            continue
+        worker_id = children.pop(pid)
+        if not stopping:
+            quick = time.monotonic() - started[worker_id] < _MIN_UPTIME
+            failures[worker_id] = failures.get(worker_id, 0) + 1 if quick else 0
+            delay = min(_MAX_BACKOFF, _BASE_BACKOFF * 2 ** (failures[worker_id] - 1)) if quick else 0.0
+            logger.warning(f"Worker {worker_id} (pid {pid}) terminó con estado {status}; "
+                           f"se reinicia en {delay:.1f}s")
+            restarts[worker_id] = time.monotonic() + delay
+    sock.close()
+    logger.info("Servidor detenido")
+
+
+def _run_worker(config, sock, worker_id, on_worker_start):
+    if on_worker_start is not None:
+        on_worker_start(worker_id)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def _kill(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,164 @@
+# static_files.py
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+logger = logging.getLogger(__name__)
+
+# Tipos que vale la pena comprimir
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+
+class _StaticEntry:
+    __slots__ = ("path", "body", "gzip_body", "media_type", "etag", "last_modified", "mtime", "size", "checked_at")
+
+    def __init__(self, path, body, gzip_body, media_type, mtime, size):
+        self.path = path
+        self.body = body
+        self.gzip_body = gzip_body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.mtime = mtime
+        self.size = size
+        self.checked_at = time.monotonic()
+
+
+class MemoryStaticFiles:
+    """Archivos estáticos servidos desde memoria con variantes gzip precomprimidas.
+
+    Los archivos de hasta `max_file_size` bytes se cargan al arrancar (`preload`) o en el primer acceso;
+    los más grandes se envían en streaming desde disco con `FileResponse`.
+    """
+
+    def __init__(self, directory, max_file_size=256 * 1024, gzip_min_size=1024, gzip_level=6,
+                 revalidate_after=None, cache_control="public, max-age=3600"):
+        self.directory = os.path.realpath(directory)
+        self.max_file_size = max_file_size
+        self.gzip_min_size = gzip_min_size
+        self.gzip_level = gzip_level
+        # Segundos tras los que una entrada vuelve a comprobar el mtime en disco (None: solo con reload())
+        self.revalidate_after = revalidate_after
+        self.cache_control = cache_control
+        self._entries = {}
+
+    def preload(self):
+        """Carga en memoria todos los archivos pequeños del directorio."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                self._load(os.path.join(root, name))
+        logger.debug(f"Estáticos precargados: {len(self._entries)} archivos de {self.directory}")
+
+    def reload(self, path=None):
+        """Invalida todas las entradas (o la de una ruta relativa al directorio)."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(os.path.realpath(os.path.join(self.directory, path)), None)
+
+    def _resolve(self, request_path):
+        full_path = os.path.realpath(os.path.join(self.directory, request_path.lstrip("/")))
+        if full_path != self.directory and not full_path.startswith(self.directory + os.sep):
+            return None
+        return full_path
+
+    def _load(self, full_path):
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            self._entries.pop(full_path, None)
+            return None
+        if stat.st_size > self.max_file_size or not os.path.isfile(full_path):
+            return None
+        with open(full_path, "rb") as fh:
+            body = fh.read()
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        gzip_body = None
+        if len(body) >= self.gzip_min_size and media_type.startswith(_COMPRESSIBLE):
+            compressed = gzip.compress(body, self.gzip_level, mtime=0)
+            if len(compressed) < len(body):
+                gzip_body = compressed
+        entry = self._entries[full_path] = _StaticEntry(full_path, body, gzip_body, media_type, stat.st_mtime,
+                                                        stat.st_size)
+        return entry
+
+    def _lookup(self, full_path):
+        entry = self._entries.get(full_path)
+        if entry is not None and self.revalidate_after is not None:
+            now = time.monotonic()
+            if now - entry.checked_at > self.revalidate_after:
+                entry.checked_at = now
+                try:
+                    stat = os.stat(full_path)
+                    changed = stat.st_mtime != entry.mtime or stat.st_size != entry.size
+                except OSError:
+                    changed = True
+                if changed:
+                    entry = None
+                    self._entries.pop(full_path, None)
+        if entry is None:
+            entry = self._load(full_path)
+        return entry
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+            return await response(scope, receive, send)
+
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        full_path = self._resolve(path)
+        entry = self._lookup(full_path) if full_path else None
+        if entry is None:
+            if full_path and os.path.isfile(full_path):
+                # Archivo grande: streaming desde disco (zero-copy si el servidor lo soporta)
+                response = FileResponse(full_path, headers={"cache-control": self.cache_control})
+            else:
+                response = PlainTextResponse("Not Found", status_code=404)
+            return await response(scope, receive, send)
+
+        request_headers = Headers(scope=scope)
+        headers = {
+            "etag": entry.etag,
+            "last-modified": entry.last_modified,
+            "cache-control": self.cache_control,
+        }
+        if entry.gzip_body is not None:
+            headers["vary"] = "Accept-Encoding"
+        if _not_modified(request_headers, entry):
+            response = Response(status_code=304, headers=headers)
+        elif entry.gzip_body is not None and _accepts_gzip(request_headers.get("accept-encoding", "")):
+            headers["content-encoding"] = "gzip"
+            response = Response(entry.gzip_body, media_type=entry.media_type, headers=headers)
+        else:
+            response = Response(entry.body, media_type=entry.media_type, headers=headers)
+        await response(scope, receive, send)
+
+
+def _not_modified(request_headers, entry):
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return any(tag.strip().removeprefix("W/") in (entry.etag, "*") for tag in if_none_match.split(","))
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _accepts_gzip(accept_encoding):
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
@@ -0,0 +1,97 @@
+# streaming.py
+import csv
+import dataclasses
+import inspect
+import io
+import logging
+
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Formatos de streaming soportados y su media type
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "sse": "text/event-stream",
+}
+_MEDIA_TYPES = {media_type: fmt for fmt, media_type in STREAM_FORMATS.items()}
+
+
+def negotiate_stream_format(accept, default="ndjson"):
+    """Elige el formato de streaming a partir de la cabecera Accept."""
+    if accept:
+        for media_range in accept.split(","):
+            fmt = _MEDIA_TYPES.get(media_range.split(";", 1)[0].strip())
+            if fmt is not None:
+                return fmt
+    return default
+
+
+async def _iterate(gen):
+    """Itera un generador síncrono o asíncrono y lo cierra siempre (también si el cliente se desconecta)."""
+    if inspect.isasyncgen(gen):
+        try:
+            async for item in gen:
+                yield item
+        finally:
+            await gen.aclose()
+    else:
+        try:
+            # Los generadores síncronos avanzan en el threadpool para no bloquear el event loop
+            async for item in iterate_in_threadpool(gen):
+                yield item
+        finally:
+            try:
+                gen.close()
+            except ValueError:
+                # El hilo del threadpool todavía está dentro de next(); terminará por su cuenta
+                pass
+
+
+async def _ndjson(items, encoder):
+    async for item in items:
+        yield encoder.encode(item) + b"\n"
+
+
+async def _sse(items, encoder):
+    async for item in items:
+        yield b"data: " + encoder.encode(item) + b"\n\n"
+
+
+async def _csv(items, encoder):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header = None
+    async for item in items:
+        if isinstance(item, BaseModel):
+            item = item.model_dump(mode="json")
+        elif dataclasses.is_dataclass(item):
+            item = dataclasses.asdict(item)
+        if isinstance(item, dict):
+            if header is None:
+                header = list(item)
+                writer.writerow(header)
+            writer.writerow([item.get(key, "") for key in header])
+        else:
+            writer.writerow(item)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+_WRITERS = {"ndjson": _ndjson, "csv": _csv, "sse": _sse}
+
+
+def stream_response(gen, fmt, encoder):
+    """Envuelve el generador de un handler en una respuesta en streaming (NDJSON, CSV o SSE).
+
+    Cada elemento se serializa y se envía en cuanto se produce: el envío espera al cliente
+    (backpressure del servidor ASGI) y el generador se cierra si el cliente se desconecta.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato de streaming desconocido: {fmt}")
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} if fmt == "sse" else None
+    return StreamingResponse(_WRITERS[fmt](_iterate(gen), encoder), media_type=STREAM_FORMATS[fmt], headers=headers)
@@ -0,0 +1,187 @@
+# telemetry.py
+import logging
+import time
+import warnings
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES = ("count", "min", "max", "mean", "last")
+
+
+class _Metric:
+    """Búferes circulares de una métrica: una fila por dispositivo, `capacity` muestras por fila."""
+    __slots__ = ("timestamps", "values", "positions", "counts")
+
+    def __init__(self, rows, capacity, dtype):
+        self.timestamps = np.full((rows, capacity), np.nan)
+        self.values = np.zeros((rows, capacity), dtype=dtype)
+        self.positions = np.zeros(rows, dtype=np.int64)  # siguiente columna a escribir
+        self.counts = np.zeros(rows, dtype=np.int64)
+
+    def grow(self, rows):
+        extra = rows - len(self.positions)
+        self.timestamps = np.vstack([self.timestamps, np.full((extra, self.timestamps.shape[1]), np.nan)])
+        self.values = np.vstack([self.values, np.zeros((extra, self.values.shape[1]), dtype=self.values.dtype)])
+        self.positions = np.concatenate([self.positions, np.zeros(extra, dtype=np.int64)])
+        self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+
+
+class TelemetryStore:
+    """Últimas `capacity` muestras por dispositivo y métrica en búferes NumPy preasignados.
+
+    Cada métrica es una matriz (dispositivos x capacity) de timestamps y otra de valores, de modo que
+    los agregados sobre una ventana de tiempo se calculan para toda la flota con operaciones vectorizadas.
+    """
+
+    def __init__(self, capacity=1024, initial_devices=64, dtype=np.float64):
+        self.capacity = capacity
+        self.dtype = dtype
+        self._rows = initial_devices
+        self._device_index = {}  # device_id -> fila
+        self._device_ids = []
+        self._metrics = {}
+
+    # --- Escritura ---
+
+    def _row(self, device_id):
+        row = self._device_index.get(device_id)
+        if row is None:
+            row = self._device_index[device_id] = len(self._device_ids)
+            self._device_ids.append(device_id)
+            if row >= self._rows:
+                self._rows *= 2
+                for metric in self._metrics.values():
+                    metric.grow(self._rows)
+                logger.debug(f"Telemetría ampliada a {self._rows} dispositivos")
+        return row
+
+    def _metric(self, name):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = _Metric(self._rows, self.capacity, self.dtype)
+        return metric
+
+    def record(self, device_id, metric, value, timestamp=None):
+        """Guarda una muestra en O(1)."""
+        row = self._row(device_id)
+        buffers = self._metric(metric)
+        column = buffers.positions[row]
+        buffers.timestamps[row, column] = time.time() if timestamp is None else timestamp
+        buffers.values[row, column] = value
+        buffers.positions[row] = (column + 1) % self.capacity
+        buffers.counts[row] += 1
+
+    def record_many(self, device_ids, metric, values, timestamps=None):
+        """Guarda una muestra por dispositivo de un lote (los dispositivos no deben repetirse)."""
+        rows = np.fromiter((self._row(d) for d in device_ids), dtype=np.int64, count=len(device_ids))
+        buffers = self._metric(metric)
+        columns = buffers.positions[rows]
+        buffers.timestamps[rows, columns] = time.time() if timestamps is None else timestamps
+        buffers.values[rows, columns] = values
+        buffers.positions[rows] = (columns + 1) % self.capacity
+        buffers.counts[rows] += 1
+
+    # --- Lectura ---
+
+    @property
+    def devices(self):
+        return list(self._device_ids)
+
+    @property
+    def metrics(self):
+        return list(self._metrics)
+
+    def series(self, device_id, metric, start=None, end=None):
+        """Devuelve (timestamps, valores) de un dispositivo en orden cronológico."""
+        row = self._device_index.get(device_id)
+        buffers = self._metrics.get(metric)
+        if row is None or buffers is None:
+            return np.empty(0), np.empty(0, dtype=self.dtype)
+        order = np.roll(np.arange(self.capacity), -int(buffers.positions[row]))
+        timestamps = buffers.timestamps[row, order]
+        values = buffers.values[row, order]
+        mask = _window_mask(timestamps, start, end)
+        return timestamps[mask], values[mask]
+
+    def downsample(self, device_id, metric, start=None, end=None, buckets=60):
+        """Media por intervalo de `(end - start) / buckets` segundos; NaN en los intervalos vacíos.
+
+        Sin `start`/`end` se usa el rango de las muestras guardadas.
+        """
+        timestamps, values = self.series(device_id, metric, start, end)
+        if start is None or end is None:
+            if not len(timestamps):
+                return np.empty(0), np.empty(0)
+            start = timestamps[0] if start is None else start
+            end = timestamps[-1] if end is None else end
+        width = max(end - start, 1e-9) / buckets
+        index = np.minimum(((timestamps - start) / width).astype(np.int64), buckets - 1)
+        counts = np.bincount(index, minlength=buckets)
+        sums = np.bincount(index, weights=values, minlength=buckets)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return start + width * np.arange(buckets), means
+
+    def aggregate(self, metric, start=None, end=None, devices=None, percentiles=()):
+        """Agregados por dispositivo sobre una ventana de tiempo, calculados de una vez para todas las filas.
+
+        Devuelve un dict con los ids de dispositivo y un array por agregado (`count`, `min`, `max`,
+        `mean`, `last` y `p<N>` por cada percentil pedido), alineados con los ids.
+        """
+        buffers = self._metrics.get(metric)
+        if devices is None:
+            device_ids = self._device_ids
+            rows = np.arange(len(device_ids))
+        else:
+            device_ids = [d for d in devices if d in self._device_index]
+            rows = np.array([self._device_index[d] for d in device_ids], dtype=np.int64)
+        if buffers is None or not len(rows):
+            return {"devices": list(device_ids), **{name: np.empty(0) for name in AGGREGATES}}
+
+        timestamps = buffers.timestamps[rows]
+        mask = _window_mask(timestamps, start, end)
+        values = np.where(mask, buffers.values[rows], np.nan)
+        counts = mask.sum(axis=1)
+        result = {"devices": list(device_ids), "count": counts}
+        with warnings.catch_warnings():
+            # Filas sin muestras en la ventana: el resultado ya es NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            result["min"] = np.nanmin(values, axis=1)
+            result["max"] = np.nanmax(values, axis=1)
+            result["mean"] = np.nanmean(values, axis=1)
+            for p in percentiles:
+                result[f"p{p:g}"] = np.nanpercentile(values, p, axis=1)
+        # Último valor de la ventana: la columna con el timestamp más reciente
+        latest = np.argmax(np.where(mask, timestamps, -np.inf), axis=1)
+        last = values[np.arange(len(rows)), latest]
+        result["last"] = np.where(counts > 0, last, np.nan)
+        return result
+
+    def stats(self):
+        return {
+            "devices": len(self._device_ids),
+            "metrics": len(self._metrics),
+            "capacity": self.capacity,
+            "bytes": sum(m.timestamps.nbytes + m.values.nbytes for m in self._metrics.values()),
+        }
+
+
+def _window_mask(timestamps, start, end):
+    mask = ~np.isnan(timestamps)
+    if start is not None:
+        mask &= timestamps >= start
+    if end is not None:
+        mask &= timestamps <= end
+    return mask
+
+
+def to_json(aggregates):
+    """Convierte el resultado de `aggregate` en listas JSON (NaN -> None)."""
+    result = {}
+    for name, column in aggregates.items():
+        if isinstance(column, np.ndarray):
+            column = [None if v != v else v for v in column.tolist()]
+        result[name] = column
+    return result
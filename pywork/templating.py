@@ -0,0 +1,86 @@
+# templating.py
+import logging
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import HTMLResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateEngine:
+    """Plantillas Jinja2 con caché de bytecode persistente, precompilación y render asíncrono/en streaming."""
+
+    def __init__(self, directory="templates", bytecode_cache_dir=None, enable_async=False, auto_reload=True,
+                 cache_size=400, stream_buffer_size=4096):
+        self.directory = directory
+        self.enable_async = enable_async
+        # Tamaño mínimo de los fragmentos enviados al renderizar en streaming
+        self.stream_buffer_size = stream_buffer_size
+        self._loader = FileSystemLoader(directory)
+        self._bytecode_cache_dir = bytecode_cache_dir
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+        self._options = {"auto_reload": auto_reload, "cache_size": cache_size}
+        self.env = self._environment(enable_async=False)
+        self._async_env = None
+
+    def _environment(self, enable_async):
+        bytecode_cache = None
+        if self._bytecode_cache_dir:
+            # La clave de la caché de Jinja no distingue el modo async: cada entorno usa sus propios ficheros
+            pattern = "__pywork_async_%s.cache" if enable_async else "__pywork_%s.cache"
+            bytecode_cache = FileSystemBytecodeCache(self._bytecode_cache_dir, pattern)
+        return Environment(loader=self._loader, bytecode_cache=bytecode_cache,
+                           enable_async=enable_async, **self._options)
+
+    @property
+    def async_env(self):
+        """Entorno con `enable_async=True`, compartiendo loader y directorio de caché de bytecode."""
+        if self._async_env is None:
+            self._async_env = self._environment(enable_async=True)
+        return self._async_env
+
+    def precompile(self):
+        """Compila todas las plantillas (y llena la caché de bytecode) de antemano."""
+        environments = [self.env, self.async_env] if self.enable_async else [self.env]
+        names = self.env.list_templates()
+        for env in environments:
+            for name in names:
+                env.get_template(name)
+        logger.debug(f"Plantillas precompiladas: {len(names)} en {self.directory}")
+        return names
+
+    def render(self, template_name, **context):
+        """Render síncrono (bloquea el hilo que lo llama)."""
+        return self.env.get_template(template_name).render(**context)
+
+    async def render_async(self, template_name, **context):
+        """Render sin bloquear el event loop: `render_async` si está habilitado, si no en el threadpool."""
+        if self.enable_async:
+            return await self.async_env.get_template(template_name).render_async(**context)
+        return await run_in_threadpool(self.render, template_name, **context)
+
+    async def generate(self, template_name, **context):
+        """Genera la página por fragmentos de al menos `stream_buffer_size` bytes."""
+        template = self.async_env.get_template(template_name)
+        buffer = []
+        size = 0
+        async for chunk in template.generate_async(**context):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= self.stream_buffer_size:
+                yield "".join(buffer).encode("utf-8")
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+    def response(self, template_name, status_code=200, **context):
+        return HTMLResponse(self.render(template_name, **context), status_code=status_code)
+
+    def stream(self, template_name, status_code=200, **context):
+        """Respuesta HTML en streaming: los primeros bytes salen antes de terminar el render."""
+        return StreamingResponse(self.generate(template_name, **context), status_code=status_code,
+                                 media_type="text/html; charset=utf-8")
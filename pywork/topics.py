@@ -0,0 +1,100 @@
+# topics.py
+SHARED_PREFIX = "$share/"
+
+
+def split_shared(topic_filter):
+    """Separa `$share/<grupo>/<filtro>` en (grupo, filtro); sin prefijo devuelve (None, filtro)."""
+    if topic_filter.startswith(SHARED_PREFIX):
+        group, sep, real_filter = topic_filter[len(SHARED_PREFIX):].partition("/")
+        if not group or not sep or not real_filter:
+            raise ValueError(f"Suscripción compartida inválida: {topic_filter}")
+        return group, real_filter
+    return None, topic_filter
+
+
+def validate_filter(topic_filter):
+    """Comprueba las reglas de MQTT para `+` y `#` y devuelve los niveles del filtro."""
+    if not topic_filter:
+        raise ValueError("El filtro de tópicos no puede estar vacío")
+    levels = topic_filter.split("/")
+    for index, level in enumerate(levels):
+        if "#" in level and (level != "#" or index != len(levels) - 1):
+            raise ValueError(f"'#' debe ocupar el último nivel completo: {topic_filter}")
+        if "+" in level and level != "+":
+            raise ValueError(f"'+' debe ocupar un nivel completo: {topic_filter}")
+    return levels
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
+
+
+class TopicTrie:
+    """Árbol de filtros MQTT por niveles con comodines `+` y `#`.
+
+    `match` recorre solo las ramas literales, `+` y `#` de cada nivel del tópico, de modo que el coste
+    depende de la profundidad del tópico y no del número de filtros registrados.
+    Los filtros `$share/<grupo>/...` se indexan por su filtro real.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, topic_filter, value):
+        node = self._root
+        for level in validate_filter(split_shared(topic_filter)[1]):
+            node = node.children.setdefault(level, _Node())
+        node.values.append(value)
+        self._count += 1
+
+    def remove(self, topic_filter, value):
+        """Elimina un valor y poda los nodos que quedan vacíos."""
+        levels = split_shared(topic_filter)[1].split("/")
+        path = [self._root]
+        for level in levels:
+            node = path[-1].children.get(level)
+            if node is None:
+                raise KeyError(topic_filter)
+            path.append(node)
+        path[-1].values.remove(value)
+        self._count -= 1
+        for index in range(len(levels), 0, -1):
+            node = path[index]
+            if node.values or node.children:
+                break
+            del path[index - 1].children[levels[index - 1]]
+
+    def match(self, topic):
+        """Devuelve los valores de todos los filtros que encajan con `topic`."""
+        levels = topic.split("/")
+        depth = len(levels)
+        found = []
+        # Los tópicos que empiezan por `$` no encajan con comodines en el primer nivel
+        wildcards = not topic.startswith("$")
+        stack = [(self._root, 0)]
+        while stack:
+            node, index = stack.pop()
+            children = node.children
+            if wildcards or index > 0:
+                multi = children.get("#")
+                if multi is not None:
+                    found.extend(multi.values)
+            if index == depth:
+                found.extend(node.values)
+                continue
+            child = children.get(levels[index])
+            if child is not None:
+                stack.append((child, index + 1))
+            if wildcards or index > 0:
+                single = children.get("+")
+                if single is not None:
+                    stack.append((single, index + 1))
+        return found
@@ -28,6 +28,11 @@ setup(
     packages=find_packages(include=['pywork', 'pywork.*']),
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        "fast": ["orjson"],
+        "iot": ["numpy"],
+        "server": ["uvloop; sys_platform != 'win32'", "httptools"],
+    },
     entry_points={
         'console_scripts': [
             'pywork=pywork.scripts:manage_project',
@@ -38,5 +43,5 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.7",
+    python_requires=">=3.10",
 )
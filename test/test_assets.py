@@ -0,0 +1,21 @@
+from starlette.testclient import TestClient
+from pywork import Framework
+
+
+def test_use_script_serves_fingerprinted_immutable_asset(tmp_path):
+    app = Framework()
+    app.assets.directory = str(tmp_path)
+    tag = app.use_script("console.log('hola');", "main")
+    assert tag == app.use_script("console.log('hola');", "main")
+    assert tag != app.use_script("console.log('adios');", "main")
+    assert len(list(tmp_path.iterdir())) == 2
+
+    url = tag.split('"')[1]
+    assert url.startswith("/assets/main.") and url.endswith(".js")
+
+    client = TestClient(app.get_app())
+    response = client.get(url)
+    assert response.text == "console.log('hola');"
+    assert response.headers["cache-control"].endswith("immutable")
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/assets/missing.js").status_code == 404
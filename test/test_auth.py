@@ -1,9 +1,15 @@
 # test/test_auth.py
 
+import json
+import time
+
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from starlette.testclient import TestClient
 from pywork.core import Framework
-from jose import jwt
+from pywork.auth import TokenVerifier
+from jose import jwk, jwt
 from starlette.responses import JSONResponse
 
 @pytest.fixture
@@ -18,7 +24,9 @@ def client():
 
     # Configura la aplicación sin iniciar el servidor
     app = framework.get_app()
-    return TestClient(app)
+    test_client = TestClient(app)
+    test_client.app_framework = framework
+    return test_client
 
 def test_access_secure_route_with_valid_token(client):
     # Genera un token JWT válido con permisos de "admin"
@@ -51,3 +59,43 @@ def test_access_secure_route_without_token(client):
     # Verifica que el acceso sea denegado debido a la falta de token
     assert response.status_code == 401
     assert response.json() == {"error": "Token faltante"}
+
+def test_verified_tokens_are_cached_until_exp(client):
+    verifier = client.app_framework.token_verifier
+    token = jwt.encode({"sub": "user123", "permissions": ["admin"], "exp": int(time.time()) + 60}, "secret", algorithm="HS256")
+    for _ in range(3):
+        assert client.get("/secure", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert verifier.stats()["misses"] == 1 and verifier.stats()["hits"] == 2
+
+    expired = jwt.encode({"sub": "user123", "permissions": ["admin"], "exp": int(time.time()) - 1}, "secret", algorithm="HS256")
+    assert client.get("/secure", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+    assert client.get("/secure", headers={"Authorization": "Bearer"}).status_code == 401
+
+def test_token_cache_is_bounded():
+    verifier = TokenVerifier(max_entries=2)
+    for user in ("a", "b", "c"):
+        verifier.verify(jwt.encode({"sub": user}, "secret", algorithm="HS256"))
+    assert verifier.stats()["entries"] == 2
+
+def test_rs256_with_local_jwks(tmp_path):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption())
+    public_jwk = jwk.construct(private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo), "RS256").to_dict()
+    public_jwk["kid"] = "k1"
+    jwks_path = tmp_path / "jwks.json"
+    jwks_path.write_text(json.dumps({"keys": [public_jwk]}))
+
+    framework = Framework()
+    framework.configure_jwt(algorithms=["RS256"], jwks_path=str(jwks_path))
+
+    @framework.configure_route("/rs", methods=["GET"], middleware_func=framework.token_required(["admin"]))
+    async def rs_route(request):
+        return {"user": request.state.user}
+
+    rs_client = TestClient(framework.get_app())
+    token = jwt.encode({"sub": "svc", "permissions": ["admin"]}, private_pem.decode(), algorithm="RS256", headers={"kid": "k1"})
+    assert rs_client.get("/rs", headers={"Authorization": f"Bearer {token}"}).json() == {"user": "svc"}
+    forged = jwt.encode({"sub": "svc", "permissions": ["admin"]}, "secret", algorithm="HS256", headers={"kid": "k1"})
+    assert rs_client.get("/rs", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+from starlette.testclient import TestClient
+from pywork import Framework
+
+
+def test_cached_route_serves_from_cache_and_answers_conditional_get():
+    app = Framework()
+    calls = []
+
+    @app.route("/stats", methods=["GET"], cache={"ttl": 60, "vary": ["Accept-Language"]})
+    async def stats():
+        calls.append(1)
+        return {"count": len(calls)}
+
+    client = TestClient(app.get_app())
+    first = client.get("/stats")
+    assert first.json() == {"count": 1}
+    etag = first.headers["etag"]
+
+    assert client.get("/stats").json() == {"count": 1}
+    assert client.get("/stats", headers={"Accept-Language": "es"}).json() == {"count": 2}
+    assert client.get("/stats?page=2").json() == {"count": 3}
+
+    not_modified = client.get("/stats", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+    assert app.response_cache.stats()["hits"] == 2
+
+    app.response_cache.invalidate("/stats")
+    assert client.get("/stats").json() == {"count": 4}
+
+
+def test_concurrent_misses_are_coalesced():
+    app = Framework()
+    calls = []
+
+    @app.route("/slow", methods=["GET"], cache=5)
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app.get_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get("/slow") for _ in range(10)))
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(r.json() == {"ok": True} for r in responses)
+    assert len(calls) == 1
+    assert app.response_cache.stats()["coalesced"] == 9
+
+
+def test_cache_respects_byte_budget():
+    app = Framework()
+    app.response_cache.max_bytes = 2000
+
+    @app.route("/big/{n}", methods=["GET"], cache=60)
+    async def big(n: int):
+        return {"data": "x" * 600, "n": n}
+
+    client = TestClient(app.get_app())
+    for n in range(5):
+        client.get(f"/big/{n}")
+    assert app.response_cache.stats()["bytes"] <= 2000
+    assert app.response_cache.stats()["entries"] < 5
@@ -0,0 +1,116 @@
+import asyncio
+import struct
+
+import pytest
+from pywork.codecs import Codec, CodecRegistry, JSONCodec, RawCodec, StructCodec, TextCodec
+from pywork.iot_module import IoTModule
+from pywork.mqtt import MQTTBridge, MQTTMessage
+
+FRAME = StructCodec([("device", "H"), ("seq", "I"), ("temp", "f"), ("status", "B")])
+
+
+def test_struct_codec_roundtrip_from_memoryview():
+    payload = FRAME.encode({"device": 7, "seq": 42, "temp": 21.5, "status": 1})
+    assert FRAME.size == len(payload) == 11
+    frame = FRAME.decode(memoryview(bytearray(b"\x00" + payload))[1:])
+    assert frame == (7, 42, 21.5, 1) and frame.temp == 21.5
+    with pytest.raises(ValueError):
+        FRAME.decode(payload[:-1])
+
+
+def test_struct_codec_groups_repeated_fields():
+    codec = StructCodec([("xyz", "3f"), ("t", "H"), ("tag", "4s")])
+    payload = codec.encode({"xyz": (1.0, 2.0, 3.0), "t": 7, "tag": b"abcd"})
+    assert len(payload) == codec.size == 18
+    frame = codec.decode(payload)
+    assert frame.xyz == (1.0, 2.0, 3.0) and frame.t == 7 and frame.tag == b"abcd"
+    assert codec.encode(frame) == payload
+    with pytest.raises(ValueError):
+        codec.encode({"xyz": (1.0, 2.0), "t": 7, "tag": b"abcd"})
+
+
+def test_batch_decode_into_numpy():
+    pytest.importorskip("numpy")
+    payloads = [FRAME.encode((i, i * 10, i / 2, i % 2)) for i in range(1000)]
+    frames = FRAME.decode_many(payloads)
+    assert frames.shape == (1000,)
+    assert frames["device"][999] == 999 and frames["temp"][3] == 1.5
+    assert frames["status"].sum() == 500
+    packed = b"".join(payloads[:10])
+    view = FRAME.decode_frames(packed)
+    assert view["seq"].tolist() == [i * 10 for i in range(10)]
+    assert not view.flags.owndata
+
+
+def test_registry_prefers_most_specific_filter():
+    registry = CodecRegistry(default=JSONCodec())
+    registry.register("plant/#", TextCodec())
+    registry.register("plant/+/frame", FRAME)
+    assert registry.lookup("plant/1/frame") is FRAME
+    assert isinstance(registry.lookup("plant/1/name"), TextCodec)
+    assert registry.decode("other", b'{"a": 1}') == {"a": 1}
+    assert isinstance(CodecRegistry().lookup("x"), RawCodec)
+
+
+def test_bridge_default_codec_is_configurable():
+    with pytest.raises(TypeError):
+        Codec()
+
+    async def scenario():
+        iot = IoTModule()
+        iot.mqtt = MQTTBridge("localhost", default_codec=JSONCodec())
+        values = []
+
+        async def handler(message):
+            values.append(message.value)
+
+        iot.mqtt.subscribe("plant/#", handler)
+        await iot.start()
+        iot.mqtt.feed(MQTTMessage("plant/p1/config", b'{"rate": 5}'))
+        await asyncio.sleep(0.02)
+        await iot.stop()
+        return values
+
+    assert asyncio.run(scenario()) == [{"rate": 5}]
+    assert isinstance(MQTTBridge("localhost").codecs.default, RawCodec)
+
+
+def test_bridge_decodes_once_before_fan_out():
+    pytest.importorskip("numpy")  # la comprobación final pasa por la telemetría
+
+    class CountingCodec(StructCodec):
+        calls = 0
+
+        def decode(self, payload):
+            CountingCodec.calls += 1
+            return super().decode(payload)
+
+    codec = CountingCodec([("temp", "f")])
+
+    async def scenario():
+        iot = IoTModule()
+        iot.mqtt = MQTTBridge("localhost")
+        iot.register_codec("plant/+/temp", codec)
+        values = []
+
+        async def first(message):
+            values.append(message.value.temp)
+
+        async def second(message):
+            values.append(message.value.temp)
+
+        iot.mqtt.subscribe("plant/+/temp", first)
+        iot.mqtt.subscribe("plant/#", second)
+        iot.track_telemetry("plant/+/temp", parse=lambda frame: frame.temp)
+        await iot.start()
+        iot.mqtt.feed(MQTTMessage("plant/p1/temp", struct.pack("<f", 19.5)))
+        iot.mqtt.feed(MQTTMessage("plant/p1/temp", b"bad"))
+        await asyncio.sleep(0.02)
+        await iot.stop()
+        return iot, values
+
+    iot, values = asyncio.run(scenario())
+    assert values == [19.5, 19.5]
+    assert CountingCodec.calls == 2
+    assert iot.mqtt.stats()["decode_errors"] == 1
+    assert iot.telemetry.series("p1", "temp")[1].tolist() == [19.5]
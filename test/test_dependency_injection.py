@@ -1,7 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
 import pytest
-from pywork import Framework
-from pywork.Dependency_container import LifeCycle
+from starlette.testclient import TestClient
+from pywork import Framework, container
+from pywork.Dependency_container import DependencyContainer, LifeCycle, Scope
 
 # Mock dependency class
 class IService(ABC):
@@ -38,4 +40,307 @@ def test_dependency_lifecycle_transient():
     app.register_dependency(IService, ServiceMock, life_cycle=LifeCycle.TRANSIENT)
     instance1 = app.get_dependency(IService)
     instance2 = app.get_dependency(IService)
-    assert instance1 is not instance2, "Transient lifecycle is not maintained for dependencies registered by interface."
\ No newline at end of file
+    assert instance1 is not instance2, "Transient lifecycle is not maintained for dependencies registered by interface."
+
+class Repository:
+    pass
+
+class UnitOfWork:
+    def __init__(self, repo: Repository):
+        self.repo = repo
+
+class CycleA:
+    def __init__(self, b: "CycleB"):
+        self.b = b
+
+class CycleB:
+    def __init__(self, a: CycleA):
+        self.a = a
+
+CycleA.__init__.__annotations__["b"] = CycleB
+
+def test_scoped_lifecycle_shared_within_scope():
+    """Las instancias scoped se comparten dentro del mismo contexto y se propagan a las dependencias."""
+    container = DependencyContainer()
+    container.register(Repository, Repository, LifeCycle.SCOPED)
+    container.register(UnitOfWork, UnitOfWork, LifeCycle.TRANSIENT)
+    scope = {}
+    uow1 = container.resolve(UnitOfWork, scope)
+    uow2 = container.resolve(UnitOfWork, scope)
+    assert uow1 is not uow2
+    assert uow1.repo is uow2.repo is container.resolve(Repository, scope)
+    assert container.resolve(Repository, {}) is not uow1.repo
+
+def test_singletons_are_isolated_per_container():
+    """Los singletons no se filtran entre contenedores distintos."""
+    first, second = DependencyContainer(), DependencyContainer()
+    first.register(Repository, Repository)
+    second.register(Repository, Repository)
+    assert first.resolve(Repository) is first.resolve(Repository)
+    assert first.resolve(Repository) is not second.resolve(Repository)
+    assert not hasattr(Repository, "_instance")
+
+def test_register_invalidates_plan_and_dependent_singletons():
+    """Volver a registrar una dependencia invalida su plan y los singletons que dependen de ella."""
+    container = DependencyContainer()
+    container.register(Repository, Repository)
+    container.register(UnitOfWork, UnitOfWork)
+    old = container.resolve(UnitOfWork)
+    assert container.compile(UnitOfWork).order == (Repository, UnitOfWork)
+
+    class OtherRepository(Repository):
+        pass
+
+    container.register(Repository, OtherRepository)
+    new = container.resolve(UnitOfWork)
+    assert new is not old
+    assert isinstance(new.repo, OtherRepository)
+
+def test_singleton_cannot_capture_scoped_dependency_through_transient():
+    class Session:
+        pass
+
+    class Repo:
+        def __init__(self, session: Session):
+            self.session = session
+
+    class Service:
+        def __init__(self, repo: Repo):
+            self.repo = repo
+
+    local = DependencyContainer()
+    local.register(Session, Session, LifeCycle.SCOPED)
+    local.register(Repo, Repo, LifeCycle.TRANSIENT)
+    local.register(Service, Service, LifeCycle.SINGLETON)
+    with pytest.raises(ValueError, match="'Repo' \\(transient\\), que depende de 'Session' \\(scoped\\)"):
+        local.resolve(Service, Scope())
+    local.register(Service, Service, LifeCycle.TRANSIENT)
+    scope = Scope()
+    assert local.resolve(Service, scope).repo.session is scope[Session]
+
+
+def test_circular_dependency_detected_at_compile_time():
+    container = DependencyContainer()
+    container.register(CycleA, CycleA, LifeCycle.TRANSIENT)
+    container.register(CycleB, CycleB, LifeCycle.TRANSIENT)
+    with pytest.raises(ValueError, match="circular"):
+        container.compile(CycleA)
+
+
+class Session:
+    def __init__(self):
+        self.closed = False
+
+    @classmethod
+    async def create(cls):
+        return cls()
+
+    async def aclose(self):
+        self.closed = True
+
+def test_request_scope_with_async_factory_and_disposal():
+    """Cada petición abre un ámbito: las instancias scoped se comparten en ella y se liberan al final."""
+    app = Framework()
+    app.register_dependency(Session, Session, life_cycle=LifeCycle.SCOPED)
+    sessions = []
+
+    @app.route("/scoped", methods=["GET"])
+    async def scoped_route(first: Session, second: Session):
+        sessions.append(first)
+        assert first is second and not first.closed
+        return {"ok": True}
+
+    client = TestClient(app.get_app())
+    assert client.get("/scoped").json() == {"ok": True}
+    assert client.get("/scoped").json() == {"ok": True}
+    assert sessions[0] is not sessions[1]
+    assert all(session.closed for session in sessions)
+
+    with pytest.raises(ValueError, match="aresolve"):
+        container.resolve(Session, {})
+
+
+class Connection:
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_pooled_lifecycle_lends_one_instance_per_request():
+    """Las instancias POOLED se prestan por petición y se devuelven al pool al terminar."""
+    app = Framework()
+    app.register_dependency(Connection, Connection, life_cycle=LifeCycle.POOLED,
+                            max_size=2, health_check=lambda conn: conn.healthy)
+    seen = []
+
+    @app.route("/pooled", methods=["GET"])
+    async def pooled_route(first: Connection, second: Connection):
+        assert first is second
+        seen.append(first)
+        return {"stats": app.get_pool_stats(Connection)}
+
+    client = TestClient(app.get_app())
+    during = client.get("/pooled").json()["stats"]
+    assert during["in_use"] == 1 and during["size"] == 1
+    client.get("/pooled")
+    assert seen[0] is seen[1]
+
+    seen[0].healthy = False
+    client.get("/pooled")
+    assert seen[2] is not seen[0] and seen[0].closed
+    stats = app.get_pool_stats(Connection)
+    assert stats["in_use"] == 0 and stats["idle"] == 1 and stats["created"] == 2
+
+def test_pool_bounds_concurrent_borrowers():
+    async def scenario():
+        container = DependencyContainer()
+        container.register(Connection, Connection, LifeCycle.POOLED, max_size=1)
+        first_scope, second_scope = Scope(), Scope()
+        first = await container.aresolve(Connection, first_scope)
+        waiter = asyncio.ensure_future(container.aresolve(Connection, second_scope))
+        await asyncio.sleep(0)
+        assert container.pool_stats(Connection)["waiters"] == 1
+        await first_scope.aclose()
+        assert await waiter is first
+        await second_scope.aclose()
+        await container.aclose()
+
+    asyncio.run(scenario())
+
+def test_pool_reaps_idle_instances_without_traffic_and_refills_min_size():
+    async def scenario():
+        from pywork.pool import InstancePool
+
+        created = []
+
+        async def factory():
+            created.append(Connection())
+            return created[-1]
+
+        pool = InstancePool(factory, min_size=2, max_size=4, idle_timeout=0.05,
+                            health_check=lambda conn: conn.healthy)
+        borrowed = [await pool.acquire() for _ in range(4)]
+        for conn in borrowed:
+            await pool.release(conn)
+        assert pool.stats()["idle"] == 4
+        # Sin más tráfico, las ociosas caducan hasta min_size
+        await asyncio.sleep(0.2)
+        assert pool.stats()["size"] == 2 and sum(conn.closed for conn in created) == 2
+
+        # Los descartes por health check se reponen en segundo plano hasta min_size
+        for conn, _ in pool._idle:
+            conn.healthy = False
+        conn = await pool.acquire()
+        assert conn.healthy
+        await pool.release(conn)
+        await asyncio.sleep(0.01)
+        stats = pool.stats()
+        assert stats["size"] == stats["idle"] == 2 and sum(conn.closed for conn in created) == 4
+        await pool.aclose()
+
+    asyncio.run(scenario())
+
+def test_reregistering_disposes_idle_instances_of_the_old_pool():
+    async def scenario():
+        container = DependencyContainer()
+        container.register(Connection, Connection, LifeCycle.POOLED, max_size=2)
+        scope = Scope()
+        first = await container.aresolve(Connection, scope)
+        await scope.aclose()
+        container.register(Connection, Connection, LifeCycle.POOLED, max_size=2)
+        await asyncio.sleep(0)
+        assert first.closed
+        await container.aclose()
+
+    asyncio.run(scenario())
+
+def test_pools_invalidated_outside_the_loop_close_with_the_container():
+    container = DependencyContainer()
+    container.register(Connection, Connection, LifeCycle.POOLED, max_size=2)
+
+    async def borrow():
+        scope = Scope()
+        conn = await container.aresolve(Connection, scope)
+        await scope.aclose()
+        return conn
+
+    first = asyncio.run(borrow())
+    container.register(Connection, Connection, LifeCycle.POOLED, max_size=2)
+    assert not first.closed
+    asyncio.run(container.aclose())
+    assert first.closed
+
+class SlowEngine:
+    created = 0
+
+    def __init__(self):
+        self.closed = False
+
+    @classmethod
+    async def create(cls):
+        cls.created += 1
+        await asyncio.sleep(0.01)
+        return cls()
+
+    async def aclose(self):
+        self.closed = True
+
+def test_concurrent_async_resolution_runs_the_factory_once():
+    async def scenario():
+        SlowEngine.created = 0
+        singletons = DependencyContainer()
+        singletons.register(SlowEngine, SlowEngine, LifeCycle.SINGLETON)
+        engines = await asyncio.gather(*(singletons.aresolve(SlowEngine) for _ in range(10)))
+        assert SlowEngine.created == 1 and all(engine is engines[0] for engine in engines)
+        await singletons.aclose()
+        assert engines[0].closed
+
+        SlowEngine.created = 0
+        scoped = DependencyContainer()
+        scoped.register(SlowEngine, SlowEngine, LifeCycle.SCOPED)
+        scope = Scope()
+        engines = await asyncio.gather(*(scoped.aresolve(SlowEngine, scope) for _ in range(10)))
+        assert SlowEngine.created == 1 and all(engine is engines[0] for engine in engines)
+        await scope.aclose()
+        assert engines[0].closed
+
+    asyncio.run(scenario())
+
+def test_cancelled_first_resolver_does_not_break_the_others():
+    async def scenario():
+        container = DependencyContainer()
+        container.register(SlowEngine, SlowEngine, LifeCycle.SINGLETON)
+        first = asyncio.ensure_future(container.aresolve(SlowEngine))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(container.aresolve(SlowEngine))
+        await asyncio.sleep(0)
+        first.cancel()
+        engine = await second
+        assert await container.aresolve(SlowEngine) is engine
+        await container.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_hooks_run_before_the_container_closes():
+    class Engine:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    app = Framework()
+    app.register_dependency(Engine, Engine)
+    engine = app.get_dependency(Engine)
+    seen = []
+
+    async def drain_workers():
+        seen.append(engine.closed)
+        raise RuntimeError("fallo al parar")
+
+    app.shutdown_hooks.append(drain_workers)
+    with TestClient(app.get_app()):
+        pass
+    assert seen == [False] and engine.closed
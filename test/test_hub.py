@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from starlette.testclient import TestClient
+from pywork import Framework
+from pywork.hub import Hub
+from pywork.mqtt import MQTTBridge, MQTTMessage
+
+
+@pytest.fixture
+def app():
+    app = Framework()
+    app.hub_route("/live/{channel}")
+    app.hub_route("/live", client_subscriptions=True)
+
+    @app.route("/publish/{channel}", methods=["POST"])
+    async def publish(channel: str, data: dict):
+        return {"delivered": app.hub.publish(channel, data)}
+
+    return app
+
+
+def test_channels_fan_out_to_subscribers(app):
+    # Un solo portal (event loop) para todas las conexiones, como en un servidor real
+    with TestClient(app.get_app()) as client, client.websocket_connect("/live/plant1") as first, \
+            client.websocket_connect("/live/plant1") as second, client.websocket_connect("/live") as dynamic:
+        dynamic.send_json({"subscribe": "plant2"})
+        deadline = time.monotonic() + 2
+        while "plant2" not in app.hub.channels and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert client.post("/publish/plant1", json={"temp": 21}).json() == {"delivered": 2}
+        assert client.post("/publish/plant2", json={"temp": 7}).json() == {"delivered": 1}
+        assert first.receive_json() == {"channel": "plant1", "data": {"temp": 21}}
+        assert second.receive_json() == {"channel": "plant1", "data": {"temp": 21}}
+        assert dynamic.receive_json() == {"channel": "plant2", "data": {"temp": 7}}
+    assert app.hub.stats()["connections"] == 0
+
+
+class SlowSocket:
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.sent.append(message["text"])
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.mark.parametrize("policy", ["drop", "disconnect"])
+def test_slow_consumer_does_not_stall_others(policy):
+    async def scenario():
+        hub = Hub(queue_size=2, slow_consumer=policy)
+        slow, fast = SlowSocket(), SlowSocket()
+        fast.gate.set()
+        slow_connection = hub.connect(slow)
+        hub.connect(fast)
+        for connection in list(hub.connections):
+            hub.subscribe(connection, "c")
+        await asyncio.sleep(0)
+        for i in range(6):
+            hub.publish("c", i)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        slow.gate.set()
+        await asyncio.sleep(0.01)
+        stats = hub.stats()
+        await hub.close()
+        return slow, fast, slow_connection, stats
+
+    slow, fast, slow_connection, stats = asyncio.run(scenario())
+    assert len(fast.sent) == 6
+    if policy == "drop":
+        # El primero quedó en vuelo; de la cola solo sobreviven los dos más recientes
+        assert [text[-2] for text in slow.sent] == ["0", "4", "5"]
+        assert stats["dropped"] == 3 and stats["disconnected"] == 0
+    else:
+        assert slow.closed_with == 1008 and stats["disconnected"] == 1
+        assert slow_connection.closed
+
+
+def test_mqtt_topics_bridge_into_channels():
+    async def scenario():
+        hub = Hub()
+        bridge = MQTTBridge("localhost")
+        hub.bridge_mqtt(bridge, "plant/+/temp", channel="plant/{1}")
+        socket = SlowSocket()
+        socket.gate.set()
+        connection = hub.connect(socket)
+        hub.subscribe(connection, "plant/p1")
+        await bridge.start(connect=False)
+        bridge.feed(MQTTMessage("plant/p1/temp", b"21.5"))
+        bridge.feed(MQTTMessage("plant/p2/temp", b"19"))
+        await asyncio.sleep(0.02)
+        await bridge.stop()
+        await hub.close()
+        return socket.sent
+
+    assert asyncio.run(scenario()) == ['{"channel":"plant/p1","data":"21.5"}']
@@ -0,0 +1,92 @@
+import asyncio
+
+from pywork.iot_module import IoTModule
+from pywork.liveness import LivenessTracker
+from pywork.mqtt import MQTTBridge, MQTTMessage
+
+
+def test_expire_only_touches_devices_that_time_out():
+    async def scenario():
+        tracker = LivenessTracker(timeout=10)
+        for i in range(1000):
+            tracker.register(f"d{i}")
+        assert tracker.counts() == {"online": 0, "offline": 1000, "transitions": 0}
+        for i in range(1000):
+            tracker.seen(f"d{i}", now=0)
+        for i in range(500):
+            tracker.seen(f"d{i}", now=8)
+        assert tracker.expire(now=5) == []
+        expired = tracker.expire(now=11)
+        assert sorted(expired) == sorted(f"d{i}" for i in range(500, 1000))
+        assert tracker.online_count == 500 and tracker.offline_count == 500
+        assert tracker.expire(now=17) == []
+        assert len(tracker.expire(now=19)) == 500
+        assert tracker.online_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_deadlines_share_slots_instead_of_one_entry_per_device():
+    tracker = LivenessTracker(timeout=10, resolution=1.0)
+    for tick in range(5):
+        for i in range(1000):
+            tracker.seen(f"d{i}", now=tick + (i + 1) / 1001)
+    # 1000 dispositivos con heartbeats repartidos en el último segundo: una sola ranura pendiente por vencer
+    assert len([slot for slot, devices in tracker._slots.items() if devices]) == 1
+    assert len(tracker._heap) <= 6
+    assert tracker.expire(now=14.5) == []
+    assert len(tracker.expire(now=15)) == 1000
+
+
+def test_callbacks_fire_on_transitions():
+    async def scenario():
+        events = []
+
+        async def on_online(device_id):
+            events.append(("online", device_id))
+
+        async def on_offline(device_id):
+            events.append(("offline", device_id))
+
+        tracker = LivenessTracker(timeout=0.05, on_online=on_online, on_offline=on_offline)
+        await tracker.start()
+        tracker.seen("a")
+        tracker.seen("a")
+        await asyncio.sleep(0.12)
+        tracker.seen("a")
+        await asyncio.sleep(0.01)
+        await tracker.stop()
+        return events
+
+    assert asyncio.run(scenario()) == [("online", "a"), ("offline", "a"), ("online", "a")]
+
+
+def test_iot_module_heartbeats_from_mqtt():
+    async def scenario():
+        iot = IoTModule(heartbeat_timeout=0.05)
+        iot.mqtt = MQTTBridge("localhost")
+        iot.register_device("p1", {"type": "sensor"})
+        iot.register_device("p2", {"type": "sensor"}, heartbeat_timeout=60)
+        iot.track_liveness("plant/+/#")
+        await iot.start()
+        iot.mqtt.feed(MQTTMessage("plant/p1/temp", b"20"))
+        iot.mqtt.feed(MQTTMessage("plant/p2/temp", b"20"))
+        await asyncio.sleep(0.02)
+        assert iot.device_counts()["online"] == 2
+        await asyncio.sleep(0.1)
+        counts = iot.device_counts()
+        await iot.stop()
+        return counts, iot.liveness.is_online("p2")
+
+    counts, p2_online = asyncio.run(scenario())
+    assert counts["online"] == 1 and counts["offline"] == 1 and p2_online
+
+
+def test_iot_module_without_telemetry_does_not_load_numpy():
+    import subprocess
+    import sys
+
+    code = ("import sys; from pywork.iot_module import IoTModule; iot = IoTModule(); "
+            "iot.register_device('d1', {}); print('numpy' in sys.modules, iot._telemetry)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "None"]
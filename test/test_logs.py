@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+
+from starlette.testclient import TestClient
+
+from pywork import Framework
+from pywork.logs import JSONFormatter, SamplingFilter, configure_logging
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.records.append(record)
+        self.lines.append(self.format(record))
+
+
+class Formatted:
+    """Argumento que recuerda en qué hilo se formateó."""
+
+    def __init__(self):
+        self.thread = None
+
+    def __str__(self):
+        self.thread = threading.current_thread()
+        return "valor"
+
+
+def test_sampling_keeps_burst_then_one_in_every():
+    sampler = SamplingFilter(every=10, burst=3, interval=60)
+    logger = logging.getLogger("test.sampling")
+    passed = []
+    for i in range(50):
+        record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "mensaje %d", (i,), None)
+        if sampler.filter(record):
+            passed.append((i, getattr(record, "sampled", 0)))
+    assert passed == [(0, 0), (1, 0), (2, 0), (12, 9), (22, 9), (32, 9), (42, 9)]
+
+
+def test_pipeline_formats_and_writes_off_the_calling_thread():
+    capture = Capture()
+    capture.setFormatter(logging.Formatter("%(message)s"))
+    pipeline = configure_logging(logging.DEBUG, handlers=[capture], loggers=("test.pipeline",))
+    argument = Formatted()
+    try:
+        logging.getLogger("test.pipeline").info("arg=%s", argument)
+    finally:
+        pipeline.stop()
+    assert capture.lines == ["arg=valor"]
+    assert argument.thread is not threading.current_thread()
+    assert threading.current_thread().name not in capture.threads
+
+
+def test_pipeline_restarts_its_listener_after_fork():
+    capture = Capture()
+    pipeline = configure_logging(handlers=[capture], loggers=("test.fork",))
+    try:
+        old_queue = pipeline.queue
+        pipeline._pid = -1  # como si este proceso fuese un worker recién creado
+        pipeline.after_fork()
+        assert pipeline.queue is not old_queue and pipeline.handler.queue is pipeline.queue
+        logging.getLogger("test.fork").warning("desde el worker")
+    finally:
+        pipeline.stop()
+    assert [record.getMessage() for record in capture.records] == ["desde el worker"]
+
+
+def test_json_formatter_includes_extra_fields():
+    logger = logging.getLogger("test.json")
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "GET %s", ("/x",), None,
+                               extra={"status": 200, "duration_ms": 1.5})
+    event = json.loads(JSONFormatter().format(record))
+    assert event["message"] == "GET /x" and event["level"] == "INFO" and event["logger"] == "test.json"
+    assert event["status"] == 200 and event["duration_ms"] == 1.5
+
+
+def test_access_log_records_timing_fields():
+    app = Framework()
+
+    @app.route("/ping", methods=["GET"])
+    async def ping():
+        return {"ok": True}
+
+    capture = Capture()
+    pipeline = app.configure_logging(handlers=[capture])
+    try:
+        with TestClient(app.get_app()) as client:
+            assert client.get("/ping").status_code == 200
+            assert client.get("/missing").status_code == 404
+    finally:
+        pipeline.stop()
+    access = [record for record in capture.records if record.name == "pywork.access"]
+    assert [(r.method, r.path, r.status) for r in access] == [("GET", "/ping", 200), ("GET", "/missing", 404)]
+    assert access[0].bytes == len(b'{"ok":true}')
+    assert access[0].duration_ms >= access[0].ttfb_ms >= 0
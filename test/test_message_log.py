@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from pywork.iot_module import IoTModule
+from pywork.message_log import _HEADER, MessageLog
+from pywork.mqtt import MQTTMessage
+
+
+def fill(log, count, start=1000.0):
+    for i in range(count):
+        log.append(f"plant/d{i % 3}/temp", b"%d" % i, timestamp=start + i)
+    log.flush()
+
+
+def test_range_scan_uses_segments_and_index(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=2048, index_interval=256)
+    fill(log, 500)
+    assert log.stats()["segments"] > 1
+    messages = list(log.replay(start=1100, end=1104))
+    assert [m.timestamp for m in messages] == [1100, 1101, 1102, 1103, 1104]
+    assert messages[0].topic == "plant/d1/temp" and messages[0].payload == b"100"
+    only_d0 = list(log.replay(1100, 1110, topic_filter="plant/d0/+"))
+    assert [m.payload for m in only_d0] == [b"102", b"105", b"108"]
+    log.close()
+
+
+def test_reopen_recovers_and_truncates_torn_tail(tmp_path):
+    log = MessageLog(str(tmp_path), index_interval=128)
+    fill(log, 50)
+    log.close()
+    active = sorted(p for p in os.listdir(tmp_path) if p.endswith(".log"))[-1]
+    with open(tmp_path / active, "ab") as fh:
+        fh.write(b"\x01\x02\x03 registro a medio escribir")
+    os.remove(tmp_path / active.replace(".log", ".idx"))
+
+    reopened = MessageLog(str(tmp_path), index_interval=128)
+    assert [m.payload for m in reopened.replay(start=1048)] == [b"48", b"49"]
+    reopened.append("plant/d0/temp", b"50", timestamp=1050)
+    assert [m.payload for m in reopened.replay(start=1049)] == [b"49", b"50"]
+    reopened.close()
+
+
+def test_retention_by_size_and_age(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=1024, retention_bytes=3000)
+    fill(log, 400)
+    assert log.stats()["bytes"] <= 3000 + 1024
+    assert log.stats()["first_ts"] > 1000
+
+    aged = MessageLog(str(tmp_path / "aged"), segment_bytes=1024, retention_seconds=60)
+    fill(aged, 100, start=0)
+    assert aged.stats()["segments"] == 1
+    log.close()
+    aged.close()
+
+
+def test_recorded_messages_replay_into_telemetry(tmp_path):
+    pytest.importorskip("numpy")
+    iot = IoTModule()
+    log = MessageLog(str(tmp_path))
+
+    async def scenario():
+        from pywork.mqtt import MQTTBridge
+
+        iot.mqtt = MQTTBridge("localhost")
+        iot.record_messages(log, "plant/#")
+        await iot.mqtt.start(connect=False)
+        for i in range(5):
+            iot.mqtt.feed(MQTTMessage("plant/p1/temp", b"%d" % i, timestamp=2000 + i))
+        await asyncio.sleep(0.05)
+        await iot.mqtt.stop()
+        log.flush()
+
+        restarted = IoTModule()
+        assert await restarted.backfill_telemetry(log, start=2002) == 3
+        return restarted.telemetry.series("p1", "temp")
+
+    timestamps, values = asyncio.run(scenario())
+    assert timestamps.tolist() == [2002, 2003, 2004]
+    assert values.tolist() == [2, 3, 4]
+    log.close()
+
+
+def test_writes_run_off_the_event_loop(tmp_path):
+    log = MessageLog(str(tmp_path), flush_bytes=64, flush_interval=0.01)
+    threads = []
+    write_batch = log._write_batch
+
+    def recording(pending):
+        threads.append(threading.current_thread())
+        write_batch(pending)
+
+    log._write_batch = recording
+
+    async def scenario():
+        await log.start()
+        for i in range(20):
+            log.append("plant/d0/temp", b"%d" % i, timestamp=1000.0 + i)
+        await asyncio.sleep(0.05)
+        await log.stop()
+
+    asyncio.run(scenario())
+    assert threads and threading.main_thread() not in threads
+    assert [m.payload for m in MessageLog(str(tmp_path)).replay()] == [b"%d" % i for i in range(20)]
+
+
+def test_replay_stops_at_corrupted_record(tmp_path):
+    log = MessageLog(str(tmp_path))
+    fill(log, 20)
+    path = log._segments[-1].path
+    with open(path, "r+b") as fh:
+        data = fh.read()
+        offset = 0
+        for _ in range(10):
+            _, _, topic_len, payload_len = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size + topic_len + payload_len
+        fh.seek(offset + _HEADER.size)
+        fh.write(b"X")
+    assert [m.payload for m in log.replay()] == [b"%d" % i for i in range(10)]
+    log.close()
+
+
+def test_replay_into_flushes_without_blocking_the_loop(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(5):
+        log.append("plant/d0/temp", b"%d" % i, timestamp=1000.0 + i)
+
+    def blocking_flush():
+        raise AssertionError("flush() bloquea el event loop")
+
+    log.flush = blocking_flush
+    received = []
+
+    async def handler(message):
+        received.append(message.payload)
+
+    assert asyncio.run(log.replay_into(handler)) == 5
+    assert received == [b"%d" % i for i in range(5)]
+    del log.flush
+    log.close()
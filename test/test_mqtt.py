@@ -0,0 +1,263 @@
+import asyncio
+import threading
+
+import paho.mqtt.client as mqtt
+import pytest
+from pywork.mqtt import MQTTBridge, MQTTMessage
+
+
+def feed_from_thread(bridge, messages):
+    thread = threading.Thread(target=lambda: [bridge.feed(m) for m in messages])
+    thread.start()
+    return thread
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timeout"
+        await asyncio.sleep(0.005)
+
+
+def test_messages_cross_from_network_thread_to_async_handlers():
+    async def scenario():
+        bridge = MQTTBridge("localhost", batch_size=16)
+        received = []
+
+        async def handler(message):
+            received.append((message.topic, message.payload))
+
+        bridge.subscribe("plant/+/temp", handler, concurrency=2)
+        await bridge.start(connect=False)
+        feed_from_thread(bridge, [MQTTMessage(f"plant/{i}/temp", b"%d" % i) for i in range(100)]
+                         + [MQTTMessage("other/topic", b"x")]).join()
+        await wait_until(lambda: len(received) == 100)
+        stats = bridge.stats()["subscriptions"][0]
+        assert stats["received"] == 100 and stats["dropped"] == 0
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("overflow, expected", [("drop_newest", [0, 1, 2]), ("drop_oldest", [0, 8, 9])])
+def test_overflow_policies_drop_and_count(overflow, expected):
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        gate = asyncio.Event()
+        received = []
+
+        async def handler(message):
+            received.append(int(message.payload))
+            await gate.wait()
+
+        bridge.subscribe("t", handler, maxsize=2, overflow=overflow)
+        await bridge.start(connect=False)
+        bridge.feed(MQTTMessage("t", b"0"))
+        await wait_until(lambda: received == [0])
+        for i in range(1, 10):
+            bridge.feed(MQTTMessage("t", b"%d" % i))
+        await asyncio.sleep(0.01)
+        gate.set()
+        await wait_until(lambda: len(received) == len(expected))
+        assert received == expected
+        assert bridge.stats()["subscriptions"][0]["dropped"] == 10 - len(expected)
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_block_policy_holds_messages_and_acks_once_queued():
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        gate = asyncio.Event()
+        received = []
+        acked = []
+        bridge.client.ack = lambda mid, qos: acked.append(mid)
+
+        async def handler(message):
+            await gate.wait()
+            received.append(message.payload)
+
+        bridge.subscribe("t", handler, maxsize=1, overflow="block")
+        bridge._manual_ack = True
+        await bridge.start(connect=False)
+        for i in range(4):
+            # Llega por el callback del hilo de red, que nunca debe quedarse esperando
+            msg = mqtt.MQTTMessage(mid=i + 1, topic=b"t")
+            msg.payload, msg.qos = b"%d" % i, 1
+            await asyncio.wait_for(asyncio.to_thread(bridge._on_message, bridge.client, None, msg), 1)
+        await asyncio.sleep(0.01)
+        assert acked == [1, 2] and bridge.stats()["held"] == 2
+        gate.set()
+        await wait_until(lambda: len(received) == 4)
+        assert acked == [1, 2, 3, 4] and bridge.stats()["held"] == 0
+        assert bridge.stats()["subscriptions"][0]["dropped"] == 0
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_mqtt_topic_decorator_routes_to_all_matching_handlers():
+    from pywork import Framework
+
+    app = Framework()
+    received = []
+
+    @app.mqtt_topic("plant/+/sensor/#")
+    async def any_sensor(message):
+        received.append(("any", message.topic))
+
+    bridge = app.mqtt_connect("localhost", 1883)
+
+    @app.mqtt_topic("$share/workers/plant/1/sensor/temp", qos=1)
+    async def temp(message):
+        received.append(("temp", message.topic))
+
+    assert bridge.topic_filters() == {"plant/+/sensor/#": 0, "$share/workers/plant/1/sensor/temp": 1}
+
+    async def scenario():
+        await bridge.start(connect=False)
+        bridge.feed(MQTTMessage("plant/1/sensor/temp", b"20"))
+        bridge.feed(MQTTMessage("plant/2/sensor/hum", b"50"))
+        bridge.feed(MQTTMessage("plant/2/status", b"ok"))
+        await wait_until(lambda: len(received) == 3)
+        await bridge.unsubscribe(bridge.subscriptions[0])
+        assert bridge.topic_filters() == {"$share/workers/plant/1/sensor/temp": 1}
+        await bridge.stop()
+
+    asyncio.run(scenario())
+    assert sorted(received) == [("any", "plant/1/sensor/temp"), ("any", "plant/2/sensor/hum"),
+                                ("temp", "plant/1/sensor/temp")]
+
+
+class FakeInfo:
+    def __init__(self, mid):
+        self.mid = mid
+        self.rc = 0
+
+
+def fake_publisher(bridge):
+    sent = []
+
+    def publish(topic, payload, qos=0, retain=False):
+        sent.append((topic, payload, qos))
+        return FakeInfo(len(sent))
+
+    bridge.client.publish = publish
+    return sent
+
+
+def test_publish_is_queued_and_resolved_without_blocking():
+    async def scenario():
+        bridge = MQTTBridge("localhost", batch_size=8)
+        sent = fake_publisher(bridge)
+        await bridge.start(connect=False)
+        futures = [await bridge.publish(f"devices/{i}/cmd", b"on") for i in range(50)]
+        assert await asyncio.gather(*futures) == [True] * 50
+        assert [topic for topic, _, _ in sent] == [f"devices/{i}/cmd" for i in range(50)]
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_qos1_inflight_window_released_by_acks():
+    async def scenario():
+        bridge = MQTTBridge("localhost", max_inflight=2)
+        sent = fake_publisher(bridge)
+        await bridge.start(connect=False)
+        futures = [await bridge.publish("cmd", b"%d" % i, qos=1) for i in range(5)]
+        await asyncio.sleep(0.01)
+        assert len(sent) == 2 and bridge.stats()["inflight"] == 2
+        bridge._on_publish(None, None, 1)
+        await wait_until(lambda: len(sent) == 3)
+        assert await futures[0] is True
+        for mid in range(2, 6):
+            bridge._on_publish(None, None, mid)
+            await asyncio.sleep(0)
+        assert await asyncio.gather(*futures) == [True] * 5
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_delivery_future_does_not_stop_the_sender():
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        sent = fake_publisher(bridge)
+        abandoned = await bridge.publish("cmd", b"0")
+        abandoned.cancel()
+        coalesced = await bridge.publish("state", b"old", coalesce=True)
+        coalesced.cancel()
+        await bridge.publish("state", b"new", coalesce=True)
+        await bridge.start(connect=False)
+        assert await bridge.publish("cmd", b"1") is not None
+        later = await bridge.publish("cmd", b"2")
+        assert await asyncio.wait_for(later, 1) is True
+        assert [payload for _, payload, _ in sent] == [b"0", b"new", b"1", b"2"]
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_resolves_deliveries_waiting_for_ack():
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        fake_publisher(bridge)
+        await bridge.start(connect=False)
+        future = await bridge.publish("cmd", b"1", qos=1)
+        await wait_until(lambda: bridge.stats()["inflight"] == 1)
+        await bridge.stop()
+        assert await asyncio.wait_for(future, 1) is False
+        assert bridge.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_publish_sends_latest_value_only():
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        sent = fake_publisher(bridge)
+        futures = [await bridge.publish("plant/1/setpoint", b"%d" % i, coalesce=True) for i in range(3)]
+        other = await bridge.publish("plant/2/setpoint", b"7", coalesce=True)
+        await bridge.start(connect=False)
+        assert await asyncio.gather(*futures, other) == [False, False, True, True]
+        assert sent == [("plant/1/setpoint", b"2", 0), ("plant/2/setpoint", b"7", 0)]
+        assert bridge.stats()["coalesced"] == 2
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_coalesced_publish_does_not_swallow_later_ones():
+    async def scenario():
+        bridge = MQTTBridge("localhost", max_outbound=1)
+        sent = fake_publisher(bridge)
+        await bridge.publish("filler", b"0")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(bridge.publish("state", b"old", coalesce=True), 0.01)
+        await bridge.start(connect=False)
+        later = await bridge.publish("state", b"new", coalesce=True)
+        assert await asyncio.wait_for(later, 1) is True
+        assert [payload for _, payload, _ in sent] == [b"0", b"new"]
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+
+def test_framework_publish_uses_default_bridge():
+    from pywork import Framework
+
+    app = Framework()
+    with pytest.raises(RuntimeError):
+        app._mqtt_bridge()
+    first = app.mqtt_connect("localhost", 1883, client_id="a")
+    app.mqtt_connect("localhost", 1884, client_id="b")
+    sent = fake_publisher(first)
+
+    async def scenario():
+        await first.start(connect=False)
+        assert await (await app.mqtt_publish("x", b"1")) is True
+        await first.stop()
+
+    asyncio.run(scenario())
+    assert sent == [("x", b"1", 0)]
@@ -0,0 +1,50 @@
+# Todo el módulo con anotaciones diferidas: las firmas llegan como cadenas
+from __future__ import annotations
+
+import pytest
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from pywork import Framework
+from pywork.handlers import analyze_handler
+
+
+class Item(BaseModel):
+    name: str
+    price: float
+
+
+class Repository:
+    def __init__(self):
+        self.items = []
+
+
+class Catalog:
+    def __init__(self, repo: Repository):
+        self.repo = repo
+
+
+def test_string_annotations_are_resolved():
+    app = Framework()
+    app.register_dependency(Repository, Repository)
+    app.register_dependency(Catalog, Catalog)
+
+    @app.route("/items/{item_id}", methods=["POST"])
+    async def create(item_id: int, data: Item, request: Request, catalog: Catalog):
+        catalog.repo.items.append(data.name)
+        return {"id": item_id, "name": data.name, "path": request.url.path, "stored": catalog.repo.items}
+
+    client = TestClient(app.get_app())
+    response = client.post("/items/3", json={"name": "tornillo", "price": 0.5})
+    assert response.status_code == 200
+    assert response.json() == {"id": 3, "name": "tornillo", "path": "/items/3", "stored": ["tornillo"]}
+    assert client.post("/items/3", json={"name": "x"}).status_code == 400
+
+
+def test_unresolvable_annotation_fails_at_decoration():
+    async def handler(service: Missing):  # noqa: F821
+        return {}
+
+    with pytest.raises(TypeError, match="Missing"):
+        analyze_handler(handler)
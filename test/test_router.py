@@ -0,0 +1,58 @@
+import pytest
+from starlette.testclient import TestClient
+from pywork import Framework
+
+
+@pytest.fixture(params=["list", "radix"])
+def client(request):
+    app = Framework(router=request.param)
+
+    @app.route("/users/me", methods=["GET"])
+    async def me():
+        return {"user": "me"}
+
+    @app.route("/users/{user_id:int}", methods=["GET"])
+    async def user_by_id(user_id: int):
+        return {"id": user_id}
+
+    @app.route("/users/{name}", methods=["GET"])
+    async def user_by_name(name: str):
+        return {"name": name}
+
+    @app.route("/users/{user_id:int}", methods=["POST"])
+    async def update_user(user_id: int):
+        return {"updated": user_id}
+
+    @app.route("/users/{uid}", methods=["DELETE"])
+    async def delete_user(uid: str):
+        return {"deleted": uid}
+
+    @app.route("/files/{path:path}", methods=["GET"])
+    async def files(path: str):
+        return {"path": path}
+
+    @app.websocket("/ws/{room}")
+    async def ws(websocket):
+        await websocket.send_json({"room": websocket.path_params["room"]})
+
+    return TestClient(app.get_app())
+
+
+def test_router_matches_static_typed_and_catch_all_segments(client):
+    assert client.get("/users/me").json() == {"user": "me"}
+    assert client.get("/users/42").json() == {"id": 42}
+    assert client.get("/users/ana").json() == {"name": "ana"}
+    assert client.post("/users/42").json() == {"updated": 42}
+    assert client.delete("/users/me").json() == {"deleted": "me"}
+    assert client.get("/files/a/b/c.txt").json() == {"path": "a/b/c.txt"}
+    with client.websocket_connect("/ws/sala") as websocket:
+        assert websocket.receive_json() == {"room": "sala"}
+
+
+def test_router_keeps_405_head_and_404_semantics(client):
+    response = client.put("/users/42")
+    assert response.status_code == 405
+    assert client.post("/files/a.txt").status_code == 405
+    assert client.head("/users/me").status_code == 200
+    assert client.get("/nope").status_code == 404
+    assert client.get("/users/me/", follow_redirects=False).status_code == 307
@@ -1,9 +1,18 @@
 # test/test_routes.py
 
+import json
+
 import pytest
 from starlette.testclient import TestClient
 from pywork.core import Framework
+from pywork.encoders import JSONEncoder
 from starlette.responses import JSONResponse  # Importa JSONResponse
+from starlette.requests import Request
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+from uuid import UUID
+from pydantic import BaseModel
 
 @pytest.fixture
 def client():
@@ -26,3 +35,122 @@ def test_test_route(client):
     # Verifica que el código de respuesta sea 200 y el mensaje sea correcto
     assert response.status_code == 200
     assert response.json() == {"message": "Ruta de prueba exitosa"}
+
+
+class Greeter:
+    def greet(self, name):
+        return f"Hola {name}"
+
+class Item(BaseModel):
+    name: str
+
+def test_route_injects_path_params_request_body_and_dependencies():
+    framework = Framework()
+    framework.register_dependency(Greeter, Greeter)
+
+    @framework.route("/items/{item_id}", methods=["GET"])
+    async def get_item(item_id: int, request: Request, greeter: Greeter):
+        return {"id": item_id, "method": request.method, "greeting": greeter.greet("mundo")}
+
+    @framework.route("/items", methods=["POST"])
+    async def create_item(data: Item):
+        return {"name": data.name}
+
+    client = TestClient(framework.get_app())
+    assert get_item.plan.injectables == (("greeter", Greeter, False),)
+
+    response = client.get("/items/7")
+    assert response.json() == {"id": 7, "method": "GET", "greeting": "Hola mundo"}
+    assert client.get("/items/abc").status_code == 400
+    assert client.post("/items", json={"name": "tornillo"}).json() == {"name": "tornillo"}
+    assert client.post("/items", json={}).status_code == 400
+
+def test_inject_keeps_positional_arguments_and_skips_unregistered_types():
+    import asyncio
+    from typing import Optional
+
+    class User:
+        pass
+
+    framework = Framework()
+    framework.register_dependency(Greeter, Greeter)
+
+    @framework.inject
+    async def handler(user: User, q: Optional[str], greeter: Greeter):
+        return user, q, greeter
+
+    user = User()
+    result = asyncio.run(handler(user, "x"))
+    assert result[0] is user and result[1] == "x" and isinstance(result[2], Greeter)
+    given = Greeter()
+    assert asyncio.run(handler(user, "x", given))[2] is given
+
+def test_body_validated_from_raw_bytes_with_list_models_and_size_limit():
+    framework = Framework()
+
+    @framework.route("/items/bulk", methods=["PUT"], max_body_size=64)
+    async def bulk(data: List[Item]):
+        return {"names": [item.name for item in data]}
+
+    client = TestClient(framework.get_app())
+    response = client.put("/items/bulk", json=[{"name": "a"}, {"name": "b"}])
+    assert response.json() == {"names": ["a", "b"]}
+    assert client.put("/items/bulk", content=b"{not json").status_code == 400
+    assert client.put("/items/bulk", json=[{"name": "x" * 100}]).status_code == 413
+
+@dataclass
+class Reading:
+    device: UUID
+    at: datetime
+
+@pytest.mark.parametrize("backend", ["pydantic", "json"])
+def test_handler_return_values_are_encoded_natively(backend):
+    framework = Framework()
+    framework.json_encoder = JSONEncoder(backend)
+    device = UUID("12345678-1234-5678-1234-567812345678")
+    at = datetime(2024, 1, 2, 3, 4, 5)
+
+    @framework.route("/models", methods=["GET"])
+    async def models():
+        return [Item(name="a"), Item(name="b")]
+
+    @framework.route("/readings", methods=["GET"])
+    async def readings():
+        return {"readings": [Reading(device, at)]}
+
+    client = TestClient(framework.get_app())
+    assert client.get("/models").json() == [{"name": "a"}, {"name": "b"}]
+    response = client.get("/readings")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"readings": [{"device": str(device), "at": "2024-01-02T03:04:05"}]}
+
+def test_generator_handlers_are_streamed():
+    framework = Framework()
+    closed = []
+
+    @framework.route("/export", methods=["GET"])
+    async def export():
+        try:
+            for i in range(3):
+                yield {"id": i, "name": f"item-{i}"}
+        finally:
+            closed.append(True)
+
+    @framework.route("/export.csv", methods=["GET"], stream="csv")
+    def export_csv():
+        yield Item(name="a")
+        yield Item(name="b")
+
+    client = TestClient(framework.get_app())
+    response = client.get("/export")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": i, "name": f"item-{i}"} for i in range(3)
+    ]
+    assert closed == [True]
+
+    sse = client.get("/export", headers={"Accept": "text/event-stream"})
+    assert sse.headers["content-type"].startswith("text/event-stream")
+    assert sse.text.startswith('data: {"id":0,"name":"item-0"}\n\n')
+
+    assert client.get("/export.csv").text.splitlines() == ["name", "a", "b"]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+from pywork.codecs import Codec
+from pywork.iot_module import IoTModule
+from pywork.mqtt import MQTTBridge, MQTTMessage
+from pywork.rpc import RPCClient, RPCError, RPCTimeout
+
+
+def fake_devices(bridge, behaviour):
+    """Sustituye la red: cada publicación se responde (o no) como lo haría el dispositivo."""
+    class Info:
+        rc = 0
+
+    mids = iter(range(1, 1_000_000))
+
+    def publish(topic, payload, qos=0, retain=False):
+        device_id = topic.split("/")[1]
+        request = json.loads(payload)
+        reply = behaviour(device_id, request)
+        if reply is not None:
+            reply["id"] = request["id"]
+            bridge.feed(MQTTMessage(request["reply_to"], json.dumps(reply).encode()))
+        info = Info()
+        info.mid = next(mids)
+        bridge._on_publish(None, None, info.mid)  # ack del broker (QoS 1)
+        return info
+
+    bridge.client.publish = publish
+
+
+def behaviour(device_id, request):
+    if device_id == "silent":
+        return None
+    if device_id == "broken":
+        return {"error": "relay stuck"}
+    return {"result": {"device": device_id, "method": request["method"], "params": request["params"]}}
+
+
+def test_call_resolves_by_correlation_id():
+    async def scenario():
+        iot = IoTModule()
+        iot.mqtt = MQTTBridge("localhost")
+        fake_devices(iot.mqtt, behaviour)
+        await iot.start()
+        result = await iot.call("pump1", "set_speed", {"rpm": 900}, timeout=1)
+        with pytest.raises(RPCError) as error:
+            await iot.call("broken", "open")
+        with pytest.raises(RPCTimeout):
+            await iot.call("silent", "ping", timeout=0.05)
+        stats = iot.rpc.stats()
+        await iot.stop()
+        return result, error.value, stats
+
+    result, error, stats = asyncio.run(scenario())
+    assert result == {"device": "pump1", "method": "set_speed", "params": {"rpm": 900}}
+    assert error.error == "relay stuck"
+    assert stats == {"pending": 0, "calls": 3, "timeouts": 1, "errors": 1, "late": 0}
+
+
+def test_call_many_returns_partial_results():
+    async def scenario():
+        iot = IoTModule()
+        iot.mqtt = MQTTBridge("localhost")
+        fake_devices(iot.mqtt, behaviour)
+        await iot.start()
+        devices = [f"d{i}" for i in range(200)] + ["silent", "broken"]
+        results = await iot.call_many(devices, "ping", timeout=0.2, concurrency=20)
+        await iot.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert sum(1 for r in results.values() if isinstance(r, dict)) == 200
+    assert isinstance(results["silent"], RPCTimeout)
+    assert isinstance(results["broken"], RPCError)
+
+
+def test_timeout_covers_a_publish_stuck_on_a_full_outbound_queue():
+    async def scenario():
+        bridge = MQTTBridge("localhost", max_outbound=1)
+        client = RPCClient(bridge)
+        await bridge.publish("filler", b"0")  # sin sender: la cola de salida queda llena
+        with pytest.raises(RPCTimeout):
+            await client.call("pump1", "ping", timeout=0.05)
+        return client.stats()
+
+    assert asyncio.run(scenario())["timeouts"] == 1
+
+
+def test_replies_are_decoded_with_the_bridge_codec():
+    class KeyValueCodec(Codec):
+        def decode(self, payload):
+            reply = dict(item.split("=") for item in payload.decode().split(";"))
+            reply["id"] = int(reply["id"])
+            return reply
+
+        def encode(self, value):
+            return ";".join(f"{key}={item}" for key, item in value.items()).encode()
+
+    async def scenario():
+        bridge = MQTTBridge("localhost")
+        bridge.register_codec("pywork/rpc/#", KeyValueCodec())
+        fake_devices(bridge, lambda device_id, request: None)
+        real_publish = bridge.client.publish
+
+        def publish(topic, payload, qos=0, retain=False):
+            request = json.loads(payload)
+            bridge.feed(MQTTMessage(request["reply_to"], b"id=%d;result=ok" % request["id"]))
+            return real_publish(topic, payload, qos, retain)
+
+        bridge.client.publish = publish
+        await bridge.start(connect=False)
+        result = await RPCClient(bridge).call("pump1", "ping", timeout=1)
+        await bridge.stop()
+        return result
+
+    assert asyncio.run(scenario()) == "ok"
@@ -0,0 +1,138 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import httpx
+import pytest
+from pywork import Framework
+from pywork.mqtt import MQTTBridge
+
+SERVER = textwrap.dedent("""
+    import asyncio, os, sys
+    from pywork import Framework
+
+    app = Framework()
+
+    @app.route("/pid", methods=["GET"])
+    async def pid():
+        return {"pid": os.getpid()}
+
+    @app.route("/slow", methods=["GET"])
+    async def slow():
+        await asyncio.sleep(1)
+        return {"done": True}
+
+    app.serve(host="127.0.0.1", port=int(sys.argv[1]), workers=2, graceful_timeout=5)
+""")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_worker_gets_its_own_mqtt_client_and_opt_in_shared_subscriptions():
+    bridge = MQTTBridge("localhost", client_id="gateway")
+
+    async def handler(message):
+        pass
+
+    bridge.subscribe("plant/+/temp", handler)
+    bridge.subscribe("jobs/#", handler, shared=True)
+    bridge.subscribe("$share/other/alarms/#", handler)
+    inherited = bridge.client
+    bridge.configure_worker(3, "pywork")
+    assert bridge.client is not inherited
+    assert bridge.client_id == "gateway-3"
+    # Solo los handlers marcados `shared=True` se reparten; el resto recibe todo en cada worker
+    assert bridge.topic_filters() == {"plant/+/temp": 0, "$share/pywork/jobs/#": 0, "$share/other/alarms/#": 0}
+
+
+def test_message_log_gets_a_directory_per_worker(tmp_path):
+    from pywork.message_log import MessageLog
+
+    app = Framework()
+    app.mqtt_connect("localhost", 1883)
+    log = MessageLog(str(tmp_path))
+    app.mqtt_record(log, "sensors/#")
+    app._prepare_worker(1, "pywork")
+    log.append("sensors/a", b"1", timestamp=10.0)
+    log.close()
+    assert log.directory == str(tmp_path / "worker-1")
+    assert [m.topic for m in MessageLog(log.directory).replay()] == ["sensors/a"]
+    assert not any(name.endswith(".log") for name in os.listdir(tmp_path))
+
+
+def test_debug_is_off_by_default():
+    assert Framework().get_app().debug is False
+    assert Framework(debug=True).get_app().debug is True
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork requiere os.fork")
+def test_prefork_workers_share_socket_and_drain_on_sigterm(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    process = subprocess.Popen([sys.executable, str(script), str(port)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.get(f"{base}/pid")
+                break
+            except httpx.TransportError:
+                assert time.monotonic() < deadline, "el servidor no arrancó"
+                time.sleep(0.1)
+        pids = {httpx.get(f"{base}/pid", headers={"connection": "close"}).json()["pid"] for _ in range(40)}
+        assert process.pid not in pids and len(pids) >= 1
+
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(r=httpx.get(f"{base}/slow", timeout=10)))
+        thread.start()
+        time.sleep(0.3)
+        process.send_signal(signal.SIGTERM)
+        thread.join(10)
+        assert result["r"].json() == {"done": True}
+        assert process.wait(15) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork requiere os.fork")
+def test_workers_failing_at_startup_are_restarted_with_backoff(tmp_path):
+    script = tmp_path / "failing.py"
+    script.write_text(textwrap.dedent("""
+        import sys
+        from pywork import Framework
+        from pywork.server import serve
+
+        def on_worker_start(worker_id):
+            with open(sys.argv[2], "a") as fh:
+                fh.write(f"{worker_id}\\n")
+            raise RuntimeError("arranque roto")
+
+        serve(Framework().get_app(), "127.0.0.1", int(sys.argv[1]), workers=2, on_worker_start=on_worker_start)
+    """))
+    starts = tmp_path / "starts.txt"
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    process = subprocess.Popen([sys.executable, str(script), str(free_port()), str(starts)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(2.5)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(10) == 0
+        # Sin espera serían cientos de forks; con 0.5s, 1s, 2s... unos pocos por worker
+        assert 2 <= len(starts.read_text().split()) <= 10
+    finally:
+        if process.poll() is None:
+            process.kill()
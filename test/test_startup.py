@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+from pywork import Framework
+
+# Presupuesto de `import pywork` relativo a Starlette medido en el mismo proceso (`python -X importtime`),
+# para no depender de la velocidad del runner. Con Starlette ya importado, pywork añade ~1x lo que cuesta
+# Starlette; con los subsistemas opcionales importados de forma eager, más de 4x.
+IMPORT_BUDGET_RATIO = 3.0
+LAZY_MODULES = ("authlib", "jose", "paho", "jinja2", "uvicorn", "itsdangerous")
+
+
+def run_python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True)
+
+
+def test_optional_subsystems_are_not_imported_with_pywork():
+    result = run_python("import sys, json, pywork; print(json.dumps(sorted(sys.modules)))")
+    loaded = {name.split(".")[0] for name in json.loads(result.stdout)}
+    assert loaded.isdisjoint(LAZY_MODULES), loaded & set(LAZY_MODULES)
+
+
+def cumulative_us(stderr, module):
+    line = next(line for line in stderr.splitlines() if line.rstrip().endswith(f"| {module}"))
+    return int(line.split("|")[1])
+
+
+def test_import_time_budget():
+    # El mejor de varios arranques, para no depender de una ejecución ruidosa
+    ratios = []
+    for _ in range(3):
+        stderr = run_python("import starlette.applications; import pywork", "-X", "importtime").stderr
+        ratios.append(cumulative_us(stderr, "pywork") / cumulative_us(stderr, "starlette.applications"))
+    assert min(ratios) < IMPORT_BUDGET_RATIO, f"import pywork: {min(ratios):.1f}x starlette"
+
+
+def test_lazy_subsystems_initialize_on_first_use(tmp_path):
+    app = Framework()
+    assert app._oauth is None and app._templates is None
+    assert type(app.oauth).__name__ == "OAuth"
+    assert app.oauth is app.oauth
+    assert app.template_env is app.templates.env
+    assert app.templates.directory == "templates"
+    engine = app.configure_templates(str(tmp_path))
+    assert app.templates is engine and app.template_env is engine.env
@@ -0,0 +1,42 @@
+from starlette.testclient import TestClient
+from pywork import Framework
+
+
+def make_app(tmp_path, **options):
+    (tmp_path / "app.js").write_text("console.log('pywork');\n" * 200)
+    (tmp_path / "big.bin").write_bytes(b"\0" * 16384)
+    app = Framework()
+    app.configure_static(str(tmp_path), max_file_size=8192, **options)
+    return app
+
+
+def test_static_files_served_from_memory_with_gzip_and_conditional_requests(tmp_path):
+    app = make_app(tmp_path)
+    with TestClient(app.get_app(mvch_mode=True)) as client:
+        assert str(tmp_path / "app.js") in app.static_files._entries
+
+        response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == "console.log('pywork');\n" * 200
+        assert int(response.headers["content-length"]) < 200 * 23
+
+        plain = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+        assert client.get("/static/app.js", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/static/app.js", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+        big = client.get("/static/big.bin")
+        assert big.status_code == 200 and len(big.content) == 16384
+        assert client.get("/static/../secret").status_code == 404
+
+
+def test_static_reload_invalidates_entries(tmp_path):
+    app = make_app(tmp_path, preload=False)
+    client = TestClient(app.get_app(mvch_mode=True))
+    assert client.get("/static/app.js").text.startswith("console.log('pywork')")
+    (tmp_path / "app.js").write_text("console.log('v2');")
+    assert client.get("/static/app.js").text.startswith("console.log('pywork')")
+    app.reload_static("app.js")
+    assert client.get("/static/app.js").text == "console.log('v2');"
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from starlette.testclient import TestClient
+from pywork import Framework
+from pywork.iot_module import IoTModule
+from pywork.mqtt import MQTTMessage
+from pywork.telemetry import TelemetryStore
+
+
+def test_ring_buffer_keeps_last_samples_in_order():
+    store = TelemetryStore(capacity=4)
+    for i in range(10):
+        store.record("d1", "temp", i, timestamp=100 + i)
+    timestamps, values = store.series("d1", "temp")
+    assert timestamps.tolist() == [106, 107, 108, 109]
+    assert values.tolist() == [6, 7, 8, 9]
+
+
+def test_aggregate_over_window_for_many_devices():
+    store = TelemetryStore(capacity=16, initial_devices=2)
+    devices = [f"d{i}" for i in range(100)]
+    for t in range(10):
+        store.record_many(devices, "temp", np.arange(100) + t, timestamps=1000 + t)
+    result = store.aggregate("temp", start=1005, end=1009, percentiles=(50,))
+    assert result["devices"] == devices
+    assert result["count"].tolist() == [5] * 100
+    assert result["min"][3] == 8 and result["max"][3] == 12
+    assert result["mean"][3] == pytest.approx(10)
+    assert result["p50"][3] == pytest.approx(10)
+    assert result["last"][3] == 12
+
+    empty = store.aggregate("temp", start=0, end=10, devices=["d1", "unknown"])
+    assert empty["devices"] == ["d1"] and empty["count"].tolist() == [0]
+    assert np.isnan(empty["mean"][0])
+
+
+def test_downsample_buckets():
+    store = TelemetryStore(capacity=100)
+    for t in range(60):
+        store.record("d1", "temp", t, timestamp=t)
+    starts, means = store.downsample("d1", "temp", 0, 60, buckets=6)
+    assert starts.tolist() == [0, 10, 20, 30, 40, 50]
+    assert means.tolist() == [4.5, 14.5, 24.5, 34.5, 44.5, 54.5]
+
+
+def test_telemetry_fed_from_mqtt_and_served_over_http():
+    app = Framework()
+    iot = IoTModule(telemetry_capacity=8)
+    bridge = iot.setup_mqtt("localhost", app=app)
+    iot.track_telemetry("plant/+/+")
+    iot.telemetry_routes(app)
+
+    async def feed():
+        await bridge.start(connect=False)
+        for i in range(3):
+            bridge.feed(MQTTMessage("plant/p1/temp", b"%d" % (20 + i), received_at=0))
+        bridge.feed(MQTTMessage("plant/p2/temp", b"30", received_at=0))
+        await asyncio.sleep(0.05)
+        await bridge.stop()
+
+    asyncio.run(feed())
+    client = TestClient(app.get_app())
+    response = client.get("/telemetry/temp?percentiles=50")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["devices"] == ["p1", "p2"]
+    assert body["mean"] == [21.0, 30.0] and body["p50"] == [21.0, 30.0]
+    series = client.get("/telemetry/temp/p1").json()
+    assert series["values"] == [20.0, 21.0, 22.0]
+    assert client.get("/telemetry/humidity").json()["devices"] == ["p1", "p2"]
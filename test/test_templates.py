@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+import pytest
+from starlette.testclient import TestClient
+from pywork import Framework
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    directory = tmp_path / "templates"
+    directory.mkdir()
+    (directory / "page.html").write_text("<h1>{{ title }}</h1>{% for i in items %}<p>{{ i }}</p>{% endfor %}")
+    return directory
+
+
+def test_precompile_fills_bytecode_cache(template_dir, tmp_path):
+    app = Framework()
+    cache_dir = tmp_path / "bytecode"
+    engine = app.configure_templates(str(template_dir), bytecode_cache_dir=str(cache_dir), enable_async=True)
+    assert engine.precompile() == ["page.html"]
+    # Un fichero por entorno (síncrono y async): sus bytecodes no son intercambiables
+    assert len(os.listdir(cache_dir)) == 2
+    assert app.render_template("page.html", title="Hola", items=[1]) == "<h1>Hola</h1><p>1</p>"
+
+    warm = app.configure_templates(str(template_dir), bytecode_cache_dir=str(cache_dir))
+    assert warm.render("page.html", title="Hola", items=[1]) == "<h1>Hola</h1><p>1</p>"
+    assert asyncio.run(warm.render_async("page.html", title="Hola", items=[])) == "<h1>Hola</h1>"
+
+
+def test_render_async_and_streamed_template(template_dir):
+    app = Framework()
+    app.configure_templates(str(template_dir), precompile=True, stream_buffer_size=16)
+
+    @app.route("/page", methods=["GET"])
+    async def page():
+        return app.stream_template("page.html", title="Lista", items=range(50))
+
+    @app.route("/page-async", methods=["GET"])
+    async def page_async():
+        return {"html": await app.render_template_async("page.html", title="Async", items=[])}
+
+    with TestClient(app.get_app()) as client:
+        response = client.get("/page")
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert response.text == app.render_template("page.html", title="Lista", items=range(50))
+        assert client.get("/page-async").json() == {"html": "<h1>Async</h1>"}
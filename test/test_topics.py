@@ -0,0 +1,48 @@
+import pytest
+from pywork.topics import TopicTrie, split_shared
+
+
+@pytest.fixture
+def trie():
+    trie = TopicTrie()
+    for topic_filter in ("plant/+/sensor/#", "plant/1/sensor/temp", "plant/#", "+/+/sensor/temp",
+                         "#", "$SYS/#", "$share/workers/plant/+/status"):
+        trie.add(topic_filter, topic_filter)
+    return trie
+
+
+@pytest.mark.parametrize("topic, expected", [
+    ("plant/1/sensor/temp", {"plant/+/sensor/#", "plant/1/sensor/temp", "plant/#", "+/+/sensor/temp", "#"}),
+    ("plant/2/sensor", {"plant/+/sensor/#", "plant/#", "#"}),
+    ("plant/2/status", {"plant/#", "#", "$share/workers/plant/+/status"}),
+    ("other/topic", {"#"}),
+    ("$SYS/broker/uptime", {"$SYS/#"}),
+])
+def test_match_wildcards(trie, topic, expected):
+    assert set(trie.match(topic)) == expected
+
+
+def test_remove_prunes_nodes(trie):
+    trie.remove("plant/1/sensor/temp", "plant/1/sensor/temp")
+    assert "plant/1/sensor/temp" not in trie.match("plant/1/sensor/temp")
+    assert len(trie) == 6
+    with pytest.raises(KeyError):
+        trie.remove("no/such/filter", "x")
+
+
+@pytest.mark.parametrize("bad", ["a/#/b", "a/b#", "a/+b", "", "$share/group"])
+def test_invalid_filters(bad):
+    with pytest.raises(ValueError):
+        TopicTrie().add(bad, None)
+
+
+def test_split_shared():
+    assert split_shared("$share/g1/a/+") == ("g1", "a/+")
+    assert split_shared("a/+") == (None, "a/+")
+
+
+def test_large_number_of_filters():
+    trie = TopicTrie()
+    for i in range(20_000):
+        trie.add(f"site/{i}/+/temp", i)
+    assert trie.match("site/12345/room/temp") == [12345]